@@ -1,153 +1,138 @@
 import tkinter as tk
-from tkinter import filedialog, ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox
 import subprocess
 import os
-import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import re
 import threading
 import time
 import glob # Importar glob para encontrar ficheiros
 import sys # Importar sys para forçar o flush do stdout
-
-ARQ_PERFIS = "perfis.json"
-DIAS_MANTER_LOGS = 30 # Número de dias para manter os arquivos de log
-
-def verificar_rclone():
-    """Verifica se o rclone está instalado e acessível no sistema."""
-    try:
-        subprocess.run(["rclone", "--version"], stdout=subprocess.DEVNULL, check=True)
-        return True
-    except:
-        return False
-
-def listar_pastas_onedrive():
-    """Lista as pastas existentes no OneDrive usando rclone lsf."""
-    try:
-        resultado = subprocess.run(
-            ["rclone", "lsf", "onedrive:", "--dirs-only"],
-            capture_output=True, text=True, encoding="utf-8", check=True
-        )
-        pastas = [linha.strip().rstrip("/") for linha in resultado.stdout.splitlines() if linha.strip()]
-        return pastas
-    except Exception as e:
-        print(f"Erro ao listar pastas do OneDrive: {e}")
-        sys.stdout.flush() # Forçar a saída
-        return []
-
-def carregar_json(arquivo):
-    """Carrega dados de um arquivo JSON."""
-    if os.path.exists(arquivo):
-        try:
-            with open(arquivo, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            messagebox.showwarning("Erro no arquivo de perfis", "O arquivo de perfis está corrompido ou vazio. Criando um novo.")
-            return {}
-    return {}
-
-def salvar_json(arquivo, conteudo):
-    """Salva dados em um arquivo JSON."""
-    with open(arquivo, "w", encoding="utf-8") as f:
-        json.dump(conteudo, f, indent=4, ensure_ascii=False)
-
-def extrair_stats_completos(linha):
-    """
-    Extrai informações detalhadas de uma linha de estatísticas do rclone.
-    Esta função foi aprimorada para capturar padrões de estatísticas
-    tanto de linhas que começam com "Transferred:" quanto de linhas com "NOTICE:".
-    Exemplo de linha do rclone (stats one line):
-    Transferred:    10.345 MiB / 50.000 MiB, 20%, 1.234 MiB/s, ETA 00:40
-    Exemplo de linha de dry-run (NOTICE):
-    2025/07/07 15:46:16 NOTICE:     21.771 MiB / 21.771 MiB, 100%, 0 B/s, ETA -
-    """
-    # Regex mais flexível para capturar os valores de estatísticas
-    # Adicionado (?:Transferred:|NOTICE:.*?\s*)? para capturar linhas que podem começar com "Transferred:" ou "NOTICE:"
-    # O padrão para ETA foi ajustado para capturar formatos como "1h2m3s", "1m2s", "5s" ou "-"
-    padrao = (
-        r"(?:Transferred:|NOTICE:.*?\s*)?([\d\.]+) (MiB|B|KiB|GiB|TiB) / ([\d\.]+) (MiB|B|KiB|GiB|TiB),\s*([\d]+)%,.*?([\d\.]+) (MiB/s|B/s|KiB/s|GiB/s|TiB/s), ETA ([\dsmh-]+)"
-    )
-    match = re.search(padrao, linha)
-    if match:
-        transferido_val = float(match.group(1))
-        transferido_unit = match.group(2)
-        total_val = float(match.group(3))
-        total_unit = match.group(4)
-        porcentagem = int(match.group(5))
-        velocidade_val = float(match.group(6))
-        velocidade_unit = match.group(7)
-        eta = match.group(8)
-
-        # Normaliza para MiB para exibição consistente
-        def convert_to_mib(value, unit):
-            if unit == "B": return value / (1024 * 1024)
-            if unit == "KiB": return value / 1024
-            if unit == "MiB": return value
-            if unit == "GiB": return value * 1024
-            if unit == "TiB": return value * 1024 * 1024
-            return value
-
-        transferido_mib = convert_to_mib(transferido_val, transferido_unit)
-        total_mib = convert_to_mib(total_val, total_unit)
-
-        return f"{transferido_mib:.2f}", f"{total_mib:.2f}", str(porcentagem), f"{velocidade_val:.2f} {velocidade_unit}", eta
-    return None, None, None, None, None
-
-def validar_caminho(path):
-    """
-    Valida caracteres básicos em um caminho.
-    Normaliza o caminho e lida com caracteres inválidos em nomes de arquivo.
-    Permite caracteres acentuados e outros caracteres Unicode.
+import queue
+from collections import deque
+
+INICIO_PROCESSO = time.perf_counter() # Referência para o modo --medir-inicio
+
+from cloudease.perfis import ARQ_PERFIS, carregar_json, registrar_execucao_perfil, salvar_json
+from cloudease.logs import DIAS_MANTER_LOGS, limpar_logs_antigos
+from cloudease.comandos import MAX_FRAGMENTOS, bwlimit_da_execucao, converter_bwlimit, converter_fragmentos, validar_caminho
+from cloudease.remoto import (
+    DaemonRclone, ListadorNiveisRemotos, TTL_CACHE_PASTAS_S, USAR_DAEMON_RCLONE, adicionar_pasta_cache,
+    gravar_cache_pastas, ler_cache_pastas, listar_pastas_remotas, verificar_rclone,
+)
+from cloudease.filtros import FILTROS_LIXO, FiltroExclusao
+from cloudease.plano import DiarioRetomada, ManifestoLocal
+from cloudease.pacotes import (
+    NOME_PACOTE, PACOTE_LIMITE_KIB_PADRAO, PACOTE_MIN_ARQUIVOS_PADRAO, PACOTE_PERCENTUAL_PEQUENOS_PADRAO,
+    desempacotar, opcoes_pacotes,
+)
+from cloudease.execucao import FilaSincronizacao, TarefaSincronizacao
+
+INTERVALO_BOMBA_MS = 50 # Intervalo do timer que atualiza a interface (20 Hz)
+LINHAS_MAX_CONSOLE = 5000 # Linhas mantidas na "Saída do Rclone" (o log em arquivo guarda tudo)
+FOLGA_CONSOLE = 500 # Linhas excedentes toleradas antes de cortar o início em bloco
+INTERVALO_FILA_MS = 500 # Intervalo de atualização da tabela da fila de perfis
+SERVIDOR_FILA = "127.0.0.1:8765" # Se um 'python -m cloudease serve' responder aqui, a janela da fila usa as tarefas dele (None: sempre a fila local)
+
+
+class BombaAtualizacaoUI:
     """
-    normalized_path = os.path.normpath(path)
-    # Removido '+' do conjunto de caracteres inválidos
-    invalid_chars_set = set('<>\"|?*#%&=@[]{}!`\'"')
-
-    is_windows_drive_path = False
-    if len(normalized_path) >= 2 and normalized_path[1] == ':' and normalized_path[0].isalpha():
-        is_windows_drive_path = True
-
-    for i, c in enumerate(normalized_path):
-        if c == ':' and is_windows_drive_path and i == 1:
-            continue
-        if c == '/' or c == '\\':
-            continue
-        if ord(c) < 32 or ord(c) == 127:
-            return False, f"caractere de controle ASCII (código: {ord(c)}) na posição {i}"
-        if c in invalid_chars_set:
-            return False, f"'{c}' (na posição {i})"
-            
-    return True, None
-
-def limpar_logs_antigos(dias_manter):
-    """
-    Remove arquivos de log antigos do diretório atual.
-    Arquivos com o padrão 'log_YYYY-MM-DD_HHhMM.txt' serão considerados.
+    Bomba de atualização da interface durante a sincronização.
+    As threads leitoras do rclone apenas enfileiram eventos (texto, valores de
+    variáveis do Tk e chamadas); um único timer do Tk drena a fila a uma taxa
+    fixa, insere todo o texto acumulado num só 'insert' e aplica somente o
+    valor mais recente de cada variável (progresso, velocidade, ETA...).
+    O console funciona como um buffer circular de 'linhas_max' linhas: o
+    excedente é descartado ou cortado do início em bloco, mantendo memória e
+    custo de redesenho constantes. A saída completa continua no log_*.txt.
     """
-    hoje = datetime.now()
-    for filename in os.listdir("."):
-        if filename.startswith("log_") and filename.endswith(".txt"):
+    def __init__(self, janela, output_text, intervalo_ms=INTERVALO_BOMBA_MS, linhas_max=LINHAS_MAX_CONSOLE):
+        self.janela = janela
+        self.output_text = output_text
+        self.intervalo_ms = intervalo_ms
+        self.linhas_max = linhas_max
+        self.fila = queue.Queue()
+        self._after_id = None
+        self._ativa = False
+
+    # Métodos chamados a partir de qualquer thread
+    def texto(self, texto):
+        self.fila.put(("texto", texto))
+
+    def estado(self, variavel, valor):
+        self.fila.put(("estado", variavel, valor))
+
+    def chamar(self, funcao, *args):
+        self.fila.put(("chamar", funcao, args))
+
+    # Métodos chamados apenas na thread do Tk
+    def iniciar(self):
+        self._ativa = True
+        if self._after_id is None:
+            self._after_id = self.janela.after(self.intervalo_ms, self._tick)
+
+    def parar(self):
+        """Cancela o timer e aplica o que ainda estiver na fila."""
+        self._ativa = False
+        if self._after_id is not None:
+            self.janela.after_cancel(self._after_id)
+            self._after_id = None
+        self.drenar()
+
+    def _tick(self):
+        self._after_id = None
+        self.drenar()
+        if self._ativa:
+            self._after_id = self.janela.after(self.intervalo_ms, self._tick)
+
+    def drenar(self):
+        """Processa todos os eventos pendentes. Retorna o número de eventos de texto aplicados."""
+        textos = deque(maxlen=self.linhas_max) # Só as últimas linhas chegam ao widget
+        valores = {}
+        chamadas = []
+        while True:
             try:
-                data_str = filename[4:14]
-                log_date = datetime.strptime(data_str, "%Y-%m-%d")
-                if (hoje - log_date).days > dias_manter:
-                    os.remove(filename)
-                    print(f"Log antigo removido: {filename}")
-                    sys.stdout.flush() # Forçar a saída
-            except (ValueError, IndexError):
-                continue
-            except OSError as e:
-                print(f"Erro ao remover log {filename}: {e}")
-                sys.stdout.flush() # Forçar a saída
+                evento = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            if evento[0] == "texto":
+                textos.append(evento[1])
+            elif evento[0] == "estado":
+                # Mantém apenas o valor mais recente (variáveis do Tk não são hasheáveis; usa o nome Tcl)
+                valores[str(evento[1])] = (evento[1], evento[2])
+            else:
+                chamadas.append((evento[1], evento[2]))
+
+        if textos:
+            estado_anterior = str(self.output_text.cget("state"))
+            if estado_anterior == "disabled":
+                self.output_text.config(state="normal")
+            self.output_text.insert(tk.END, "".join(textos))
+            self._cortar_console()
+            self.output_text.see(tk.END)
+            if estado_anterior == "disabled":
+                self.output_text.config(state="disabled")
+        for variavel, valor in valores.values():
+            variavel.set(valor)
+        for funcao, args in chamadas:
+            funcao(*args)
+        return len(textos)
+
+    def _cortar_console(self):
+        """Remove do início do console as linhas além de 'linhas_max', em um único 'delete'."""
+        # A saída termina em '\n', então 'end-1c' aponta para uma linha vazia após a última
+        linhas = int(self.output_text.index("end-1c").split(".")[0]) - 1
+        if linhas > self.linhas_max + FOLGA_CONSOLE:
+            self.output_text.delete("1.0", f"{linhas - self.linhas_max + 1}.0")
 
 
 class CloudEaseApp:
-    def __init__(self):
-        self.processo = None
+    def __init__(self, medir_inicio=False):
+        self.tarefa = None # TarefaSincronizacao da tela em andamento
         self.sincronizando = False
-        self.perfis = carregar_json(ARQ_PERFIS)
-
-        limpar_logs_antigos(DIAS_MANTER_LOGS)
+        self.perfis = carregar_json(ARQ_PERFIS, lambda: messagebox.showwarning(
+            "Erro no arquivo de perfis", "O arquivo de perfis está corrompido ou vazio. Criando um novo."))
+        self.medir_inicio = medir_inicio
 
         self.janela = tk.Tk()
         self.janela.title("CloudEase")
@@ -156,6 +141,19 @@ class CloudEaseApp:
 
         self.status_var = tk.StringVar(value="Pronto")
         self.modo_var = tk.StringVar(value="copy")
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.fragmentos_var = tk.StringVar(value="1")
+        self.ajuste_var = tk.BooleanVar(value=False)
+        self.separar_tamanhos_var = tk.BooleanVar(value=False)
+        self.pre_varredura_var = tk.BooleanVar(value=False)
+        self.filtros_lixo_vars = {nome: tk.BooleanVar(value=False) for nome in FILTROS_LIXO}
+        self.regras_exclusao = [] # Padrões de exclusão próprios da tela/perfil (além dos filtros prontos)
+        self.agrupar_pequenos_var = tk.BooleanVar(value=False)
+        self.pacote_limite_kib_var = tk.StringVar(value=str(PACOTE_LIMITE_KIB_PADRAO))
+        self.pacote_min_arquivos_var = tk.StringVar(value=str(PACOTE_MIN_ARQUIVOS_PADRAO))
+        self.pacote_percentual_var = tk.StringVar(value=str(PACOTE_PERCENTUAL_PEQUENOS_PADRAO))
+        self.banda_ao_vivo_var = tk.IntVar(value=0)
+        self.perfil_atual = None # Nome do último perfil carregado (para o modo incremental)
 
         self.velocidade_var = tk.StringVar(value="Velocidade: -")
         self.tempo_var = tk.StringVar(value="Tempo decorrido: 0m 0s")
@@ -163,12 +161,113 @@ class CloudEaseApp:
         self.transferido_var = tk.StringVar(value="Transferido: - / - MiB")
         self.progresso_var = tk.DoubleVar(value=0)
 
+        # O daemon é iniciado em segundo plano; até lá (ou se falhar) as operações usam processos rclone avulsos
+        self.daemon = DaemonRclone() if USAR_DAEMON_RCLONE else None
+        self.fila_tarefas = FilaSincronizacao()
+        self.janela.protocol("WM_DELETE_WINDOW", self._ao_fechar)
+
         self.setup_ui()
+        self.bomba = BombaAtualizacaoUI(self.janela, self.output_text)
+
+        # Limpeza de logs, verificação do rclone e listagem remota não bloqueiam a abertura da janela
+        self._tarefas_inicio_pendentes = 0
+        self._iniciar_tarefas_em_segundo_plano()
+        if self.medir_inicio:
+            self._primeira_pintura_marcada = False
+            self.janela.bind("<Map>", self._marcar_primeira_pintura, add="+")
 
+        self.janela.mainloop()
+
+    def _iniciar_tarefas_em_segundo_plano(self):
+        self._tarefa_inicio(lambda: limpar_logs_antigos(DIAS_MANTER_LOGS), None)
+
+        # A lista de pastas remotas vem do cache em disco; o OneDrive só é listado se o cache expirou
+        pastas, idade = ler_cache_pastas()
+        if pastas is not None:
+            self.combo_onedrive["values"] = pastas
+        listar = pastas is None or idade > TTL_CACHE_PASTAS_S
+        if listar:
+            self.status_var.set("Carregando pastas remotas...")
+
+        if self.daemon:
+            self._tarefa_inicio(lambda: self._preparar_daemon_e_listar(listar), self._ao_preparar_daemon)
+        else:
+            self._tarefa_inicio(verificar_rclone, self._ao_verificar_rclone)
+            if listar:
+                self._tarefa_inicio(self._listar_e_gravar_cache, self._ao_listar_pastas_inicio)
+
+    def _tarefa_inicio(self, tarefa, ao_concluir):
+        """Executa 'tarefa' numa thread e entrega o resultado a 'ao_concluir' na thread do Tk."""
+        self._tarefas_inicio_pendentes += 1
+
+        def executar():
+            resultado = tarefa()
+            self.janela.after(0, self._concluir_tarefa_inicio, ao_concluir, resultado)
+
+        threading.Thread(target=executar, daemon=True).start()
+
+    def _concluir_tarefa_inicio(self, ao_concluir, resultado):
+        self._tarefas_inicio_pendentes -= 1
+        if self._tarefas_inicio_pendentes == 0 and self.medir_inicio:
+            print(f"Tempo até pronto: {(time.perf_counter() - INICIO_PROCESSO) * 1000:.0f} ms")
+            sys.stdout.flush() # Forçar a saída
+        if ao_concluir:
+            ao_concluir(resultado)
+
+    def _marcar_primeira_pintura(self, event):
+        if self._primeira_pintura_marcada:
+            return
+        self._primeira_pintura_marcada = True
+
+        def imprimir():
+            print(f"Tempo até a primeira pintura: {(time.perf_counter() - INICIO_PROCESSO) * 1000:.0f} ms")
+            sys.stdout.flush() # Forçar a saída
+
+        # Após o mapeamento, o desenho acontece nas tarefas ociosas do Tk
+        self.janela.after_idle(imprimir)
+
+    def _listar_e_gravar_cache(self):
+        """Lista as pastas remotas e atualiza o cache. Retorna None se a listagem falhar."""
+        try:
+            pastas = listar_pastas_remotas("onedrive:", self.daemon)
+        except Exception as e:
+            print(f"Erro ao listar pastas do OneDrive: {e}")
+            sys.stdout.flush() # Forçar a saída
+            return None
+        gravar_cache_pastas(pastas)
+        return pastas
+
+    def _preparar_daemon_e_listar(self, listar):
+        """Inicia o daemon rcd e, se 'listar', lista as pastas. Retorna (rclone_ok, pastas ou None)."""
+        if self.daemon.iniciar():
+            # Se o daemon subiu, o rclone está instalado; não é preciso outro processo para verificar
+            return True, self._listar_e_gravar_cache() if listar else None
+        self.daemon = None
         if not verificar_rclone():
+            return False, None
+        return True, self._listar_e_gravar_cache() if listar else None
+
+    def _ao_preparar_daemon(self, resultado):
+        rclone_ok, pastas = resultado
+        self._ao_listar_pastas_inicio(pastas)
+        self._ao_verificar_rclone(rclone_ok)
+
+    def _ao_verificar_rclone(self, rclone_ok):
+        if not rclone_ok:
             messagebox.showerror("Erro", "⚠️ Rclone não está instalado ou não foi encontrado no sistema. Por favor, instale-o e configure-o para o OneDrive.")
 
-        self.janela.mainloop()
+    def _ao_listar_pastas_inicio(self, pastas):
+        if pastas is not None:
+            self.combo_onedrive["values"] = pastas
+        if self.status_var.get() == "Carregando pastas remotas...":
+            self.status_var.set("Pronto")
+
+    def _ao_fechar(self):
+        """Cancela as tarefas da fila e encerra o daemon do rclone (se houver) junto com a janela."""
+        self.fila_tarefas.cancelar_todas()
+        if self.daemon:
+            self.daemon.parar()
+        self.janela.destroy()
 
     def setup_ui(self):
         main_frame = tk.Frame(self.janela, padx=10, pady=10)
@@ -184,46 +283,82 @@ class CloudEaseApp:
         self.btn_escolher_pasta_local.grid(row=1, column=1, sticky="e", padx=(5,0))
 
         tk.Label(main_frame, text="☁️ Pasta remota no OneDrive:", font=("Segoe UI", 10, "bold")).grid(row=2, column=0, sticky="w", pady=(15, 0))
-        self.combo_onedrive = ttk.Combobox(main_frame, values=listar_pastas_onedrive(), width=60, state="readonly")
+        self.combo_onedrive = ttk.Combobox(main_frame, values=[], width=60, state="readonly")
         self.combo_onedrive.grid(row=3, column=0, sticky="ew", pady=5)
         self.btn_atualizar_pastas_remotas = tk.Button(main_frame, text="🔄 Atualizar pastas remotas", command=self.atualizar_combo_onedrive, relief=tk.RAISED, bd=2)
         self.btn_atualizar_pastas_remotas.grid(row=3, column=1, sticky="e", padx=(5,0))
 
-        self.btn_criar_pasta_onedrive = tk.Button(main_frame, text="➕ Criar nova pasta no OneDrive", command=self.criar_nova_pasta_onedrive, relief=tk.RAISED, bd=2)
-        self.btn_criar_pasta_onedrive.grid(row=4, column=0, columnspan=2, pady=5)
+        remote_buttons_frame = tk.Frame(main_frame)
+        remote_buttons_frame.grid(row=4, column=0, columnspan=2, pady=5)
+        self.btn_criar_pasta_onedrive = tk.Button(remote_buttons_frame, text="➕ Criar nova pasta no OneDrive", command=self.criar_nova_pasta_onedrive, relief=tk.RAISED, bd=2)
+        self.btn_criar_pasta_onedrive.pack(side=tk.LEFT, padx=(0, 5))
+        self.btn_navegar_pastas = tk.Button(remote_buttons_frame, text="🌳 Navegar subpastas", command=self.abrir_navegador_pastas, relief=tk.RAISED, bd=2)
+        self.btn_navegar_pastas.pack(side=tk.LEFT)
 
         tk.Label(main_frame, text="🔄 Modo de operação:", font=("Segoe UI", 10, "bold")).grid(row=5, column=0, sticky="w", pady=(15, 0), columnspan=2)
-        self.radio_copy = tk.Radiobutton(main_frame, text="Copiar (seguro)", variable=self.modo_var, value="copy", font=("Segoe UI", 9))
-        self.radio_copy.grid(row=6, column=0, sticky="w")
-        self.radio_sync = tk.Radiobutton(main_frame, text="Sincronizar (espelha e apaga)", variable=self.modo_var, value="sync", font=("Segoe UI", 9))
-        self.radio_sync.grid(row=7, column=0, sticky="w")
+        copy_frame = tk.Frame(main_frame)
+        copy_frame.grid(row=6, column=0, sticky="w")
+        self.radio_copy = tk.Radiobutton(copy_frame, text="Copiar (seguro)", variable=self.modo_var, value="copy", font=("Segoe UI", 9))
+        self.radio_copy.pack(side=tk.LEFT)
+        self.check_incremental = tk.Checkbutton(copy_frame, text="Incremental (só arquivos alterados desde a última execução do perfil)", variable=self.incremental_var, font=("Segoe UI", 9))
+        self.check_incremental.pack(side=tk.LEFT, padx=(10, 0))
+        self.check_pre_varredura = tk.Checkbutton(copy_frame, text="Pré-varredura (totais exatos no progresso)", variable=self.pre_varredura_var, font=("Segoe UI", 9))
+        self.check_pre_varredura.pack(side=tk.LEFT, padx=(10, 0))
+        sync_frame = tk.Frame(main_frame)
+        sync_frame.grid(row=7, column=0, sticky="w")
+        self.radio_sync = tk.Radiobutton(sync_frame, text="Sincronizar (espelha e apaga)", variable=self.modo_var, value="sync", font=("Segoe UI", 9))
+        self.radio_sync.pack(side=tk.LEFT)
+        self.check_separar_tamanhos = tk.Checkbutton(sync_frame, text="Passadas separadas para arquivos pequenos e grandes", variable=self.separar_tamanhos_var, font=("Segoe UI", 9))
+        self.check_separar_tamanhos.pack(side=tk.LEFT, padx=(10, 0))
 
         tk.Label(main_frame, text="📶 Limite de banda upload (Mbps):", font=("Segoe UI", 10, "bold")).grid(row=8, column=0, sticky="w", pady=(15, 0), columnspan=2)
         self.bwlimit_options = ["Sem limite", "100", "200", "300", "400", "500", "600", "700", "800", "900", "1000"]
-        self.entrada_bwlimit = ttk.Combobox(main_frame, values=self.bwlimit_options, width=20, state="readonly")
+        bwlimit_frame = tk.Frame(main_frame)
+        bwlimit_frame.grid(row=9, column=0, sticky="w", pady=5)
+        self.entrada_bwlimit = ttk.Combobox(bwlimit_frame, values=self.bwlimit_options, width=20, state="readonly")
         self.entrada_bwlimit.set("Sem limite")
-        self.entrada_bwlimit.grid(row=9, column=0, sticky="w", pady=5)
-
-        tk.Label(main_frame, text="💬 Nome do perfil:", font=("Segoe UI", 10, "bold")).grid(row=10, column=0, sticky="w", pady=(15, 0))
+        self.entrada_bwlimit.pack(side=tk.LEFT)
+        tk.Label(bwlimit_frame, text="Processos paralelos (por subpasta):", font=("Segoe UI", 9)).pack(side=tk.LEFT, padx=(15, 5))
+        self.spin_fragmentos = tk.Spinbox(bwlimit_frame, from_=1, to=MAX_FRAGMENTOS, width=4, textvariable=self.fragmentos_var)
+        self.spin_fragmentos.pack(side=tk.LEFT)
+        self.check_ajuste = tk.Checkbutton(bwlimit_frame, text="Ajuste automático", variable=self.ajuste_var, font=("Segoe UI", 9))
+        self.check_ajuste.pack(side=tk.LEFT, padx=(15, 0))
+
+        horario_frame = tk.Frame(main_frame)
+        horario_frame.grid(row=10, column=0, columnspan=2, sticky="w")
+        tk.Label(horario_frame, text="🕒 Horário de banda (opcional):", font=("Segoe UI", 9)).pack(side=tk.LEFT)
+        self.entrada_horario_banda = tk.Entry(horario_frame, width=35)
+        self.entrada_horario_banda.pack(side=tk.LEFT, padx=(5, 5))
+        tk.Label(horario_frame, text="ex: 08:00,50 18:00,off (Mbps)", font=("Segoe UI", 8, "italic")).pack(side=tk.LEFT)
+        self.btn_filtros = tk.Button(horario_frame, text="🧹 Filtros de exclusão", command=self.abrir_filtros, relief=tk.RAISED, bd=2)
+        self.btn_filtros.pack(side=tk.LEFT, padx=(15, 0))
+        self.btn_pacotes = tk.Button(horario_frame, text="📦 Pacotes de arquivos pequenos", command=self.abrir_pacotes, relief=tk.RAISED, bd=2)
+        self.btn_pacotes.pack(side=tk.LEFT, padx=(5, 0))
+
+        tk.Label(main_frame, text="💬 Nome do perfil:", font=("Segoe UI", 10, "bold")).grid(row=11, column=0, sticky="w", pady=(15, 0))
         self.entrada_nome_perfil = tk.Entry(main_frame, width=60)
-        self.entrada_nome_perfil.grid(row=11, column=0, sticky="ew", pady=5)
+        self.entrada_nome_perfil.grid(row=12, column=0, sticky="ew", pady=5)
         self.btn_salvar_perfil = tk.Button(main_frame, text="💾 Salvar perfil", command=self.salvar_perfil, relief=tk.RAISED, bd=2)
-        self.btn_salvar_perfil.grid(row=11, column=1, sticky="e", padx=(5,0))
+        self.btn_salvar_perfil.grid(row=12, column=1, sticky="e", padx=(5,0))
 
-        tk.Label(main_frame, text="📂 Selecionar perfil salvo:", font=("Segoe UI", 10, "bold")).grid(row=12, column=0, sticky="w", pady=(10, 0))
+        tk.Label(main_frame, text="📂 Selecionar perfil salvo:", font=("Segoe UI", 10, "bold")).grid(row=13, column=0, sticky="w", pady=(10, 0))
         self.combo_perfis = ttk.Combobox(main_frame, values=list(self.perfis.keys()), width=60, state="readonly")
-        self.combo_perfis.grid(row=13, column=0, sticky="ew", pady=5)
+        self.combo_perfis.grid(row=14, column=0, sticky="ew", pady=5)
         
         profile_buttons_frame = tk.Frame(main_frame)
-        profile_buttons_frame.grid(row=13, column=1, sticky="e", padx=(5,0))
+        profile_buttons_frame.grid(row=14, column=1, sticky="e", padx=(5,0))
         self.btn_carregar_perfil = tk.Button(profile_buttons_frame, text="📁 Carregar perfil", command=self.carregar_perfil, relief=tk.RAISED, bd=2)
         self.btn_carregar_perfil.pack(side=tk.LEFT, padx=(0, 5))
         self.btn_deletar_perfil = tk.Button(profile_buttons_frame, text="❌ Deletar perfil", command=self.deletar_perfil, relief=tk.RAISED, bd=2)
         self.btn_deletar_perfil.pack(side=tk.LEFT)
 
         # Botão para Abrir Log Mais Recente
-        self.btn_abrir_log = tk.Button(main_frame, text="📄 Abrir Log Mais Recente", command=self.abrir_log_mais_recente, relief=tk.RAISED, bd=2)
-        self.btn_abrir_log.grid(row=14, column=0, columnspan=2, pady=(5, 10)) # Nova linha para o botão de log
+        log_buttons_frame = tk.Frame(main_frame)
+        log_buttons_frame.grid(row=15, column=0, columnspan=2, pady=(5, 10)) # Nova linha para o botão de log
+        self.btn_abrir_log = tk.Button(log_buttons_frame, text="📄 Abrir Log Mais Recente", command=self.abrir_log_mais_recente, relief=tk.RAISED, bd=2)
+        self.btn_abrir_log.pack(side=tk.LEFT, padx=(0, 5))
+        self.btn_fila_perfis = tk.Button(log_buttons_frame, text="📋 Fila de perfis", command=self.abrir_fila_perfis, relief=tk.RAISED, bd=2)
+        self.btn_fila_perfis.pack(side=tk.LEFT)
 
         # O único botão de iniciar/parar (linhas seguintes ajustadas)
         self.botao_iniciar = tk.Button(
@@ -233,26 +368,34 @@ class CloudEaseApp:
             bg="#0078D7", fg="white", font=("Segoe UI", 11, "bold"),
             relief=tk.RAISED, bd=3
         )
-        self.botao_iniciar.grid(row=15, column=0, columnspan=2, pady=(20, 10)) # Ajustado o row
+        self.botao_iniciar.grid(row=16, column=0, columnspan=2, pady=(20, 10)) # Ajustado o row
 
-        tk.Label(main_frame, textvariable=self.status_var, font=("Segoe UI", 10, "italic")).grid(row=16, column=0, columnspan=2, pady=(10, 5)) # Ajustado o row
+        tk.Label(main_frame, textvariable=self.status_var, font=("Segoe UI", 10, "italic")).grid(row=17, column=0, columnspan=2, pady=(10, 5)) # Ajustado o row
 
-        tk.Label(main_frame, textvariable=self.transferido_var, font=("Segoe UI", 9)).grid(row=17, column=0, sticky="w", columnspan=2) # Ajustado o row
-        tk.Label(main_frame, textvariable=self.velocidade_var, font=("Segoe UI", 9)).grid(row=18, column=0, sticky="w", columnspan=2) # Ajustado o row
-        tk.Label(main_frame, textvariable=self.eta_var, font=("Segoe UI", 9)).grid(row=19, column=0, sticky="w", columnspan=2) # Ajustado o row
-        tk.Label(main_frame, textvariable=self.tempo_var, font=("Segoe UI", 9)).grid(row=20, column=0, sticky="w", columnspan=2) # Ajustado o row
+        tk.Label(main_frame, textvariable=self.transferido_var, font=("Segoe UI", 9)).grid(row=18, column=0, sticky="w") # Ajustado o row
+        tk.Label(main_frame, textvariable=self.velocidade_var, font=("Segoe UI", 9)).grid(row=19, column=0, sticky="w") # Ajustado o row
+        tk.Label(main_frame, textvariable=self.eta_var, font=("Segoe UI", 9)).grid(row=20, column=0, sticky="w") # Ajustado o row
+        tk.Label(main_frame, textvariable=self.tempo_var, font=("Segoe UI", 9)).grid(row=21, column=0, sticky="w") # Ajustado o row
+
+        # Limite de banda da execução em andamento, aplicado pelo rc (core/bwlimit) sem reiniciar o rclone
+        banda_frame = tk.Frame(main_frame)
+        banda_frame.grid(row=18, column=1, rowspan=4, sticky="e")
+        tk.Label(banda_frame, text="Banda agora (Mbps, 0 = sem limite):", font=("Segoe UI", 8)).pack()
+        self.escala_banda = tk.Scale(banda_frame, from_=0, to=1000, resolution=10, orient=tk.HORIZONTAL, length=180, variable=self.banda_ao_vivo_var)
+        self.escala_banda.pack()
+        self.escala_banda.bind("<ButtonRelease-1>", self._aplicar_banda_ao_vivo)
 
         self.progressbar = ttk.Progressbar(main_frame, variable=self.progresso_var, maximum=100, mode='determinate')
-        self.progressbar.grid(row=21, column=0, columnspan=2, sticky="ew", pady=(5, 10)) # Ajustado o row
+        self.progressbar.grid(row=22, column=0, columnspan=2, sticky="ew", pady=(5, 10)) # Ajustado o row
 
-        tk.Label(main_frame, text="Saída do Rclone:", font=("Segoe UI", 10, "bold")).grid(row=22, column=0, sticky="w", pady=(10, 0), columnspan=2) # Ajustado o row
+        tk.Label(main_frame, text="Saída do Rclone:", font=("Segoe UI", 10, "bold")).grid(row=23, column=0, sticky="w", pady=(10, 0), columnspan=2) # Ajustado o row
         self.output_text = tk.Text(main_frame, height=10, state="disabled", wrap="word", font=("Consolas", 8))
-        self.output_text.grid(row=23, column=0, columnspan=2, sticky="nsew") # Ajustado o row
+        self.output_text.grid(row=24, column=0, columnspan=2, sticky="nsew") # Ajustado o row
         self.output_scrollbar = tk.Scrollbar(main_frame, command=self.output_text.yview)
-        self.output_scrollbar.grid(row=23, column=2, sticky="ns") # Ajustado o row
+        self.output_scrollbar.grid(row=24, column=2, sticky="ns") # Ajustado o row
         self.output_text.config(yscrollcommand=self.output_scrollbar.set)
 
-        main_frame.rowconfigure(23, weight=1) # Ajustado o row
+        main_frame.rowconfigure(24, weight=1) # Ajustado o row
 
         # Removido as linhas de texto sobre a configuração do rclone
         # tk.Label(main_frame, text="Se o rclone não estiver configurado para o OneDrive, execute:", font=("Segoe UI", 9, "italic")).grid(row=24, column=0, sticky="w", pady=(10, 0), columnspan=2)
@@ -266,9 +409,18 @@ class CloudEaseApp:
             self.btn_escolher_pasta_local,
             self.btn_atualizar_pastas_remotas,
             self.btn_criar_pasta_onedrive,
+            self.btn_navegar_pastas,
             self.radio_copy,
+            self.check_incremental,
             self.radio_sync,
+            self.check_separar_tamanhos,
+            self.check_pre_varredura,
+            self.btn_filtros,
+            self.btn_pacotes,
             self.entrada_bwlimit,
+            self.entrada_horario_banda,
+            self.spin_fragmentos,
+            self.check_ajuste,
             self.entrada_nome_perfil,
             self.btn_salvar_perfil,
             self.combo_perfis,
@@ -283,9 +435,135 @@ class CloudEaseApp:
                 widget.config(state=state)
 
     def atualizar_combo_onedrive(self):
-        self.combo_onedrive["values"] = listar_pastas_onedrive()
+        """Lista o OneDrive novamente em segundo plano e atualiza o cache e a lista de pastas."""
+        self.btn_atualizar_pastas_remotas.config(state="disabled")
+        self.status_var.set("Atualizando pastas remotas...")
+
+        def atualizar_thread():
+            pastas = self._listar_e_gravar_cache()
+            self.janela.after(0, self._ao_atualizar_combo_onedrive, pastas)
+
+        threading.Thread(target=atualizar_thread, daemon=True).start()
+
+    def _ao_atualizar_combo_onedrive(self, pastas):
+        if pastas is not None:
+            self.combo_onedrive["values"] = pastas
+            self.status_var.set("Pronto")
+        else:
+            self.status_var.set("Erro ao listar pastas remotas")
+        if not self.sincronizando:
+            self.btn_atualizar_pastas_remotas.config(state="normal")
+
+    def _adicionar_pasta_combo(self, pasta, pastas_cache):
+        """Inclui na lista uma pasta recém-criada, sem listar o OneDrive de novo."""
+        if pastas_cache is None:
+            pastas_cache = list(self.combo_onedrive["values"])
+            if pasta not in pastas_cache:
+                pastas_cache.append(pasta)
+        self.combo_onedrive["values"] = pastas_cache
+
+    def _listador(self):
+        """Listador de níveis do OneDrive compartilhado pelo navegador e pela validação de subpastas."""
+        if getattr(self, "listador_niveis", None) is None:
+            self.listador_niveis = ListadorNiveisRemotos("onedrive:")
+            pastas, idade = ler_cache_pastas()
+            if pastas is not None and idade <= TTL_CACHE_PASTAS_S:
+                self.listador_niveis.memorizar("", pastas)
+        self.listador_niveis.daemon = self.daemon
+        return self.listador_niveis
+
+    def abrir_navegador_pastas(self):
+        """
+        Abre uma árvore das pastas do OneDrive que lista cada nível só quando ele é expandido.
+        A pasta escolhida (de qualquer profundidade) vai para o campo de pasta remota.
+        """
+        listador = self._listador()
+        navegador = tk.Toplevel(self.janela)
+        navegador.title("Pastas no OneDrive")
+        navegador.geometry("450x500")
+        navegador.transient(self.janela)
+
+        arvore = ttk.Treeview(navegador, show="tree", selectmode="browse")
+        scrollbar = tk.Scrollbar(navegador, command=arvore.yview)
+        arvore.config(yscrollcommand=scrollbar.set)
+        status_nav = tk.StringVar(value="Carregando...")
+        botoes = tk.Frame(navegador)
+        botoes.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
+        tk.Label(navegador, textvariable=status_nav, font=("Segoe UI", 9, "italic")).pack(side=tk.BOTTOM, anchor="w", padx=10)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        arvore.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(10, 0), pady=(10, 0))
+
+        carregados = set()
+        placeholder = "\0carregando" # Sufixo dos itens provisórios que tornam um nó expansível
+
+        def preencher(caminho, pastas, erro):
+            if not navegador.winfo_exists():
+                return
+            if erro is not None:
+                carregados.discard(caminho)
+                status_nav.set(f"Erro ao listar '{caminho or 'onedrive:'}': {erro}")
+                return
+            if caminho and arvore.exists(caminho + placeholder):
+                arvore.delete(caminho + placeholder)
+            for pasta in pastas:
+                if not arvore.exists(pasta):
+                    arvore.insert(caminho, tk.END, iid=pasta, text="📁 " + pasta.rpartition("/")[2])
+                    arvore.insert(pasta, tk.END, iid=pasta + placeholder, text="Carregando...")
+            status_nav.set(f"{len(pastas)} pasta(s) em '{caminho or 'onedrive:'}'")
+
+        def carregar(caminho):
+            if caminho in carregados:
+                return
+            carregados.add(caminho)
+
+            def carregar_thread():
+                try:
+                    pastas, erro = listador.listar(caminho), None
+                except Exception as e:
+                    pastas, erro = [], e
+                self.janela.after(0, preencher, caminho, pastas, erro)
+
+            threading.Thread(target=carregar_thread, daemon=True).start()
+
+        def ao_expandir(event):
+            caminho = arvore.focus()
+            if caminho and not caminho.endswith(placeholder):
+                carregar(caminho)
+
+        def selecionar(event=None):
+            caminho = arvore.focus()
+            if not caminho or caminho.endswith(placeholder):
+                messagebox.showwarning("Atenção", "Selecione uma pasta.", parent=navegador)
+                return
+            self.combo_onedrive.set(caminho)
+            navegador.destroy()
+
+        arvore.bind("<<TreeviewOpen>>", ao_expandir)
+        arvore.bind("<Double-1>", selecionar)
+        tk.Button(botoes, text="✔️ Usar esta pasta", command=selecionar, relief=tk.RAISED, bd=2).pack(side=tk.RIGHT)
+        tk.Button(botoes, text="Fechar", command=navegador.destroy, relief=tk.RAISED, bd=2).pack(side=tk.RIGHT, padx=(0, 5))
+
+        carregar("")
+
+    def _pasta_remota_existe(self, pasta):
+        """Verifica a pasta no cache; o OneDrive só é listado se ela não estiver lá."""
+        if "/" in pasta:
+            # Subpasta: basta listar o nível pai (memorizado pelo navegador de pastas)
+            try:
+                return pasta in self._listador().listar(pasta.rpartition("/")[0])
+            except Exception:
+                return False
+        pastas, _ = ler_cache_pastas()
+        if pastas is not None and pasta in pastas:
+            return True
+        pastas = self._listar_e_gravar_cache()
+        if pastas is None:
+            return False
+        self.combo_onedrive["values"] = pastas
+        return pasta in pastas
 
     def escolher_pasta_local(self):
+        from tkinter import filedialog # Diálogos usados só sob demanda não pesam na abertura da janela
         caminho = filedialog.askdirectory()
         if caminho:
             self.entrada_origem.delete(0, tk.END)
@@ -303,12 +581,16 @@ class CloudEaseApp:
                 messagebox.showinfo("Operação Cancelada", "A operação de salvar perfil foi cancelada.")
                 return
 
-        self.perfis[nome] = {
-            "origem": self.entrada_origem.get(),
-            "destino": self.combo_onedrive.get(),
-            "modo": self.modo_var.get(),
-            "bwlimit": self.entrada_bwlimit.get().strip()
-        }
+        # Mantém os campos que não são editados na tela (ex: datas do modo incremental)
+        perfil = dict(self.perfis.get(nome, {}))
+        if perfil.get("origem") != self.entrada_origem.get() or perfil.get("destino") != self.combo_onedrive.get():
+            # Outra origem/destino: o histórico de execuções do perfil antigo não vale mais
+            perfil.pop("ultima_sincronizacao", None)
+            perfil.pop("ultima_reconciliacao", None)
+            perfil.pop("ajuste", None)
+            perfil.pop("vazao_historica", None)
+        perfil.update(self._opcoes_tela())
+        self.perfis[nome] = perfil
         salvar_json(ARQ_PERFIS, self.perfis)
         self.atualizar_lista_perfis()
         self.entrada_nome_perfil.delete(0, tk.END)
@@ -326,10 +608,314 @@ class CloudEaseApp:
             if bwlimit_val not in self.bwlimit_options:
                 bwlimit_val = "Sem limite"
             self.entrada_bwlimit.set(bwlimit_val)
+            self.entrada_horario_banda.delete(0, tk.END)
+            self.entrada_horario_banda.insert(0, dados.get("bwlimit_horario", ""))
+            self.incremental_var.set(dados.get("incremental", False))
+            self.fragmentos_var.set(str(converter_fragmentos(dados.get("fragmentos", 1))))
+            self.ajuste_var.set(dados.get("ajuste_automatico", False))
+            self.separar_tamanhos_var.set(dados.get("separar_tamanhos", False))
+            self.pre_varredura_var.set(dados.get("pre_varredura", False))
+            for nome, var in self.filtros_lixo_vars.items():
+                var.set(nome in dados.get("filtros_lixo", []))
+            self.regras_exclusao = list(dados.get("regras_exclusao", []))
+            self.agrupar_pequenos_var.set(dados.get("agrupar_pequenos", False))
+            limite_bytes, min_arquivos, fracao = opcoes_pacotes(dados)
+            self.pacote_limite_kib_var.set(str(limite_bytes // 1024))
+            self.pacote_min_arquivos_var.set(str(min_arquivos))
+            self.pacote_percentual_var.set(str(round(fracao * 100)))
+            self.perfil_atual = nome
             messagebox.showinfo("Perfil Carregado", f"Perfil '{nome}' carregado com sucesso!")
         else:
             messagebox.showwarning("Atenção", "Selecione um perfil para carregar.")
 
+    def _perfil_da_execucao(self, origem, destino_pasta, modo):
+        """
+        Retorna (nome, cópia do perfil) do perfil carregado se a tela ainda corresponde a ele,
+        ou (None, None) para uma execução avulsa. As opções incremental e de ajuste automático vêm da tela.
+        """
+        perfil = self.perfis.get(self.perfil_atual)
+        if not perfil or perfil.get("origem", "").replace("\\", "/") != origem \
+                or perfil.get("destino") != destino_pasta or perfil.get("modo") != modo:
+            return None, None
+        perfil = dict(perfil)
+        perfil["incremental"] = self.incremental_var.get()
+        perfil["ajuste_automatico"] = self.ajuste_var.get()
+        return self.perfil_atual, perfil
+
+    def _opcoes_tela(self):
+        """Opções de sincronização da tela, com as chaves usadas em perfis.json."""
+        return {
+            "origem": self.entrada_origem.get(),
+            "destino": self.combo_onedrive.get(),
+            "modo": self.modo_var.get(),
+            "bwlimit": self.entrada_bwlimit.get().strip(),
+            "bwlimit_horario": self.entrada_horario_banda.get().strip(),
+            "incremental": self.incremental_var.get(),
+            "fragmentos": converter_fragmentos(self.fragmentos_var.get()),
+            "ajuste_automatico": self.ajuste_var.get(),
+            "separar_tamanhos": self.separar_tamanhos_var.get(),
+            "pre_varredura": self.pre_varredura_var.get(),
+            "filtros_lixo": [nome for nome, var in self.filtros_lixo_vars.items() if var.get()],
+            "regras_exclusao": list(self.regras_exclusao),
+            **self._opcoes_pacotes_tela()
+        }
+
+    def _perfil_da_tela(self, perfil=None):
+        """
+        Perfil executado pela tela: as opções da tela sobre o perfil carregado (de _perfil_da_execucao),
+        que mantém os campos fora da tela (datas do modo incremental, ajuste automático, vazão histórica).
+        Uma execução avulsa (perfil None) não tem histórico: sem modo incremental nem ajuste automático.
+        """
+        execucao = dict(perfil or {})
+        execucao.update(self._opcoes_tela())
+        if perfil is None:
+            execucao["incremental"] = False
+            execucao["ajuste_automatico"] = False
+        return execucao
+
+    def _registrar_execucao_perfil(self, nome, inicio_iso, completa, ajustes=None, vazao=None):
+        """
+        Guarda no perfil o início da última sincronização bem-sucedida (e da última completa),
+        a vazão histórica usada pelo ETA e, com o ajuste automático, a vazão obtida com os ajustes usados.
+        """
+        if registrar_execucao_perfil(self.perfis, nome, inicio_iso, completa, ajustes, vazao):
+            salvar_json(ARQ_PERFIS, self.perfis)
+
+    def abrir_filtros(self):
+        """
+        Edita as regras de exclusão da tela: filtros prontos de FILTROS_LIXO e padrões próprios
+        no formato do rclone (um por linha). Salvar o perfil guarda as regras em perfis.json.
+        """
+        janela_filtros = tk.Toplevel(self.janela)
+        janela_filtros.title("Filtros de exclusão")
+        janela_filtros.transient(self.janela)
+        janela_filtros.grab_set()
+        quadro = tk.Frame(janela_filtros, padx=10, pady=10)
+        quadro.pack(fill=tk.BOTH, expand=True)
+
+        tk.Label(quadro, text="🧹 Filtros prontos:", font=("Segoe UI", 10, "bold")).pack(anchor="w")
+        for nome, padroes in FILTROS_LIXO.items():
+            tk.Checkbutton(quadro, text=f"{nome} ({', '.join(padroes)})", variable=self.filtros_lixo_vars[nome],
+                           font=("Segoe UI", 9), wraplength=520, justify=tk.LEFT).pack(anchor="w")
+
+        tk.Label(quadro, text="Padrões próprios (um por linha, formato do rclone):", font=("Segoe UI", 10, "bold")).pack(anchor="w", pady=(10, 0))
+        tk.Label(quadro, text="ex: *.bak   /Rascunhos/**   cache/   (sem '/' inicial vale para qualquer pasta)", font=("Segoe UI", 8, "italic")).pack(anchor="w")
+        texto_regras = tk.Text(quadro, height=8, width=60, font=("Consolas", 9))
+        texto_regras.pack(fill=tk.BOTH, expand=True, pady=5)
+        texto_regras.insert("1.0", "\n".join(self.regras_exclusao))
+
+        def aplicar():
+            regras = [linha.strip() for linha in texto_regras.get("1.0", tk.END).splitlines() if linha.strip()]
+            try:
+                FiltroExclusao(regras)
+            except ValueError as e:
+                messagebox.showerror("Regra inválida", str(e), parent=janela_filtros)
+                return
+            self.regras_exclusao = regras
+            janela_filtros.destroy()
+
+        botoes = tk.Frame(quadro)
+        botoes.pack(fill=tk.X)
+        tk.Label(botoes, text="O teste (dry-run) mostra quantos arquivos cada regra exclui.", font=("Segoe UI", 8, "italic")).pack(side=tk.LEFT)
+        tk.Button(botoes, text="OK", width=10, command=aplicar).pack(side=tk.RIGHT)
+
+    def _opcoes_pacotes_tela(self):
+        """Opções de empacotamento da tela, com as chaves usadas em perfis.json."""
+        opcoes = {
+            "pacote_limite_kib": self.pacote_limite_kib_var.get(),
+            "pacote_min_arquivos": self.pacote_min_arquivos_var.get(),
+            "pacote_percentual_pequenos": self.pacote_percentual_var.get(),
+        }
+        limite_bytes, min_arquivos, fracao = opcoes_pacotes(opcoes)
+        return {
+            "agrupar_pequenos": self.agrupar_pequenos_var.get(),
+            "pacote_limite_kib": limite_bytes // 1024,
+            "pacote_min_arquivos": min_arquivos,
+            "pacote_percentual_pequenos": round(fracao * 100),
+        }
+
+    def abrir_pacotes(self):
+        """Opções do empacotamento de pastas com muitos arquivos pequenos (salvas com o perfil)."""
+        janela_pacotes = tk.Toplevel(self.janela)
+        janela_pacotes.title("Pacotes de arquivos pequenos")
+        janela_pacotes.transient(self.janela)
+        janela_pacotes.grab_set()
+        quadro = tk.Frame(janela_pacotes, padx=10, pady=10)
+        quadro.pack(fill=tk.BOTH, expand=True)
+
+        tk.Checkbutton(quadro, text="Empacotar pastas com muitos arquivos pequenos (.tar) antes de enviar",
+                       variable=self.agrupar_pequenos_var, font=("Segoe UI", 9, "bold")).grid(row=0, column=0, columnspan=2, sticky="w")
+        campos = (
+            ("Arquivo pequeno: até (KiB)", self.pacote_limite_kib_var),
+            ("Mínimo de arquivos na pasta", self.pacote_min_arquivos_var),
+            ("Mínimo de arquivos pequenos (%)", self.pacote_percentual_var),
+        )
+        for linha, (rotulo, variavel) in enumerate(campos, 1):
+            tk.Label(quadro, text=rotulo, font=("Segoe UI", 9)).grid(row=linha, column=0, sticky="w", pady=2)
+            tk.Entry(quadro, textvariable=variavel, width=10).grid(row=linha, column=1, sticky="w", padx=(10, 0))
+        tk.Label(quadro, text=f"Cada pasta vira um {NOME_PACOTE} dentro da própria pasta no OneDrive.\n"
+                              f"Para restaurar, baixe a pasta e execute: python CloudEase.py --desempacotar PASTA",
+                 font=("Segoe UI", 8, "italic"), justify=tk.LEFT).grid(row=len(campos) + 1, column=0, columnspan=2, sticky="w", pady=(10, 5))
+
+        def aplicar():
+            # Normaliza os valores digitados (fora dos limites ou inválidos voltam ao padrão)
+            opcoes = self._opcoes_pacotes_tela()
+            self.pacote_limite_kib_var.set(str(opcoes["pacote_limite_kib"]))
+            self.pacote_min_arquivos_var.set(str(opcoes["pacote_min_arquivos"]))
+            self.pacote_percentual_var.set(str(opcoes["pacote_percentual_pequenos"]))
+            janela_pacotes.destroy()
+
+        tk.Button(quadro, text="OK", width=10, command=aplicar).grid(row=len(campos) + 2, column=1, sticky="e")
+
+    def abrir_fila_perfis(self):
+        """
+        Abre a fila de perfis: vários perfis salvos podem ser enfileirados e executados
+        (sincronização real) com um número máximo de processos rclone simultâneos.
+        Com um servidor do CloudEase em SERVIDOR_FILA, a janela é um cliente dele: mostra e
+        controla as tarefas do servidor, que continuam rodando depois que a janela é fechada.
+        """
+        if getattr(self, "janela_fila", None) is not None and self.janela_fila.winfo_exists():
+            self.janela_fila.lift()
+            return
+        fila = self.fila_tarefas
+        nomes_perfis = list(self.perfis)
+        titulo = "Fila de perfis"
+        remota = False
+        if SERVIDOR_FILA:
+            from cloudease.servidor import ClienteServidor, FilaRemota
+            cliente = ClienteServidor(SERVIDOR_FILA)
+            if cliente.disponivel():
+                try:
+                    fila = FilaRemota(cliente)
+                    nomes_perfis = [perfil["nome"] for perfil in cliente.chamar("GET", "perfis")]
+                    titulo = f"Fila de perfis (servidor {SERVIDOR_FILA})"
+                    remota = True
+                except (OSError, RuntimeError, ValueError) as e:
+                    fila = self.fila_tarefas
+                    print(f"Servidor em {SERVIDOR_FILA} indisponível, usando a fila local: {e}")
+                    sys.stdout.flush() # Forçar a saída
+        self.janela_fila = janela_fila = tk.Toplevel(self.janela)
+        janela_fila.title(titulo)
+        janela_fila.geometry("620x480")
+        janela_fila.transient(self.janela)
+
+        topo = tk.Frame(janela_fila, padx=10, pady=10)
+        topo.pack(fill=tk.X)
+        tk.Label(topo, text="📂 Perfis salvos (selecione um ou mais):", font=("Segoe UI", 10, "bold")).pack(anchor="w")
+        lista_perfis = tk.Listbox(topo, selectmode=tk.EXTENDED, height=6, exportselection=False)
+        lista_perfis.pack(fill=tk.X, pady=5)
+        for nome in nomes_perfis:
+            lista_perfis.insert(tk.END, nome)
+
+        controles = tk.Frame(topo)
+        controles.pack(fill=tk.X)
+        tk.Label(controles, text="Máx. simultâneas:", font=("Segoe UI", 9)).pack(side=tk.LEFT)
+        max_var = tk.StringVar(value=str(fila.max_simultaneas))
+        tk.Spinbox(controles, from_=1, to=8, width=4, textvariable=max_var, state="readonly",
+                   command=lambda: fila.definir_max_simultaneas(max_var.get())).pack(side=tk.LEFT, padx=(5, 10))
+
+        colunas = ("perfil", "estado", "transferido", "velocidade", "eta")
+        tabela = ttk.Treeview(janela_fila, columns=colunas, show="headings", selectmode="browse")
+        for coluna, titulo, largura in zip(colunas, ("Perfil", "Estado", "Transferido", "Velocidade", "ETA"), (140, 100, 150, 100, 80)):
+            tabela.heading(coluna, text=titulo)
+            tabela.column(coluna, width=largura)
+
+        def adicionar():
+            nomes = [lista_perfis.get(i) for i in lista_perfis.curselection()]
+            if not nomes:
+                messagebox.showwarning("Atenção", "Selecione ao menos um perfil.", parent=janela_fila)
+                return
+            ignorados = []
+            for nome in nomes:
+                if remota:
+                    try:
+                        fila.adicionar_perfil(nome)
+                    except (OSError, RuntimeError, ValueError):
+                        ignorados.append(nome)
+                    continue
+                if nome not in self.perfis or fila.em_andamento(nome):
+                    ignorados.append(nome)
+                    continue
+                fila.adicionar(TarefaSincronizacao(nome, self.perfis[nome], self.daemon, self._ao_concluir_tarefa))
+            if ignorados:
+                messagebox.showinfo("Fila de perfis", "Já estão na fila: " + ", ".join(ignorados), parent=janela_fila)
+            atualizar_tabela()
+
+        def tarefa_selecionada(acao):
+            # As linhas são identificadas pelo id da tarefa: a lista muda entre as atualizações da tabela
+            selecionado = tabela.focus()
+            if not selecionado:
+                messagebox.showwarning("Atenção", f"Selecione uma tarefa para {acao}.", parent=janela_fila)
+                return None
+            tarefa = next((t for t in fila.tarefas if str(t.id) == selecionado), None)
+            if tarefa is None:
+                messagebox.showinfo("Fila de perfis", "A tarefa selecionada não está mais na fila.", parent=janela_fila)
+            return tarefa
+
+        def cancelar():
+            tarefa = tarefa_selecionada("cancelar")
+            if tarefa is not None:
+                tarefa.cancelar()
+
+        def pausar():
+            tarefa = tarefa_selecionada("pausar")
+            if tarefa is not None and not tarefa.pausar():
+                messagebox.showinfo("Fila de perfis", "A tarefa já terminou.", parent=janela_fila)
+
+        def retomar():
+            # A retomada executa o perfil de novo; o rclone pula o que já foi enviado
+            tarefa = tarefa_selecionada("retomar")
+            if tarefa is not None and fila.retomar(tarefa) is None:
+                messagebox.showinfo("Fila de perfis", "Só tarefas pausadas podem ser retomadas, e o perfil não pode estar em andamento.",
+                                    parent=janela_fila)
+
+        def limpar():
+            fila.remover_finalizadas()
+            atualizar_tabela()
+
+        tk.Button(controles, text="➕ Adicionar à fila", command=adicionar, relief=tk.RAISED, bd=2).pack(side=tk.LEFT)
+
+        botoes = tk.Frame(janela_fila, padx=10, pady=10)
+        botoes.pack(side=tk.BOTTOM, fill=tk.X)
+        tk.Button(botoes, text="⏹ Cancelar tarefa", command=cancelar, relief=tk.RAISED, bd=2).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Button(botoes, text="⏸ Pausar", command=pausar, relief=tk.RAISED, bd=2).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Button(botoes, text="▶ Retomar", command=retomar, relief=tk.RAISED, bd=2).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Button(botoes, text="🧹 Limpar finalizadas", command=limpar, relief=tk.RAISED, bd=2).pack(side=tk.LEFT)
+        tabela.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        def atualizar_tabela():
+            if not janela_fila.winfo_exists():
+                return
+            selecionado = tabela.focus()
+            tabela.delete(*tabela.get_children())
+            for tarefa in list(fila.tarefas):
+                estado, campos = tarefa.progresso()
+                if tarefa.alerta:
+                    estado = f"⚠️ {estado}" # Sem progresso há pelo menos uma janela do vigia
+                if campos is not None:
+                    transferido, total, porcentagem, velocidade, eta = campos
+                    valores = (tarefa.nome_perfil, f"{estado} ({porcentagem}%)", f"{transferido} / {total} MiB", velocidade, eta)
+                else:
+                    valores = (tarefa.nome_perfil, estado, "-", "-", "-")
+                tabela.insert("", tk.END, iid=str(tarefa.id), values=valores)
+            if selecionado and tabela.exists(selecionado):
+                tabela.focus(selecionado)
+                tabela.selection_set(selecionado)
+
+        def ciclo():
+            if janela_fila.winfo_exists():
+                atualizar_tabela()
+                janela_fila.after(INTERVALO_FILA_MS, ciclo)
+            elif remota:
+                fila.fechar()
+
+        ciclo()
+
+    def _ao_concluir_tarefa(self, tarefa, inicio_iso, completa):
+        """Chamado na thread da tarefa (da fila ou da tela): registra a execução no perfil pela thread do Tk."""
+        self.janela.after(0, self._registrar_execucao_perfil, tarefa.nome_perfil, inicio_iso, completa,
+                          tarefa.ajustes, tarefa.amostrador.vazao())
+
     def atualizar_lista_perfis(self):
         self.combo_perfis["values"] = list(self.perfis.keys())
 
@@ -338,6 +924,8 @@ class CloudEaseApp:
         if nome in self.perfis:
             if messagebox.askyesno("Confirmar", f"Deseja apagar o perfil '{nome}'?"):
                 del self.perfis[nome]
+                if self.perfil_atual == nome:
+                    self.perfil_atual = None
                 salvar_json(ARQ_PERFIS, self.perfis)
                 self.atualizar_lista_perfis()
                 self.combo_perfis.set("")
@@ -419,8 +1007,8 @@ class CloudEaseApp:
 
     def format_eta(self, eta_str):
         """
-        Formata a string ETA do rclone (ex: '1h2m3s', '1m2s', '5s', '-')
-        para um formato mais legível (ex: '1 hora, 2 minutos e 3 segundos').
+        Formata um ETA no formato do rclone (ex: '1h2m3s', '1m2s', '5s', '-'; o do EstimadorEta
+        chega por segundos_para_eta) para um formato mais legível (ex: '1 hora, 2 minutos e 3 segundos').
         """
         if eta_str == '-':
             return "ETA: -"
@@ -472,6 +1060,7 @@ class CloudEaseApp:
 
 
     def criar_nova_pasta_onedrive(self):
+        from tkinter import simpledialog
         nova_pasta = simpledialog.askstring("Criar Nova Pasta", "Digite o nome da nova pasta no OneDrive:")
         if nova_pasta:
             nova_pasta = nova_pasta.strip()
@@ -485,20 +1074,32 @@ class CloudEaseApp:
 
             def criar_pasta_thread():
                 try:
-                    comando = ["rclone", "mkdir", f"onedrive:{nova_pasta}"]
-                    
-                    processo_mkdir = subprocess.run(
-                        comando,
-                        capture_output=True, text=True, encoding="utf-8", check=False
-                    )
-
-                    if processo_mkdir.returncode == 0:
+                    if self.daemon and self.daemon.ativo():
+                        try:
+                            self.daemon.criar_pasta("onedrive:", nova_pasta)
+                            codigo, erro_msg = 0, ""
+                        except RuntimeError as e:
+                            codigo, erro_msg = 1, str(e)
+                    else:
+                        comando = ["rclone", "mkdir", f"onedrive:{nova_pasta}"]
+
+                        processo_mkdir = subprocess.run(
+                            comando,
+                            capture_output=True, text=True, encoding="utf-8", check=False
+                        )
+                        codigo, erro_msg = processo_mkdir.returncode, processo_mkdir.stderr.strip()
+
+                    if codigo == 0:
                         self.janela.after(0, lambda: messagebox.showinfo("Sucesso", f"Pasta '{nova_pasta}' criada com sucesso no OneDrive!"))
-                        self.janela.after(0, self.atualizar_combo_onedrive)
+                        # O cache e a lista guardam só o primeiro nível; subpastas vão para o listador de níveis
+                        partes = nova_pasta.split("/")
+                        for i in range(1, len(partes) + 1):
+                            self._listador().registrar_pasta("/".join(partes[:i]))
+                        pastas_cache = adicionar_pasta_cache(partes[0])
+                        self.janela.after(0, self._adicionar_pasta_combo, partes[0], pastas_cache)
                         self.janela.after(0, self.combo_onedrive.set, nova_pasta)
                         self.janela.after(0, self.status_var.set, "Pronto")
                     else:
-                        erro_msg = processo_mkdir.stderr.strip()
                         self.janela.after(0, lambda: messagebox.showerror("Erro ao Criar Pasta", f"Não foi possível criar a pasta '{nova_pasta}'.\nErro: {erro_msg}"))
                         self.janela.after(0, self.status_var.set, "Erro ao criar pasta")
                 except Exception as e:
@@ -531,7 +1132,7 @@ class CloudEaseApp:
                 self._reset_ui_buttons()
                 return
 
-            if destino_pasta and destino_pasta not in listar_pastas_onedrive():
+            if destino_pasta and not self._pasta_remota_existe(destino_pasta):
                 messagebox.showwarning("Pasta Remota Inexistente", f"A pasta remota '{destino_pasta}' não existe no OneDrive. Por favor, crie-a usando o botão 'Criar nova pasta no OneDrive' ou selecione uma pasta existente.")
                 self._reset_ui_buttons()
                 return
@@ -563,13 +1164,14 @@ class CloudEaseApp:
         )
 
     def _handle_cancel_sync(self):
-        if self.processo and self.processo.poll() is None:
+        tarefa = self.tarefa
+        if tarefa is not None and not tarefa.finalizada:
             confirmar = messagebox.askyesno(
                 "Cancelar sincronização",
                 "Deseja realmente cancelar a sincronização em andamento? Arquivos parciais podem ficar no destino."
             )
             if confirmar:
-                self.processo.terminate()
+                tarefa.cancelar()
                 self.status_var.set("⚠️ Sincronização cancelada pelo usuário")
                 self.resetar_infos()
                 self._reset_ui_buttons()
@@ -582,12 +1184,48 @@ class CloudEaseApp:
         self._set_sync_inactive_button_state()
         self._set_widgets_state('normal')
 
+    def _aplicar_banda_ao_vivo(self, event=None):
+        """Aplica o valor da barra de banda à execução em andamento via core/bwlimit, sem reiniciar o rclone."""
+        tarefa = self.tarefa
+        if tarefa is None or tarefa.finalizada:
+            return
+        mbps = self.banda_ao_vivo_var.get()
+        taxa = "off" if mbps <= 0 else converter_bwlimit(str(mbps))
+
+        def aplicar():
+            try:
+                if not tarefa.definir_banda(taxa):
+                    return
+            except (OSError, RuntimeError, ValueError) as e:
+                print(f"Erro ao alterar o limite de banda: {e}")
+                sys.stdout.flush()
+                return
+            self.janela.after(0, self.status_var.set, f"🚀 Limite de banda alterado para {'sem limite' if taxa == 'off' else f'{mbps} Mbps'}")
+
+        threading.Thread(target=aplicar, daemon=True).start()
+
     def executar_sincronizacao(self, is_dry_run):
+        """
+        Executa o teste ou a sincronização real da tela numa TarefaSincronizacao, o mesmo executor
+        da fila, da linha de comando e do servidor. Aqui ficam só as perguntas e os widgets,
+        atualizados pelos retornos da tarefa através da bomba de atualização.
+        """
         origem = self.entrada_origem.get().replace("\\", "/")
         destino_pasta = self.combo_onedrive.get().strip()
-        destino = f"onedrive:{destino_pasta}"
         modo = self.modo_var.get()
-        bwlimit_str = self.entrada_bwlimit.get().strip()
+        try:
+            bwlimit_da_execucao(self.entrada_bwlimit.get().strip(), self.entrada_horario_banda.get().strip())
+        except ValueError:
+            messagebox.showerror("Erro de Banda", "O limite ou o horário de banda não é válido.")
+            self._reset_ui_buttons()
+            return
+        try:
+            FiltroExclusao.do_perfil([nome for nome, var in self.filtros_lixo_vars.items() if var.get()], self.regras_exclusao)
+        except ValueError as e:
+            messagebox.showerror("Filtro de exclusão", f"Regra de exclusão inválida: {e}")
+            self._reset_ui_buttons()
+            return
+        nome_perfil, perfil = self._perfil_da_execucao(origem, destino_pasta, modo)
 
         # Passo 02: Se deseja sincronizar (somente para sincronização real)
         if not is_dry_run:
@@ -595,127 +1233,85 @@ class CloudEaseApp:
             if not confirmar_real_sync:
                 self._reset_ui_buttons() # Volta para a configuração
                 return
-        
-        self.janela.after(0, lambda: self._set_widgets_state('disabled'))
-
-        def processo_thread():
-            self.janela.after(0, self.output_text.config, {"state": "normal"})
-            self.janela.after(0, self.output_text.delete, "1.0", tk.END)
-            self.status_var.set(f"🚀 Sincronizando ({'Teste' if is_dry_run else 'Real'})...")
-            log_nome = datetime.now().strftime("log_%Y-%m-%d_%Hh%M.txt")
-            inicio = time.time()
-
-            with open(log_nome, "w", encoding="utf-8") as log:
-                comando = ["rclone", modo, origem, destino, "--stats-one-line", "--stats", "1s", "--verbose"]
-                # Otimização automática de performance (ajustada para valores mais altos)
-                comando += ["--transfers=16", "--checkers=16", "--drive-chunk-size=256M"]  # Ajustado para tentar máxima performance
-                if is_dry_run:
-                    comando.append("--dry-run")
-                
-                if bwlimit_str != "Sem limite":
-                    try:
-                        mbps = float(bwlimit_str)
-                        mb_per_sec = mbps * 0.125
-                        comando.append(f"--bwlimit={mb_per_sec}M")
-                    except ValueError:
-                        self.janela.after(0, lambda: messagebox.showerror("Erro de Banda", "O limite de banda selecionado não é válido."))
-                        self.janela.after(0, self._reset_ui_buttons)
-                        return
-
-                self.processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", bufsize=1) 
-
-                stdout_lines_read = 0
-                stderr_lines_read = 0
-
-                def read_stdout():
-                    nonlocal stdout_lines_read
-                    if self.processo and self.processo.stdout:
-                        for linha in iter(self.processo.stdout.readline, ''):
-                            stdout_lines_read += 1
-                            log.write(linha)
-                            self.janela.after(0, self.output_text.insert, tk.END, f"[Rclone] {linha}")
-                            self.janela.after(0, self.output_text.see, tk.END)
-                        self.processo.stdout.close()
-
-                def read_stderr():
-                    nonlocal stderr_lines_read
-                    if self.processo and self.processo.stderr:
-                        for linha in iter(self.processo.stderr.readline, ''):
-                            stderr_lines_read += 1
-                            log.write(f"[STDERR] {linha}")
-                            self.janela.after(0, self.output_text.insert, tk.END, f"[Rclone Erro/Aviso/Progresso] {linha}")
-
-                            transferido, total, porcentagem, velocidade, eta = extrair_stats_completos(linha)
-                            if transferido is not None:
-                                self.janela.after(0, self.transferido_var.set, f"Transferido: {transferido} MiB / {total} MiB")
-                                self.janela.after(0, self.velocidade_var.set, f"Velocidade: {velocidade}")
-                                formatted_eta = self.format_eta(eta)
-                                self.janela.after(0, self.eta_var.set, formatted_eta)
-                                current_time = time.time()
-                                elapsed_duration = current_time - inicio
-                                elapsed_formatted = f"{int(elapsed_duration // 60)}m {int(elapsed_duration % 60)}s"
-                                self.janela.after(0, self.tempo_var.set, f"Tempo decorrido: {elapsed_formatted}")
-                                # Corrigir: só converter porcentagem se não for None
-                                if porcentagem is not None:
-                                    try:
-                                        self.janela.after(0, self.progresso_var.set, float(porcentagem))
-                                    except Exception as e:
-                                        print(f"Erro ao converter porcentagem: {porcentagem} - {e}")
-                        self.janela.after(0, self.output_text.see, tk.END)
-                        self.processo.stderr.close()
-
-                stdout_thread = threading.Thread(target=read_stdout, daemon=True)
-                stderr_thread = threading.Thread(target=read_stderr, daemon=True)
-
-                stdout_thread.start()
-                stderr_thread.start()
-
-                self.processo.wait()
-
-                stdout_thread.join()
-                stderr_thread.join()
-
-                fim = time.time()
-                duracao = fim - inicio
-                tempo_formatado = f"{int(duracao // 60)}m {int(duracao % 60)}s"
-
-                if self.processo and self.processo.returncode != 0:
-                    # Corrigir: só ler stderr se self.processo.stderr não for None
-                    final_stderr_output_fallback = None
-                    if self.processo.stderr:
-                        final_stderr_output_fallback = self.processo.stderr.read() 
-                    if final_stderr_output_fallback:
-                        log.write("\n--- ERRO FINAL (fallback) ---\n")
-                        log.write(final_stderr_output_fallback)
-                        self.janela.after(0, self.output_text.insert, tk.END, f"\n[ERRO FINAL Rclone] {final_stderr_output_fallback}")
-                        self.janela.after(0, self.output_text.see, tk.END)
-
-                    self.janela.after(0, self.status_var.set, "❌ Sincronização falhou")
-                    self.janela.after(0, lambda: messagebox.showerror(
-                        "Erro na Sincronização",
-                        f"A sincronização falhou. Verifique o log ({log_nome}) para mais detalhes e a saída do Rclone na interface."
-                    ))
-                    self.janela.after(0, self.resetar_infos)
-                    self.janela.after(0, self._reset_ui_buttons)
-                else:
-                    self.janela.after(0, self.status_var.set, f"✅ Sincronização concluída em {tempo_formatado}")
-                    final_transfer_info = self.transferido_var.get() # Captura a informação final de transferência
-                    # Apenas pergunta sobre o log se for uma sincronização REAL (não dry-run)
-                    if not is_dry_run:
-                        # Passo 03: Finalizou a sincronização, aparece a opção de ver o log
-                        self.janela.after(0, lambda: self._ask_open_log_after_sync(tempo_formatado, final_transfer_info))
-                    else:
-                        # Se for dry-run, pergunta se deseja iniciar a sincronização real
-                        self.janela.after(0, lambda: self._ask_real_sync_after_test(tempo_formatado))
 
+        # Uma execução real interrompida deste par deixa um diário dos arquivos já enviados
+        retomar = False
+        if not is_dry_run:
+            concluidos = DiarioRetomada(ManifestoLocal.chave(origem, f"onedrive:{destino_pasta}")).contar(modo)
+            if concluidos:
+                retomar = messagebox.askyesno(
+                    "Retomar sincronização",
+                    f"A última sincronização desta pasta foi interrompida com {concluidos} arquivo(s) já enviados.\n\n"
+                    "Deseja retomar enviando só os arquivos restantes? (Não = começar do início)"
+                )
+
+        self._set_widgets_state('disabled')
+        self.output_text.config(state="normal")
+        self.output_text.delete("1.0", tk.END)
+        self.status_var.set(f"🚀 Sincronizando ({'Teste' if is_dry_run else 'Real'})...")
+        inicio = time.time()
+
+        def ao_progresso(campos, arquivos_s):
+            transferido, total, porcentagem, velocidade, eta = campos
+            if arquivos_s is not None:
+                velocidade = f"{velocidade} ({arquivos_s:.1f} arquivos/s)"
+            self.bomba.estado(self.transferido_var, f"Transferido: {transferido} MiB / {total} MiB")
+            self.bomba.estado(self.velocidade_var, f"Velocidade: {velocidade}")
+            self.bomba.estado(self.eta_var, self.format_eta(eta))
+            elapsed_duration = time.time() - inicio
+            self.bomba.estado(self.tempo_var, f"Tempo decorrido: {int(elapsed_duration // 60)}m {int(elapsed_duration % 60)}s")
+            if porcentagem is not None:
+                try:
+                    self.bomba.estado(self.progresso_var, float(porcentagem))
+                except ValueError as e:
+                    print(f"Erro ao converter porcentagem: {porcentagem} - {e}")
+
+        tarefa = TarefaSincronizacao(
+            nome_perfil, self._perfil_da_tela(perfil), self.daemon, self._ao_concluir_tarefa if nome_perfil else None, is_dry_run,
+            retomar=retomar, log_nome=datetime.now().strftime("log_%Y-%m-%d_%Hh%M.txt"),
+            ao_texto=self.bomba.texto, ao_status=lambda mensagem: self.bomba.estado(self.status_var, mensagem), ao_progresso=ao_progresso,
+        )
+        self.tarefa = tarefa
+        self.bomba.iniciar()
 
-                self.janela.after(0, self.output_text.config, {"state": "disabled"})
+        def processo_thread():
+            tarefa.executar()
+            self.janela.after(0, self._ao_terminar_sincronizacao, tarefa)
 
-            if self.processo and self.processo.poll() is None:
-                self.processo.terminate()
-            
         threading.Thread(target=processo_thread, daemon=True).start()
 
+    def _ao_terminar_sincronizacao(self, tarefa):
+        """Mostra o resultado da tarefa da tela (na thread do Tk)."""
+        if tarefa is not self.tarefa:
+            return # Cancelada e já substituída por outra sincronização
+        self.tarefa = None
+        # Aplica o que restou na fila antes de mostrar o resultado final
+        self.bomba.parar()
+        self.output_text.config(state="disabled")
+        tempo_formatado = f"{int(tarefa.duracao // 60)}m {int(tarefa.duracao % 60)}s"
+        if tarefa.estado == "cancelada":
+            return # A interface já voltou ao estado inicial em _handle_cancel_sync
+        if tarefa.estado == "sem alterações":
+            self.status_var.set("✅ Nada mudou desde a última sincronização")
+            messagebox.showinfo("Nada a sincronizar", "✅ Nenhum arquivo da pasta local mudou desde a última sincronização bem-sucedida.")
+            self.reset_app_state()
+        elif tarefa.estado == "falhou":
+            self.status_var.set("❌ Sincronização falhou")
+            messagebox.showerror(
+                "Erro na Sincronização",
+                f"{tarefa.erro or 'A sincronização falhou'}. Verifique o log ({tarefa.log_nome}) para mais detalhes e a saída do Rclone na interface."
+            )
+            self.resetar_infos()
+            self._reset_ui_buttons()
+        else:
+            self.status_var.set(f"✅ Sincronização concluída em {tempo_formatado}")
+            if not tarefa.is_dry_run:
+                # Passo 03: Finalizou a sincronização, aparece a opção de ver o log
+                self._ask_open_log_after_sync(tempo_formatado, self.transferido_var.get())
+            else:
+                # Se for dry-run, pergunta se deseja iniciar a sincronização real
+                self._ask_real_sync_after_test(tempo_formatado)
+
     def _ask_real_sync_after_test(self, tempo_formatado):
         """
         Após um teste bem-sucedido, pergunta ao usuário se deseja iniciar a sincronização real.
@@ -751,7 +1347,21 @@ class CloudEaseApp:
         self.entrada_origem.delete(0, tk.END)
         self.combo_onedrive.set("")
         self.modo_var.set("copy")
+        self.incremental_var.set(False)
+        self.fragmentos_var.set("1")
+        self.ajuste_var.set(False)
+        self.separar_tamanhos_var.set(False)
+        self.pre_varredura_var.set(False)
+        for var in self.filtros_lixo_vars.values():
+            var.set(False)
+        self.regras_exclusao = []
+        self.agrupar_pequenos_var.set(False)
+        self.pacote_limite_kib_var.set(str(PACOTE_LIMITE_KIB_PADRAO))
+        self.pacote_min_arquivos_var.set(str(PACOTE_MIN_ARQUIVOS_PADRAO))
+        self.pacote_percentual_var.set(str(PACOTE_PERCENTUAL_PEQUENOS_PADRAO))
+        self.perfil_atual = None
         self.entrada_bwlimit.set("Sem limite")
+        self.entrada_horario_banda.delete(0, tk.END)
         self.entrada_nome_perfil.delete(0, tk.END)
         self.combo_perfis.set("")
         self.atualizar_lista_perfis()
@@ -771,4 +1381,10 @@ class CloudEaseApp:
         self.output_text.delete("1.0", tk.END)
         self.output_text.config(state="disabled")
 
-CloudEaseApp()
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--desempacotar":
+        # Restauração: desempacota os pacotes de arquivos pequenos de uma pasta baixada do OneDrive
+        print(f"{desempacotar(sys.argv[2])} arquivo(s) extraído(s)")
+        sys.exit(0)
+    # --medir-inicio imprime o tempo até a primeira pintura da janela e até o fim das tarefas de inicialização
+    CloudEaseApp(medir_inicio="--medir-inicio" in sys.argv)
@@ -0,0 +1,89 @@
+"""
+Simulação do ajuste automático (transfers / checkers / --onedrive-chunk-size) contra um remote local limitado.
+
+Gera uma origem temporária com arquivos do tamanho pedido e executa várias rodadas de
+'rclone copy' para uma pasta local, sempre com --bwlimit (para simular o uplink). Cada
+rodada usa os ajustes de escolher_ajustes, mede a vazão com AmostradorVazao a partir das
+estatísticas do próprio rclone e registra o resultado com registrar_ajuste, como o
+CloudEase faz em um perfil real. Mostra os ajustes e a vazão de cada rodada e o melhor ajuste final.
+
+Uso:
+    python benchmarks/bench_ajuste.py [--rodadas 6] [--arquivos 100] [--tamanho-kib 1024] [--bwlimit 40M]
+
+Requer o rclone instalado. O --onedrive-chunk-size é aceito mas não tem efeito no remote
+local; a simulação mostra o comportamento de transfers/checkers e a convergência do ajuste.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cloudease.perfis import AmostradorVazao, escolher_ajustes, registrar_ajuste  # noqa: E402
+from cloudease.parsers import formatar_velocidade, interpretar_linha_stderr  # noqa: E402
+from cloudease.comandos import montar_comando_rclone  # noqa: E402
+from cloudease.varredura import escanear_origem  # noqa: E402
+
+
+def criar_origem(pasta, arquivos, tamanho):
+    bloco = os.urandom(tamanho)
+    for i in range(arquivos):
+        with open(os.path.join(pasta, f"arquivo_{i:05d}.bin"), "wb") as f:
+            f.write(bloco)
+
+
+def executar_rodada(origem, destino, ajustes, bwlimit):
+    shutil.rmtree(destino, ignore_errors=True)
+    comando = montar_comando_rclone("copy", origem, destino, ajustes=ajustes) + [f"--bwlimit={bwlimit}"]
+    amostrador = AmostradorVazao()
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding="utf-8")
+    for linha in iter(processo.stderr.readline, ''):
+        _, campos = interpretar_linha_stderr(linha)
+        if campos is not None:
+            amostrador.registrar_campos(campos)
+    processo.wait()
+    return amostrador.vazao(), time.perf_counter() - inicio, processo.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rodadas", type=int, default=6)
+    parser.add_argument("--arquivos", type=int, default=100)
+    parser.add_argument("--tamanho-kib", type=int, default=1024)
+    parser.add_argument("--bwlimit", default="40M")
+    args = parser.parse_args()
+
+    raiz = tempfile.mkdtemp(prefix="cloudease_ajuste_")
+    origem = os.path.join(raiz, "origem")
+    destino = os.path.join(raiz, "destino")
+    os.makedirs(origem)
+    try:
+        criar_origem(origem, args.arquivos, args.tamanho_kib * 1024)
+        arquivos = escanear_origem(origem)
+        perfil = {}
+        print(f"Origem: {args.arquivos} arquivos de {args.tamanho_kib} KiB, --bwlimit={args.bwlimit}")
+        for rodada in range(1, args.rodadas + 1):
+            ajustes = escolher_ajustes(perfil, arquivos)
+            vazao, duracao, codigo = executar_rodada(origem, destino, ajustes, args.bwlimit)
+            if codigo != 0:
+                print(f"Rodada {rodada}: o rclone terminou com código {codigo}")
+                return 1
+            registrar_ajuste(perfil, ajustes, vazao)
+            texto_vazao = formatar_velocidade(vazao) if vazao is not None else "amostra insuficiente"
+            print(f"Rodada {rodada}: transfers={ajustes['transfers']:<3} checkers={ajustes['checkers']:<3} "
+                  f"chunk={ajustes['chunk_size']:<5} {duracao:6.1f}s  {texto_vazao}")
+        melhor = perfil.get("ajuste", {}).get("melhor")
+        if melhor:
+            print(f"Melhor ajuste: transfers={melhor['transfers']} checkers={melhor['checkers']} "
+                  f"chunk={melhor['chunk_size']} ({formatar_velocidade(melhor['vazao'])})")
+    finally:
+        shutil.rmtree(raiz, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Benchmark da bomba de atualização da interface (BombaAtualizacaoUI).
+
+Reproduz um log do rclone (ex: log_2025-07-07_20h32.txt) através do mesmo
+caminho usado em executar_sincronizacao: uma thread leitora enfileira o texto e
+os valores de progresso, e a bomba drena a fila a uma taxa fixa. Mede:
+  - linhas/segundo até a última linha aparecer no widget de saída;
+  - latência do loop de eventos do Tk (atraso de um timer de sonda de 10 ms).
+
+Com --legado, usa o caminho antigo (vários janela.after(0, ...) por linha)
+para comparação.
+
+Uso:
+    python benchmarks/bench_bomba_ui.py [log_*.txt] [--legado] [--intervalo 50]
+
+Requer um display (o Tk precisa criar uma janela, que fica oculta).
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from CloudEase import BombaAtualizacaoUI  # noqa: E402
+from cloudease.parsers import extrair_stats_completos  # noqa: E402
+
+LOG_PADRAO = "log_2025-07-07_20h32.txt"
+INTERVALO_SONDA_MS = 10
+
+
+def carregar_linhas(caminho):
+    linhas = []
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            if linha.startswith("[STDERR] "):
+                linha = linha[len("[STDERR] "):]
+            linhas.append(linha)
+    return linhas
+
+
+def executar(linhas, legado, intervalo_ms):
+    janela = tk.Tk()
+    janela.withdraw()
+    output_text = tk.Text(janela, state="disabled")
+    output_text.pack()
+    transferido_var = tk.StringVar()
+    velocidade_var = tk.StringVar()
+    eta_var = tk.StringVar()
+    progresso_var = tk.DoubleVar()
+
+    bomba = BombaAtualizacaoUI(janela, output_text, intervalo_ms)
+    atrasos = []
+    resultado = {}
+    inicio = time.perf_counter()
+
+    def sonda(esperado):
+        agora = time.perf_counter()
+        atrasos.append(max(0.0, agora - esperado) * 1000)
+        if "fim" not in resultado:
+            janela.after(INTERVALO_SONDA_MS, sonda, agora + INTERVALO_SONDA_MS / 1000)
+
+    def produtor():
+        for linha in linhas:
+            texto = f"[Rclone Erro/Aviso/Progresso] {linha}"
+            transferido, total, porcentagem, velocidade, eta = extrair_stats_completos(linha)
+            if legado:
+                janela.after(0, output_text.insert, tk.END, texto)
+                if transferido is not None:
+                    janela.after(0, transferido_var.set, f"Transferido: {transferido} MiB / {total} MiB")
+                    janela.after(0, velocidade_var.set, f"Velocidade: {velocidade}")
+                    janela.after(0, eta_var.set, eta)
+                    janela.after(0, progresso_var.set, float(porcentagem))
+            else:
+                bomba.texto(texto)
+                if transferido is not None:
+                    bomba.estado(transferido_var, f"Transferido: {transferido} MiB / {total} MiB")
+                    bomba.estado(velocidade_var, f"Velocidade: {velocidade}")
+                    bomba.estado(eta_var, eta)
+                    bomba.estado(progresso_var, float(porcentagem))
+        if legado:
+            janela.after(0, finalizar)
+        else:
+            bomba.chamar(finalizar)
+
+    def finalizar():
+        resultado["fim"] = time.perf_counter()
+        bomba.parar()
+        janela.after(INTERVALO_SONDA_MS * 2, janela.quit)
+
+    if legado:
+        output_text.config(state="normal")
+    else:
+        bomba.iniciar()
+    janela.after(INTERVALO_SONDA_MS, sonda, time.perf_counter() + INTERVALO_SONDA_MS / 1000)
+    threading.Thread(target=produtor, daemon=True).start()
+    janela.mainloop()
+    janela.destroy()
+
+    duracao = resultado["fim"] - inicio
+    return duracao, atrasos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", default=LOG_PADRAO)
+    parser.add_argument("--legado", action="store_true", help="usa um janela.after(0, ...) por atualização (caminho antigo)")
+    parser.add_argument("--intervalo", type=int, default=50, help="intervalo da bomba em ms")
+    args = parser.parse_args()
+
+    linhas = carregar_linhas(args.log)
+    duracao, atrasos = executar(linhas, args.legado, args.intervalo)
+    atrasos.sort()
+
+    print(f"Modo: {'legado (after por linha)' if args.legado else f'bomba ({args.intervalo} ms)'}")
+    print(f"Linhas: {len(linhas)} em {duracao:.2f}s -> {len(linhas) / duracao:,.0f} linhas/s")
+    if atrasos:
+        p95 = atrasos[int(len(atrasos) * 0.95) - 1] if len(atrasos) > 1 else atrasos[0]
+        print(f"Latência do loop de eventos (ms): mediana {statistics.median(atrasos):.1f}, "
+              f"p95 {p95:.1f}, máx {atrasos[-1]:.1f} ({len(atrasos)} amostras)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Reprodução do corpus log_*.txt para validar o EstimadorEta (cloudease/estimativa.py).
+
+Cada log é reproduzido com os horários das próprias linhas de estatística. Para cada amostra
+o tempo restante real vai até o momento em que os bytes chegaram ao total final. O ETA do
+rclone e o do EstimadorEta (sem histórico, e com a vazão média dos outros logs como histórico
+do perfil) são comparados por:
+  - erro: mediana e percentil 90 de |ln(ETA / restante real)| (0 = exato; 0,69 = o dobro ou a metade);
+  - oscilação: mediana de |ln| da variação do horário de término previsto entre amostras seguidas;
+  - cobertura: fração das amostras com alguma estimativa.
+Só entram as amostras depois do primeiro byte e com pelo menos --restante-min segundos reais.
+
+O script falha (código 1) se, no corpus inteiro, o EstimadorEta sem histórico errar ou oscilar
+mais que o ETA do rclone.
+
+Uso:
+    python benchmarks/bench_eta.py [log_*.txt ...] [--restante-min 30]
+"""
+import argparse
+import glob
+import math
+import os
+import re
+import statistics
+import sys
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from cloudease.estimativa import EstimadorEta  # noqa: E402
+from cloudease.parsers import EstatisticasRclone  # noqa: E402
+
+PADRAO_HORARIO = re.compile(r"^(\d{4}/\d\d/\d\d \d\d:\d\d:\d\d) ")
+DURACAO_MIN_S = 60 # Logs com menos que isso entre o primeiro byte e o fim não são avaliados
+
+
+def carregar_amostras(arquivo):
+    """
+    Retorna [(segundos desde o início, EstatisticasRclone)] das linhas de estatística do log,
+    ou None para um teste (dry-run), em que nada é enviado de fato.
+    """
+    amostras = []
+    inicio = None
+    with open(arquivo, "r", encoding="utf-8") as f:
+        for linha in f:
+            if linha.startswith("[STDERR] "):
+                linha = linha[len("[STDERR] "):]
+            if "--dry-run is set" in linha:
+                return None
+            horario = PADRAO_HORARIO.match(linha)
+            if not horario:
+                continue
+            estatisticas = EstatisticasRclone.de_texto(linha)
+            if estatisticas is None:
+                continue
+            momento = datetime.strptime(horario.group(1), "%Y/%m/%d %H:%M:%S").timestamp()
+            inicio = momento if inicio is None else inicio
+            amostras.append((momento - inicio, estatisticas))
+    return amostras
+
+
+def fim_das_transferencias(amostras):
+    """(momento do primeiro byte, momento em que os bytes chegaram ao total final), ou None."""
+    final = amostras[-1][1].bytes if amostras else 0
+    if not final:
+        return None
+    primeiro = next(t for t, e in amostras if e.bytes > 0)
+    fim = next(t for t, e in amostras if e.bytes >= final)
+    return (primeiro, fim) if fim - primeiro >= DURACAO_MIN_S else None
+
+
+def reproduzir(amostras, fim, restante_min, vazao_historica=None):
+    """Retorna {'rclone': [(t, eta, real)], 'estimador': [...]} das amostras avaliadas."""
+    estimador = EstimadorEta(vazao_historica)
+    resultado = {"rclone": [], "estimador": []}
+    for momento, estatisticas in amostras:
+        eta = estimador.registrar(estatisticas, agora=momento)
+        real = fim - momento
+        if estatisticas.bytes <= 0 or real < restante_min:
+            continue
+        resultado["rclone"].append((momento, estatisticas.eta, real))
+        resultado["estimador"].append((momento, eta, real))
+    return resultado
+
+
+def metricas(serie):
+    """(mediana do erro, p90 do erro, mediana da oscilação, cobertura) de [(t, eta, real)]."""
+    erros = [abs(math.log(max(eta, 1) / real)) for _, eta, real in serie if eta is not None]
+    oscilacoes = []
+    for (t0, eta0, _), (t1, eta1, _) in zip(serie, serie[1:]):
+        if eta0 is not None and eta1 is not None:
+            oscilacoes.append(abs(math.log((t1 + max(eta1, 1)) / (t0 + max(eta0, 1)))))
+    if not erros:
+        return None, None, None, 0.0
+    erros.sort()
+    p90 = erros[min(len(erros) - 1, int(len(erros) * 0.9))]
+    return statistics.median(erros), p90, statistics.median(oscilacoes) if oscilacoes else 0.0, len(erros) / len(serie)
+
+
+def imprimir(nome, serie):
+    erro, p90, oscilacao, cobertura = metricas(serie)
+    if erro is None:
+        print(f"  {nome:<22} sem estimativas")
+        return
+    print(f"  {nome:<22} erro {erro:6.3f} (p90 {p90:6.3f})  oscilação {oscilacao:.5f}  cobertura {cobertura:6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("logs", nargs="*")
+    parser.add_argument("--restante-min", type=float, default=30)
+    args = parser.parse_args()
+
+    arquivos = args.logs or sorted(glob.glob(os.path.join(RAIZ, "log_*.txt")))
+    execucoes = {}
+    for arquivo in arquivos:
+        amostras = carregar_amostras(arquivo)
+        if amostras is None:
+            print(f"{os.path.basename(arquivo)}: teste (dry-run), ignorado")
+            continue
+        limites = fim_das_transferencias(amostras)
+        if limites is None:
+            print(f"{os.path.basename(arquivo)}: sem transferência suficiente para avaliar")
+            continue
+        primeiro, fim = limites
+        vazao = amostras[-1][1].bytes / (fim - primeiro)
+        execucoes[arquivo] = (amostras, fim, vazao)
+
+    todas = {"rclone": [], "estimador": [], "estimador + histórico": []}
+    for arquivo, (amostras, fim, vazao) in execucoes.items():
+        # Histórico: a vazão média das outras execuções do corpus (como se fossem execuções anteriores do perfil)
+        outras = [v for a, (_, _, v) in execucoes.items() if a != arquivo]
+        historico = statistics.mean(outras) if outras else None
+        series = reproduzir(amostras, fim, args.restante_min)
+        series["estimador + histórico"] = reproduzir(amostras, fim, args.restante_min, historico)["estimador"]
+        print(f"{os.path.basename(arquivo)}: {len(series['rclone'])} amostras, vazão média {vazao / 1024 / 1024:.2f} MiB/s")
+        for nome, serie in series.items():
+            imprimir(nome, serie)
+            todas[nome].extend(serie)
+
+    if not todas["rclone"]:
+        print("Nenhum log com transferência suficiente.")
+        return 1
+    print("Corpus inteiro:")
+    for nome, serie in todas.items():
+        imprimir(nome, serie)
+    erro_rclone, _, oscilacao_rclone, _ = metricas(todas["rclone"])
+    erro, _, oscilacao, _ = metricas(todas["estimador"])
+    if erro is None or erro > erro_rclone or oscilacao > oscilacao_rclone:
+        print("FALHA: o EstimadorEta não é melhor que o ETA do rclone neste corpus.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Tempo de importação dos módulos do núcleo (pacote cloudease), com um orçamento por módulo.
+
+Cada módulo é importado num processo Python novo com -X importtime, várias vezes; vale o
+menor tempo acumulado (o próprio módulo e tudo o que ele importa). O script falha (código 1)
+se algum módulo passar do orçamento ou importar o tkinter: o núcleo é usado pela linha de
+comando e por outros programas sem interface, e deve continuar barato de importar.
+A interface (CloudEase.py) é medida só como referência.
+
+Uso:
+    python benchmarks/bench_importacao.py [--repeticoes 5] [--folga 1.0]
+
+--folga multiplica os orçamentos (ex: 2 numa máquina lenta ou muito carregada).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamento (ms) do tempo acumulado de importação de cada módulo
+ORCAMENTOS_MS = {
+    "cloudease.perfis": 15,
+    "cloudease.logs": 15,
+    "cloudease.vigia": 15,
+    "cloudease.estimativa": 15,
+    "cloudease.cli": 25, # O que 'python -m cloudease list-profiles' importa
+    "cloudease.parsers": 30,
+    "cloudease.comandos": 30,
+    "cloudease.filtros": 30,
+    "cloudease.remoto": 30,
+    "cloudease.varredura": 45,
+    "cloudease.plano": 60,
+    "cloudease.pacotes": 70,
+    "cloudease.execucao": 80,
+    "cloudease.servidor": 100,
+}
+MODULOS_PROIBIDOS = ("tkinter",) # Nenhum módulo do núcleo pode importá-los
+
+
+def medir(modulo, repeticoes):
+    """Retorna (menor tempo acumulado em ms, conjunto de módulos importados)."""
+    melhor = None
+    importados = set()
+    for _ in range(repeticoes):
+        resultado = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                                   cwd=RAIZ, capture_output=True, text=True, check=True)
+        for linha in resultado.stderr.splitlines():
+            if not linha.startswith("import time:") or "|" not in linha:
+                continue
+            _, acumulado, nome = linha.split("|", 2)
+            nome = nome.strip()
+            importados.add(nome)
+            if nome == modulo:
+                tempo = int(acumulado) / 1000
+                melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor, importados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--folga", type=float, default=1.0)
+    args = parser.parse_args()
+
+    falhas = 0
+    for modulo, orcamento in ORCAMENTOS_MS.items():
+        tempo, importados = medir(modulo, args.repeticoes)
+        limite = orcamento * args.folga
+        proibidos = sorted(nome for nome in importados if nome.split(".")[0] in MODULOS_PROIBIDOS)
+        situacao = "ok"
+        if tempo > limite:
+            situacao = "ACIMA DO ORÇAMENTO"
+        if proibidos:
+            situacao = f"IMPORTA {', '.join(proibidos)}"
+        if situacao != "ok":
+            falhas += 1
+        print(f"{modulo:<22} {tempo:7.1f} ms  (orçamento {limite:5.0f} ms)  {situacao}")
+
+    tempo, _ = medir("CloudEase", args.repeticoes)
+    print(f"{'CloudEase (interface)':<22} {tempo:7.1f} ms  (referência)")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Benchmark de vazão dos parsers de saída do rclone.
+
+Compara, sobre o corpus log_*.txt incluído no repositório:
+  - texto (regex): extrair_stats_completos, o caminho usado sem --use-json-log;
+  - texto sem o filtro prévio: a regex aplicada a todas as linhas (comportamento antigo);
+  - json: extrair_entrada_json + EstatisticasRclone.para_exibicao, o caminho com --use-json-log.
+
+O corpus JSON é gerado a partir dos logs em texto (fora da medição), com o
+mesmo formato que o rclone produz com --use-json-log --stats-log-level NOTICE.
+
+Uso:
+    python benchmarks/bench_parsers.py [log_*.txt ...] [--repeticoes 3]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from cloudease.parsers import PADRAO_STATS, extrair_entrada_json, extrair_stats_completos  # noqa: E402
+
+PADRAO_LINHA = re.compile(r"^(\d{4}/\d\d/\d\d \d\d:\d\d:\d\d) (\w+)\s*: (.*)$")
+PADRAO_XFR = re.compile(r"\(xfr#(\d+)/(\d+)\)")
+FATORES = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4}
+
+
+def carregar_texto(arquivos):
+    linhas = []
+    for arquivo in arquivos:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            for linha in f:
+                if linha.startswith("[STDERR] "):
+                    linha = linha[len("[STDERR] "):]
+                linhas.append(linha)
+    return linhas
+
+
+def _eta_em_segundos(eta):
+    if eta == "-":
+        return None
+    total = 0
+    for valor, unidade in re.findall(r"(\d+)([dhms])", eta):
+        total += int(valor) * {"d": 86400, "h": 3600, "m": 60, "s": 1}[unidade]
+    return total
+
+
+def para_json(linha):
+    """Converte uma linha de texto do rclone na linha equivalente do --use-json-log."""
+    m = PADRAO_LINHA.match(linha.rstrip("\n"))
+    if not m:
+        return json.dumps({"level": "info", "msg": linha.strip()}) + "\n"
+    data, nivel, mensagem = m.groups()
+    entrada = {"time": data.replace("/", "-").replace(" ", "T"), "level": nivel.lower()}
+    stats = PADRAO_STATS.search(mensagem)
+    if stats:
+        xfr = PADRAO_XFR.search(mensagem)
+        velocidade_unidade = stats.group(7).split("/")[0]
+        entrada["msg"] = mensagem
+        entrada["stats"] = {
+            "bytes": int(float(stats.group(1)) * FATORES[stats.group(2)]),
+            "totalBytes": int(float(stats.group(3)) * FATORES[stats.group(4)]),
+            "speed": float(stats.group(6)) * FATORES[velocidade_unidade],
+            "eta": _eta_em_segundos(stats.group(8)),
+            "transfers": int(xfr.group(1)) if xfr else 0,
+            "totalTransfers": int(xfr.group(2)) if xfr else 0,
+            "errors": 0,
+            "checks": 0,
+        }
+    elif ": " in mensagem:
+        objeto, _, msg = mensagem.rpartition(": ")
+        entrada["msg"] = msg
+        entrada["object"] = objeto
+    else:
+        entrada["msg"] = mensagem
+    return json.dumps(entrada, ensure_ascii=False) + "\n"
+
+
+def caminho_texto(linhas):
+    encontrados = 0
+    for linha in linhas:
+        if extrair_stats_completos(linha)[0] is not None:
+            encontrados += 1
+    return encontrados
+
+
+def caminho_texto_sem_filtro(linhas):
+    encontrados = 0
+    for linha in linhas:
+        if PADRAO_STATS.search(linha):
+            encontrados += 1
+    return encontrados
+
+
+def caminho_json(linhas):
+    encontrados = 0
+    for linha in linhas:
+        _, estatisticas = extrair_entrada_json(linha)
+        if estatisticas is not None:
+            estatisticas.para_exibicao()
+            encontrados += 1
+    return encontrados
+
+
+def medir(nome, funcao, linhas, repeticoes):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        encontrados = funcao(linhas)
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    print(f"{nome:<22} {len(linhas) / melhor:>12,.0f} linhas/s  ({melhor * 1000:.1f} ms, {encontrados} linhas de estatística)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("logs", nargs="*")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    arquivos = args.logs or sorted(glob.glob(os.path.join(RAIZ, "log_*.txt")))
+    linhas_texto = carregar_texto(arquivos)
+    linhas_json = [para_json(linha) for linha in linhas_texto]
+
+    print(f"Corpus: {len(arquivos)} arquivos, {len(linhas_texto)} linhas")
+    medir("texto (regex)", caminho_texto, linhas_texto, args.repeticoes)
+    medir("texto sem filtro", caminho_texto_sem_filtro, linhas_texto, args.repeticoes)
+    medir("json", caminho_json, linhas_json, args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
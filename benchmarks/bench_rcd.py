@@ -0,0 +1,83 @@
+"""
+Benchmark de latência: processo rclone novo a cada operação x daemon rcd (DaemonRclone).
+
+Para listagem (lsf --dirs-only x operations/list) e criação de pasta
+(rclone mkdir x operations/mkdir), mede cada operação várias vezes e mostra
+mínimo, mediana e máximo em milissegundos. As pastas criadas são removidas ao final.
+
+Uso:
+    python benchmarks/bench_rcd.py [--remote onedrive:] [--repeticoes 5]
+
+O remote pode ser qualquer um configurado no rclone, ou um caminho local
+(ex: --remote /tmp/bench_rclone/) para medir só o custo de processo.
+Requer o rclone instalado.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cloudease.remoto import DaemonRclone  # noqa: E402
+
+PREFIXO_PASTA = "cloudease_bench"
+
+
+def caminho_completo(remote, nome):
+    if remote.endswith((":", "/")):
+        return remote + nome
+    return f"{remote}/{nome}"
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for i in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(i)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def mostrar(nome, tempos):
+    print(f"{nome:<28} mín {min(tempos):8.1f} ms   mediana {statistics.median(tempos):8.1f} ms   máx {max(tempos):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--remote", default="onedrive:")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    def lsf_frio(_):
+        subprocess.run(["rclone", "lsf", args.remote, "--dirs-only"], capture_output=True, check=True)
+
+    def mkdir_frio(i):
+        subprocess.run(["rclone", "mkdir", caminho_completo(args.remote, f"{PREFIXO_PASTA}_frio_{i}")], capture_output=True, check=True)
+
+    daemon = DaemonRclone()
+    inicio = time.perf_counter()
+    if not daemon.iniciar():
+        print("Não foi possível iniciar o rclone rcd.")
+        return 1
+    print(f"Daemon iniciado em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    try:
+        mostrar("list (processo novo)", medir(lsf_frio, args.repeticoes))
+        mostrar("list (daemon)", medir(lambda _: daemon.listar_pastas(args.remote), args.repeticoes))
+        mostrar("mkdir (processo novo)", medir(mkdir_frio, args.repeticoes))
+        mostrar("mkdir (daemon)", medir(lambda i: daemon.criar_pasta(args.remote, f"{PREFIXO_PASTA}_daemon_{i}"), args.repeticoes))
+    finally:
+        for i in range(args.repeticoes):
+            for tipo in ("frio", "daemon"):
+                try:
+                    daemon.cliente.chamar("operations/rmdir", fs=args.remote, remote=f"{PREFIXO_PASTA}_{tipo}_{i}")
+                except (OSError, RuntimeError):
+                    pass
+        daemon.parar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
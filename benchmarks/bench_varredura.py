@@ -0,0 +1,77 @@
+"""
+Benchmark da varredura da pasta local (escanear_origem / pre_varrer_origem).
+
+Compara, sobre a mesma origem:
+  - sequencial: uma pasta por vez (trabalhadores=1), como a varredura antiga;
+  - paralela: TRABALHADORES_VARREDURA pastas listadas ao mesmo tempo;
+  - com cache: a pré-varredura depois de uma primeira execução, com todas as pastas inalteradas.
+
+Sem argumentos, gera uma árvore temporária (--pastas x --arquivos arquivos vazios).
+Com --origem, mede uma pasta existente (o cache usado fica numa pasta temporária).
+O ganho da versão paralela aparece sobretudo em discos de rede e com o cache do sistema frio.
+
+Uso:
+    python benchmarks/bench_varredura.py [--origem PASTA] [--pastas 500] [--arquivos 40] [--repeticoes 3]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cloudease.varredura import CacheVarredura, TRABALHADORES_VARREDURA, escanear_origem  # noqa: E402
+
+
+def criar_origem(pasta, pastas, arquivos):
+    for i in range(pastas):
+        subpasta = os.path.join(pasta, f"grupo_{i % 20:02d}", f"pasta_{i:05d}")
+        os.makedirs(subpasta)
+        for j in range(arquivos):
+            open(os.path.join(subpasta, f"arquivo_{j:04d}.txt"), "wb").close()
+
+
+def medir(nome, funcao, repeticoes):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    print(f"{nome:<24} {melhor * 1000:10.1f} ms  ({len(resultado)} arquivos)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--origem")
+    parser.add_argument("--pastas", type=int, default=500)
+    parser.add_argument("--arquivos", type=int, default=40)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    raiz = tempfile.mkdtemp(prefix="cloudease_varredura_")
+    try:
+        origem = args.origem
+        if not origem:
+            origem = os.path.join(raiz, "origem")
+            criar_origem(origem, args.pastas, args.arquivos)
+        dir_cache = os.path.join(raiz, "cache")
+
+        def com_cache():
+            cache = CacheVarredura(origem, dir_cache).carregar()
+            arquivos = escanear_origem(origem, cache=cache)
+            cache.salvar()
+            return arquivos
+
+        com_cache() # Primeira execução: preenche o cache
+        medir("sequencial", lambda: escanear_origem(origem, trabalhadores=1), args.repeticoes)
+        medir(f"paralela ({TRABALHADORES_VARREDURA} threads)", lambda: escanear_origem(origem), args.repeticoes)
+        medir("com cache", com_cache, args.repeticoes)
+    finally:
+        shutil.rmtree(raiz, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
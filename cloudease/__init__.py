@@ -0,0 +1 @@
+"""CloudEase: backup e sincronização de pastas locais com o OneDrive usando o rclone."""
@@ -0,0 +1,5 @@
+import sys
+
+from cloudease.cli import main
+
+sys.exit(main())
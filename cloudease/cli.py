@@ -0,0 +1,160 @@
+"""
+Linha de comando do CloudEase, sem interface gráfica (não importa o tkinter).
+
+Uso:
+    python -m cloudease list-profiles
+    python -m cloudease dry-run <perfil>
+    python -m cloudease run <perfil> [--json progresso.jsonl]
+    python -m cloudease serve [--endereco 127.0.0.1] [--porta 8765] [--token TOKEN]
+
+Os perfis são os mesmos da interface (perfis.json). O progresso é mostrado no terminal,
+uma linha por atualização; com --json, cada atualização é gravada também como uma linha
+JSON no arquivo indicado ('-' para a saída padrão, no lugar do texto).
+O código de saída é 0 quando a execução termina bem (ou não havia alterações),
+1 quando falha, 2 para perfil inexistente ou argumentos inválidos e 130 quando é interrompida.
+'serve' mantém um servidor HTTP/JSON com a fila de perfis (veja cloudease/servidor.py).
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+from cloudease.perfis import ARQ_PERFIS, carregar_json, registrar_execucao_arquivo
+
+INTERVALO_PROGRESSO_S = 1.0 # Intervalo entre as atualizações de progresso no terminal
+CODIGOS_SAIDA = {"concluída": 0, "sem alterações": 0, "falhou": 1, "cancelada": 130}
+
+
+def carregar_perfis(arquivo):
+    def avisar():
+        print(f"Aviso: {arquivo} está corrompido ou vazio.", file=sys.stderr)
+    return carregar_json(arquivo, avisar)
+
+
+def listar_perfis(args):
+    perfis = carregar_perfis(args.perfis)
+    if not perfis:
+        print(f"Nenhum perfil em {args.perfis}.")
+        return 0
+    largura = max(len(nome) for nome in perfis)
+    for nome, perfil in perfis.items():
+        ultima = perfil.get("ultima_sincronizacao", "nunca")
+        print(f"{nome:<{largura}}  {perfil.get('modo', 'copy'):<4}  {perfil.get('origem', '')} -> "
+              f"onedrive:{perfil.get('destino', '')}  (última: {ultima})")
+    return 0
+
+
+class SaidaProgresso:
+    """Mostra o progresso de uma tarefa no terminal e/ou como linhas JSON (uma por atualização)."""
+    def __init__(self, destino_json=None):
+        self.texto = destino_json != "-"
+        self.arquivo_json = None
+        if destino_json == "-":
+            self.arquivo_json = sys.stdout
+        elif destino_json:
+            self.arquivo_json = open(destino_json, "a", encoding="utf-8")
+        self._anterior = None
+
+    def evento(self, tarefa, final=False):
+        resumo = tarefa.resumo()
+        if resumo == self._anterior and not final:
+            return
+        self._anterior = resumo
+        if self.arquivo_json is not None:
+            registro = dict(momento=datetime.now().isoformat(timespec="seconds"), **resumo)
+            self.arquivo_json.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self.arquivo_json.flush()
+        if self.texto:
+            if "porcentagem" in resumo:
+                arquivos_s = f" ({resumo['arquivos_por_s']:.1f} arquivos/s)" if "arquivos_por_s" in resumo else ""
+                print(f"[{resumo['estado']}] {resumo['porcentagem']}%  {resumo['transferido_mib']} / {resumo['total_mib']} MiB  "
+                      f"{resumo['velocidade']}{arquivos_s}  ETA {resumo['eta']}")
+            else:
+                print(f"[{resumo['estado']}]")
+            if "alerta" in resumo:
+                print(f"Aviso: {resumo['alerta']}")
+            sys.stdout.flush()
+
+    def fechar(self):
+        if self.arquivo_json not in (None, sys.stdout):
+            self.arquivo_json.close()
+
+
+def executar_perfil(args, is_dry_run):
+    # O executor (e o que ele importa) só é carregado aqui: list-profiles importa apenas os perfis
+    from cloudease.execucao import TarefaSincronizacao
+    perfis = carregar_perfis(args.perfis)
+    if args.perfil not in perfis:
+        print(f"Perfil '{args.perfil}' não encontrado em {args.perfis}.", file=sys.stderr)
+        return 2
+    perfil = perfis[args.perfil]
+    if not perfil.get("origem") or not perfil.get("destino"):
+        print(f"O perfil '{args.perfil}' não tem origem e destino.", file=sys.stderr)
+        return 2
+
+    concluida = {}
+    def ao_concluir(tarefa, inicio_iso, completa):
+        concluida.update(inicio_iso=inicio_iso, completa=completa)
+
+    inicio = time.perf_counter()
+    tarefa = TarefaSincronizacao(args.perfil, perfil, ao_concluir=ao_concluir, is_dry_run=is_dry_run)
+    saida = SaidaProgresso(args.json)
+    try:
+        # A tarefa roda numa thread própria: a principal mostra o progresso e, com Ctrl+C, cancela o rclone
+        execucao = threading.Thread(target=tarefa.executar, daemon=True)
+        execucao.start()
+        try:
+            while execucao.is_alive():
+                saida.evento(tarefa)
+                execucao.join(INTERVALO_PROGRESSO_S)
+        except KeyboardInterrupt:
+            print("Cancelando...", file=sys.stderr)
+            tarefa.cancelar()
+            execucao.join()
+        saida.evento(tarefa, final=True)
+    finally:
+        saida.fechar()
+
+    if saida.texto:
+        for linha in tarefa.linhas_filtro:
+            sys.stdout.write(linha)
+        if tarefa.log_nome:
+            print(f"Log: {tarefa.log_nome}")
+        duracao = time.perf_counter() - inicio
+        print(f"Duração: {int(duracao // 60)}m {int(duracao % 60)}s")
+    if concluida:
+        registrar_execucao_arquivo(args.perfis, args.perfil, concluida["inicio_iso"], concluida["completa"],
+                                   tarefa.ajustes, tarefa.amostrador.vazao())
+    return CODIGOS_SAIDA.get(tarefa.estado, 1)
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog="python -m cloudease", description="CloudEase sem interface gráfica.")
+    parser.add_argument("--perfis", default=ARQ_PERFIS, help=f"arquivo de perfis (padrão: {ARQ_PERFIS})")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("list-profiles", help="lista os perfis salvos")
+    for nome, ajuda in (("run", "executa a sincronização de um perfil"), ("dry-run", "testa a sincronização de um perfil (--dry-run)")):
+        sub = comandos.add_parser(nome, help=ajuda)
+        sub.add_argument("perfil")
+        sub.add_argument("--json", metavar="ARQ", help="grava o progresso como linhas JSON em ARQ ('-' para a saída padrão)")
+    servidor = comandos.add_parser("serve", help="mantém um servidor HTTP/JSON para iniciar e acompanhar sincronizações")
+    servidor.add_argument("--endereco", help="endereço de escuta (padrão: 127.0.0.1)")
+    servidor.add_argument("--porta", type=int, help="porta (padrão: 8765)")
+    servidor.add_argument("--max-simultaneas", type=int, help="processos rclone simultâneos (padrão: 2)")
+    servidor.add_argument("--token", help="token exigido em 'Authorization: Bearer TOKEN' (padrão: variável CLOUDEASE_TOKEN "
+                                          "ou um token aleatório salvo em token_servidor.txt)")
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    if args.comando == "list-profiles":
+        return listar_perfis(args)
+    if args.comando == "serve":
+        from cloudease.servidor import servir
+        opcoes = {"endereco": args.endereco, "porta": args.porta, "token": args.token,
+                  "max_simultaneas": None if args.max_simultaneas is None else max(1, args.max_simultaneas)}
+        return servir(arquivo_perfis=args.perfis, **{chave: valor for chave, valor in opcoes.items() if valor is not None})
+    return executar_perfil(args, is_dry_run=args.comando == "dry-run")
@@ -0,0 +1,237 @@
+"""Montagem dos comandos do rclone: limite de banda, ajustes, fragmentos e arquivos de filtro."""
+
+import os
+import re
+import tempfile
+
+from cloudease.perfis import AJUSTES_PADRAO
+
+USAR_JSON_LOG = True # Executa o rclone com --use-json-log e lê as estatísticas estruturadas
+MAX_FRAGMENTOS = 8 # Máximo de processos rclone paralelos de uma mesma origem (modo fragmentado)
+LIMITE_ARQUIVO_GRANDE = 64 * 1024 * 1024 # Na separação por tamanho, arquivos a partir disso vão para a passada de grandes
+AJUSTES_ARQUIVOS_PEQUENOS = {"transfers": 32, "checkers": 32, "chunk_size": "10M"}
+AJUSTES_ARQUIVOS_GRANDES = {"transfers": 4, "checkers": 8, "chunk_size": "160M"}
+STREAMS_ARQUIVOS_GRANDES = 4 # --multi-thread-streams da passada de arquivos grandes
+CONTROLE_BANDA_AO_VIVO = True # Abre o servidor rc em cada processo rclone para alterar o limite de banda sem reiniciar
+
+def validar_caminho(path):
+    """
+    Valida caracteres básicos em um caminho.
+    Normaliza o caminho e lida com caracteres inválidos em nomes de arquivo.
+    Permite caracteres acentuados e outros caracteres Unicode.
+    """
+    normalized_path = os.path.normpath(path)
+    # Removido '+' do conjunto de caracteres inválidos
+    invalid_chars_set = set('<>\"|?*#%&=@[]{}!`\'"')
+
+    is_windows_drive_path = False
+    if len(normalized_path) >= 2 and normalized_path[1] == ':' and normalized_path[0].isalpha():
+        is_windows_drive_path = True
+
+    for i, c in enumerate(normalized_path):
+        if c == ':' and is_windows_drive_path and i == 1:
+            continue
+        if c == '/' or c == '\\':
+            continue
+        if ord(c) < 32 or ord(c) == 127:
+            return False, f"caractere de controle ASCII (código: {ord(c)}) na posição {i}"
+        if c in invalid_chars_set:
+            return False, f"'{c}' (na posição {i})"
+            
+    return True, None
+
+def gravar_files_from(caminhos):
+    """Grava a lista de caminhos num arquivo temporário para --files-from e retorna o nome do arquivo."""
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", prefix="cloudease_", delete=False) as f:
+        for caminho in caminhos:
+            f.write(caminho + "\n")
+        return f.name
+
+def caminho_remoto(destino, *partes):
+    """Junta 'destino' (ex: 'onedrive:Backup' ou 'onedrive:') com partes de caminho relativas (vazias são ignoradas)."""
+    caminho = destino
+    for parte in partes:
+        if parte:
+            caminho = caminho + parte if caminho.endswith((":", "/")) else f"{caminho}/{parte}"
+    return caminho
+
+def destino_com_chunk(destino, ajustes):
+    """Inclui o chunk_size no remote do destino (ex: 'onedrive,chunk_size=80M:pasta'), para jobs no daemon."""
+    if not ajustes:
+        return destino
+    remote, separador, caminho = destino.partition(":")
+    if not separador:
+        return destino
+    return f"{remote},chunk_size={ajustes['chunk_size']}:{caminho}"
+
+def converter_bwlimit(bwlimit_str):
+    """Converte o limite da tela (Mbps ou 'Sem limite') para o formato do rclone ('12.5M' ou 'off'). Lança ValueError."""
+    if not bwlimit_str or bwlimit_str == "Sem limite":
+        return "off"
+    mbps = float(bwlimit_str)
+    mb_per_sec = mbps * 0.125
+    return f"{mb_per_sec}M"
+
+# Entrada de timetable do rclone: 'HH:MM' ou 'Ddd-HH:MM' (ex: 'Mon-08:00')
+PADRAO_HORARIO_BANDA = re.compile(r"^(?:(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)-)?(\d{1,2}):(\d{2})$")
+
+def converter_horario_bwlimit(texto):
+    """
+    Converte um horário de banda no formato de timetable do rclone, com as taxas em Mbps como
+    na tela: '08:00,50 18:00,off' -> '08:00,6.25M 18:00,off'. Dias da semana ('Mon-08:00,50') e
+    taxas com unidade do rclone ('512k', '10M:1M') são mantidos. Lança ValueError.
+    """
+    entradas = []
+    for entrada in texto.split():
+        quando, separador, taxa = entrada.rpartition(",")
+        match = PADRAO_HORARIO_BANDA.match(quando)
+        if not separador or not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+            raise ValueError(f"Entrada de horário inválida: {entrada}")
+        if taxa.lower() == "off":
+            taxa = "off"
+        elif re.fullmatch(r"\d+(?:\.\d+)?", taxa):
+            taxa = f"{float(taxa) * 0.125:g}M"
+        elif not re.fullmatch(r"\d+(?:\.\d+)?[KMGkmg](?::\d+(?:\.\d+)?[KMGkmg]?)?", taxa):
+            raise ValueError(f"Taxa inválida no horário: {entrada}")
+        entradas.append(f"{quando},{taxa}")
+    if not entradas:
+        raise ValueError("Horário de banda vazio")
+    return " ".join(entradas)
+
+def bwlimit_da_execucao(bwlimit_str, horario=""):
+    """Limite de banda de uma execução: o horário (timetable) do perfil, se houver, senão o limite fixo. Lança ValueError."""
+    if horario and horario.strip():
+        return converter_horario_bwlimit(horario)
+    return converter_bwlimit(bwlimit_str)
+
+def dividir_bwlimit(bwlimit, partes):
+    """
+    Divide um limite do rclone (taxa fixa ou timetable) entre 'partes' processos simultâneos,
+    já que cada processo aplica o --bwlimit por conta própria.
+    """
+    if partes <= 1 or bwlimit == "off":
+        return bwlimit
+
+    def dividir_taxa(taxa):
+        lados = []
+        for lado in taxa.split(":"):
+            match = re.fullmatch(r"(\d+(?:\.\d+)?)([KMGkmg]?)", lado)
+            lados.append(f"{float(match.group(1)) / partes:g}{match.group(2)}" if match else lado)
+        return ":".join(lados)
+
+    entradas = []
+    for entrada in bwlimit.split():
+        quando, separador, taxa = entrada.rpartition(",")
+        entradas.append(f"{quando}{separador}{dividir_taxa(taxa)}")
+    return " ".join(entradas)
+
+def montar_comando_rclone(modo, origem, destino, is_dry_run=False, bwlimit="off", endereco_rc=None, ajustes=None, endereco_controle=None):
+    """
+    Monta a linha de comando do rclone para copy/sync.
+    Com 'endereco_rc', o progresso é lido pelo servidor rc e o rclone só escreve avisos e erros.
+    Com 'endereco_controle', o servidor rc é aberto só para comandos (ex: core/bwlimit) e o progresso continua na saída.
+    'ajustes' (transfers, checkers, chunk_size) vem do ajuste automático; o padrão é AJUSTES_PADRAO.
+    """
+    if endereco_rc:
+        # O progresso vem do rc; o rclone só escreve avisos e erros, poupando pipes e disco
+        comando = ["rclone", modo, origem, destino, "--rc", f"--rc-addr={endereco_rc}", "--rc-no-auth", "--stats", "0", "--log-level", "NOTICE"]
+    else:
+        comando = ["rclone", modo, origem, destino, "--stats-one-line", "--stats", "1s", "--verbose"]
+        if endereco_controle:
+            comando += ["--rc", f"--rc-addr={endereco_controle}", "--rc-no-auth"]
+    ajustes = ajustes or AJUSTES_PADRAO
+    comando += [f"--transfers={ajustes['transfers']}", f"--checkers={ajustes['checkers']}", f"--onedrive-chunk-size={ajustes['chunk_size']}"]
+    if USAR_JSON_LOG and not endereco_rc:
+        # Estatísticas estruturadas (bytes, totalBytes, speed, eta, transfers...) em vez de texto
+        comando += ["--use-json-log", "--stats-log-level", "NOTICE"]
+    if is_dry_run:
+        comando.append("--dry-run")
+    if bwlimit != "off":
+        comando.append(f"--bwlimit={bwlimit}")
+    return comando
+
+def dividir_em_fragmentos(arquivos, num_fragmentos):
+    """
+    Divide as subpastas de primeiro nível da origem em até 'num_fragmentos' grupos de tamanho
+    parecido (maior pasta primeiro, sempre no grupo mais leve). 'arquivos' vem de escanear_origem.
+    Os arquivos soltos na raiz não entram em nenhum grupo.
+    """
+    tamanhos = {}
+    for caminho, (tamanho, _) in arquivos.items():
+        pasta, separador, _ = caminho.partition("/")
+        if separador:
+            tamanhos[pasta] = tamanhos.get(pasta, 0) + tamanho
+    grupos = [[] for _ in range(min(num_fragmentos, len(tamanhos)))]
+    cargas = [0] * len(grupos)
+    for pasta in sorted(tamanhos, key=tamanhos.get, reverse=True):
+        i = cargas.index(min(cargas))
+        grupos[i].append(pasta)
+        cargas[i] += tamanhos[pasta]
+    return grupos
+
+def escapar_glob(nome):
+    """Escapa os caracteres especiais dos filtros do rclone (*, ?, [, ], {, }, \\) em um nome de pasta."""
+    return re.sub(r"([*?\[\]{}\\])", r"\\\1", nome)
+
+def gravar_regras_filtro(regras):
+    """Grava regras de filtro do rclone em um arquivo temporário (para --filter-from) e retorna o caminho."""
+    descritor, caminho = tempfile.mkstemp(prefix="cloudease_filtro_", suffix=".txt")
+    with os.fdopen(descritor, "w", encoding="utf-8") as f:
+        for regra in regras:
+            f.write(regra + "\n")
+    return caminho
+
+def comandos_fragmentados(comando_base, grupos):
+    """
+    Comandos de uma origem dividida em fragmentos (grupos de subpastas de primeiro nível), mais uma
+    passada da raiz. Retorna (comandos, arquivos de filtro).
+    Todos apontam para a mesma origem e o mesmo destino, com um --filter-from que só inclui as
+    subpastas do fragmento; no modo sync o rclone apaga no destino apenas o que está dentro do
+    filtro, então a passada da raiz (que exclui as subpastas dos fragmentos) cuida dos arquivos
+    da raiz e das pastas que só existem no destino.
+    """
+    todas = [pasta for grupo in grupos for pasta in grupo]
+    conjuntos_regras = [[f"+ /{escapar_glob(p)}/**" for p in grupo] + ["- **"] for grupo in grupos]
+    conjuntos_regras.append([f"- /{escapar_glob(p)}/**" for p in todas] + ["+ **"])
+    arquivos_filtro = [gravar_regras_filtro(regras) for regras in conjuntos_regras]
+    return [comando_base + ["--filter-from", arquivo] for arquivo in arquivos_filtro], arquivos_filtro
+
+def comando_exclusao(destino, arquivo_exclusoes, is_dry_run=False):
+    """Comando do rclone que apaga no destino os caminhos listados (um por linha) em 'arquivo_exclusoes'."""
+    comando = ["rclone", "delete", destino, "--files-from", arquivo_exclusoes, "--verbose"]
+    if USAR_JSON_LOG:
+        comando += ["--use-json-log"]
+    if is_dry_run:
+        comando.append("--dry-run")
+    return comando
+
+def etapas_por_tamanho(modo, origem, destino, argumentos, is_dry_run=False, bwlimit="off", ajustes_final=None, exclusoes=None):
+    """
+    Etapas de uma execução separada por classe de tamanho: uma passada para os arquivos pequenos
+    (muitas transferências, chunk pequeno) e outra para os grandes (poucas transferências, chunk
+    grande e vários streams), em paralelo. As duas usam 'copy', para que um arquivo que mudou de
+    classe não seja apagado por uma passada enquanto a outra o envia; no modo sync as exclusões
+    vêm depois. Com a lista 'exclusoes' (arquivos que saíram da origem, pelo manifesto), elas são
+    um 'rclone delete' só desses caminhos; sem a lista (None), uma passada final de sync completa.
+    Retorna (etapas, arquivos temporários).
+    """
+    bwlimit_passada = dividir_bwlimit(bwlimit, 2)
+    pequenos = montar_comando_rclone("copy", origem, destino, is_dry_run, bwlimit_passada, ajustes=AJUSTES_ARQUIVOS_PEQUENOS)
+    pequenos += argumentos + [f"--max-size={LIMITE_ARQUIVO_GRANDE - 1}B"]
+    grandes = montar_comando_rclone("copy", origem, destino, is_dry_run, bwlimit_passada, ajustes=AJUSTES_ARQUIVOS_GRANDES)
+    grandes += argumentos + [f"--min-size={LIMITE_ARQUIVO_GRANDE}B", f"--multi-thread-streams={STREAMS_ARQUIVOS_GRANDES}"]
+    etapas, temporarios = [[pequenos, grandes]], []
+    if modo == "sync" and exclusoes is None:
+        etapas.append([montar_comando_rclone("sync", origem, destino, is_dry_run, bwlimit, ajustes=ajustes_final) + argumentos])
+    elif modo == "sync" and exclusoes:
+        arquivo = gravar_files_from(exclusoes)
+        temporarios.append(arquivo)
+        etapas.append([comando_exclusao(destino, arquivo, is_dry_run)])
+    return etapas, temporarios
+
+def converter_fragmentos(valor):
+    """Número de fragmentos paralelos de um perfil ou da tela (1 = uma única execução do rclone)."""
+    try:
+        return max(1, min(int(valor), MAX_FRAGMENTOS))
+    except (TypeError, ValueError):
+        return 1
@@ -0,0 +1,84 @@
+"""Estimativa própria do tempo restante (ETA) e da vazão em arquivos/s, a partir das estatísticas do rclone."""
+
+import time
+
+MEIA_VIDA_VAZAO_S = 300 # Meia-vida da média exponencial da vazão: amostras mais antigas que isso valem metade
+PESO_HISTORICO_S = 180 # A vazão das execuções anteriores do perfil vale como esse tempo de observação
+OBSERVACAO_MIN_S = 20 # Sem histórico, o ETA só aparece depois desse tempo de transferência
+
+
+class _MediaExponencial:
+    """
+    Média exponencial de uma taxa, ponderada pelo tempo e corrigida pelo peso acumulado:
+    no início ela é a média simples do que foi observado, e um valor inicial ('prior')
+    entra como 'peso_prior_s' segundos de observação que vão perdendo peso como as demais.
+    """
+    def __init__(self, meia_vida_s, prior=None, peso_prior_s=0):
+        self.meia_vida_s = meia_vida_s
+        self.soma = 0.0
+        self.peso = 0.0
+        if prior:
+            self.peso = 1 - 0.5 ** (peso_prior_s / meia_vida_s)
+            self.soma = prior * self.peso
+
+    def registrar(self, taxa, intervalo_s):
+        decaimento = 0.5 ** (intervalo_s / self.meia_vida_s)
+        self.soma = self.soma * decaimento + taxa * (1 - decaimento)
+        self.peso = self.peso * decaimento + (1 - decaimento)
+
+    @property
+    def valor(self):
+        return self.soma / self.peso if self.peso > 0 else None
+
+
+class EstimadorEta:
+    """
+    Estima o tempo restante de uma execução pela vazão observada (média exponencial de
+    bytes/s e de arquivos/s) e pelo que falta (bytes e transferências), em vez de repetir
+    o ETA do rclone, que oscila muito no início. A vazão histórica do perfil, quando há,
+    ("vazao_historica", veja registrar_execucao_perfil) serve de ponto de partida e perde peso
+    conforme a execução avança.
+    O tempo só conta a partir do primeiro byte enviado (antes disso o rclone está listando).
+    O ETA é o maior entre o dos bytes e o dos arquivos: com muitos arquivos pequenos,
+    o limite é a quantidade de arquivos e não os bytes.
+    """
+    def __init__(self, vazao_historica=None, relogio=time.monotonic):
+        self.relogio = relogio
+        self.historico = bool(vazao_historica)
+        self.bytes_s = _MediaExponencial(MEIA_VIDA_VAZAO_S, vazao_historica, PESO_HISTORICO_S)
+        self.arquivos_s = _MediaExponencial(MEIA_VIDA_VAZAO_S)
+        self.observado_s = 0.0
+        self._anterior = None # (momento, bytes, transferências) da última amostra
+
+    def registrar(self, estatisticas, agora=None):
+        """Registra uma amostra (EstatisticasRclone) e retorna o ETA estimado em segundos (None se ainda não há base)."""
+        agora = self.relogio() if agora is None else agora
+        anterior = self._anterior
+        self._anterior = (agora, estatisticas.bytes, estatisticas.transferencias)
+        if anterior is not None and estatisticas.bytes >= anterior[1]:
+            intervalo = agora - anterior[0]
+            if intervalo > 0 and anterior[1] > 0:
+                self.bytes_s.registrar((estatisticas.bytes - anterior[1]) / intervalo, intervalo)
+                self.arquivos_s.registrar(max(0, estatisticas.transferencias - anterior[2]) / intervalo, intervalo)
+                self.observado_s += intervalo
+        return self.eta(estatisticas)
+
+    def eta(self, estatisticas):
+        restante = max(0, estatisticas.total_bytes - estatisticas.bytes)
+        if estatisticas.total_bytes and not restante:
+            return 0
+        if not self.historico and self.observado_s < OBSERVACAO_MIN_S:
+            return None
+        bytes_s = self.bytes_s.valor
+        if not bytes_s or not estatisticas.total_bytes:
+            return None
+        eta = restante / bytes_s
+        arquivos_s = self.arquivos_s.valor
+        faltam = estatisticas.total_transferencias - estatisticas.transferencias
+        if arquivos_s and faltam > 0:
+            eta = max(eta, faltam / arquivos_s)
+        return int(eta)
+
+    def arquivos_por_s(self):
+        """Vazão média recente em arquivos/s, ou None antes do primeiro byte."""
+        return self.arquivos_s.valor if self.observado_s else None
@@ -0,0 +1,777 @@
+"""Execução do rclone: processos paralelos com saída combinada, tarefas de sincronização e a fila de perfis."""
+
+import subprocess
+import os
+import json
+import threading
+import time
+import sys
+import queue
+from datetime import datetime
+
+from cloudease.perfis import AJUSTES_PADRAO, AmostradorVazao
+from cloudease.logs import nome_log_tarefa
+from cloudease.parsers import EstatisticasRclone, extrair_arquivo_concluido, extrair_entrada_json, formatar_bytes, interpretar_linha_stderr_completa
+from cloudease.comandos import CONTROLE_BANDA_AO_VIVO, LIMITE_ARQUIVO_GRANDE, MAX_FRAGMENTOS, bwlimit_da_execucao, comandos_fragmentados, converter_fragmentos, destino_com_chunk, dividir_bwlimit, dividir_em_fragmentos, etapas_por_tamanho, montar_comando_rclone
+from cloudease.remoto import INTERVALO_RC_S, USAR_RC_STATS, ClienteRc, JobDaemon, porta_livre
+from cloudease.varredura import ResumoVarredura, pre_varrer_origem
+from cloudease.filtros import FiltroExclusao
+from cloudease.plano import ARQ_PLANO_TESTE, USAR_MANIFESTO, DiarioRetomada, ManifestoLocal, PlanoTeste, assinatura_origem, planejar_execucao
+from cloudease.pacotes import preparar_empacotamento
+from cloudease.estimativa import EstimadorEta
+from cloudease.vigia import ETAPAS_TRAVAMENTO, MAX_REINICIOS_TRAVAMENTO, VigiaTravamento, ajustes_reduzidos, descrever_travamento, janela_do_perfil
+
+MAX_TAREFAS_SIMULTANEAS = 2 # Processos rclone simultâneos da fila de perfis (padrão da janela da fila)
+
+
+class _SaidaCombinada:
+    """Fluxo de texto que junta as linhas de vários processos; readline() retorna '' quando todos terminaram."""
+    def __init__(self, fontes):
+        self._fila = queue.Queue()
+        self._fontes_abertas = fontes
+        self.closed = False
+
+    def escrever(self, linha):
+        self._fila.put(linha)
+
+    def fonte_encerrada(self):
+        self._fila.put(None)
+
+    def readline(self):
+        while self._fontes_abertas > 0:
+            linha = self._fila.get()
+            if linha is not None:
+                return linha
+            self._fontes_abertas -= 1
+        return ''
+
+    def read(self):
+        return ''.join(iter(self.readline, ''))
+
+    def close(self):
+        self.closed = True
+
+
+class ExecucaoParalela:
+    """
+    Vários processos rclone tratados como um só, com a interface de subprocess.Popen usada
+    pela TarefaSincronizacao (poll, wait, terminate, returncode, stdout/stderr).
+    'etapas' é uma lista de listas de comandos: os comandos de uma etapa rodam em paralelo
+    e a etapa seguinte só começa quando todos terminaram com sucesso.
+    As linhas de estatística de cada processo são substituídas por uma linha JSON com o total
+    somado, de modo que a barra de progresso e os rótulos mostram o conjunto.
+    'arquivos_temporarios' (ex: filtros) são apagados ao final.
+    Com CONTROLE_BANDA_AO_VIVO, cada processo abre o seu servidor rc e definir_banda() divide
+    o novo limite entre os processos em execução.
+    """
+    def __init__(self, etapas, arquivos_temporarios=()):
+        self.etapas = [list(etapa) for etapa in etapas if etapa]
+        self.clientes_controle = {} # índice do processo -> ClienteRc
+        self.arquivos_temporarios = list(arquivos_temporarios)
+        self.total_processos = sum(len(etapa) for etapa in self.etapas)
+        self.returncode = None
+        self.erro = None
+        self.processos = []
+        self._estatisticas = {}
+        self._trava = threading.Lock()
+        self._cancelada = False
+        self._concluida = threading.Event()
+        self.stdout = _SaidaCombinada(self.total_processos)
+        self.stderr = _SaidaCombinada(self.total_processos)
+        threading.Thread(target=self._coordenar, daemon=True).start()
+
+    def _coordenar(self):
+        codigo = 0
+        iniciados = 0
+        try:
+            for etapa in self.etapas:
+                if self._cancelada:
+                    codigo = codigo or 1
+                    break
+                processos_etapa = []
+                for comando in etapa:
+                    endereco = None
+                    if CONTROLE_BANDA_AO_VIVO:
+                        endereco = f"127.0.0.1:{porta_livre()}"
+                        comando = comando + ["--rc", f"--rc-addr={endereco}", "--rc-no-auth"]
+                    with self._trava:
+                        processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", bufsize=1)
+                        indice = len(self.processos)
+                        self.processos.append(processo)
+                        if endereco:
+                            self.clientes_controle[indice] = ClienteRc(endereco)
+                        if self._cancelada:
+                            processo.terminate()
+                    iniciados += 1
+                    processos_etapa.append(processo)
+                    threading.Thread(target=self._ler, args=(processo.stdout, self.stdout, None), daemon=True).start()
+                    threading.Thread(target=self._ler, args=(processo.stderr, self.stderr, indice), daemon=True).start()
+                codigos = [p.wait() for p in processos_etapa]
+                falhas = [c for c in codigos if c != 0]
+                if falhas:
+                    codigo = falhas[0]
+                    break
+        except OSError as e:
+            self.erro = str(e)
+            codigo = 1
+            self.terminate()
+        finally:
+            # Fontes dos processos que não chegaram a ser iniciados
+            for _ in range(self.total_processos - iniciados):
+                self.stdout.fonte_encerrada()
+                self.stderr.fonte_encerrada()
+            for arquivo in self.arquivos_temporarios:
+                try:
+                    os.remove(arquivo)
+                except OSError:
+                    pass
+            self.returncode = codigo
+            self._concluida.set()
+
+    def _ler(self, origem, destino, indice):
+        for linha in iter(origem.readline, ''):
+            if indice is not None:
+                linha = self._agregar(indice, linha)
+            destino.escrever(linha)
+        origem.close()
+        if indice is not None:
+            with self._trava:
+                final = self._estatisticas.get(indice)
+                if final is not None:
+                    final.velocidade, final.eta = 0.0, 0
+        destino.fonte_encerrada()
+
+    def _agregar(self, indice, linha):
+        """Registra as estatísticas do processo e devolve a linha de estatísticas somadas (ou a linha original)."""
+        entrada, estatisticas = extrair_entrada_json(linha)
+        if entrada is None:
+            estatisticas = EstatisticasRclone.de_texto(linha)
+        if estatisticas is None:
+            return linha
+        with self._trava:
+            self._estatisticas[indice] = estatisticas
+            total = EstatisticasRclone.somar(self._estatisticas.values())
+            ativos = sum(1 for p in self.processos if p.poll() is None)
+        return json.dumps({
+            "level": "notice",
+            "msg": f"{ativos}/{self.total_processos} processo(s) rclone em execução",
+            "stats": total.para_json(),
+        }) + "\n"
+
+    def definir_banda(self, taxa):
+        """Aplica um novo limite (formato do rclone) aos processos em execução, dividido entre eles."""
+        with self._trava:
+            clientes = [cliente for indice, cliente in self.clientes_controle.items() if self.processos[indice].poll() is None]
+        for cliente in clientes:
+            try:
+                cliente.chamar("core/bwlimit", rate=dividir_bwlimit(taxa, len(clientes)))
+            except (OSError, RuntimeError, ValueError):
+                pass
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        self._concluida.wait()
+        return self.returncode
+
+    def terminate(self):
+        with self._trava:
+            self._cancelada = True
+            processos = list(self.processos)
+        for processo in processos:
+            if processo.poll() is None:
+                processo.terminate()
+
+def iniciar_processo_rclone(modo, origem, destino, plano, is_dry_run=False, bwlimit="off", endereco_rc=None, fragmentos=1, log=None,
+                            separar_tamanhos=False, endereco_controle=None):
+    """
+    Inicia o rclone para um plano de execução: um único processo, ou uma ExecucaoParalela quando
+    'separar_tamanhos' (passadas por classe de tamanho) ou 'fragmentos' > 1 e o plano compara a
+    origem inteira (ou uma janela --max-age). A separação por tamanho tem precedência.
+    Nas execuções paralelas o limite de banda é dividido entre os processos simultâneos.
+    """
+    if separar_tamanhos:
+        if log:
+            log.write(f"Passadas por tamanho: arquivos abaixo de {LIMITE_ARQUIVO_GRANDE // (1024 * 1024)} MiB e a partir disso\n")
+        etapas, temporarios = etapas_por_tamanho(modo, origem, destino, plano.argumentos(), is_dry_run, bwlimit, plano.ajustes, plano.exclusoes)
+        return ExecucaoParalela(etapas, temporarios)
+    if fragmentos > 1 and plano.arquivo_files_from is None:
+        arquivos = plano.arquivos_atuais if plano.arquivos_atuais is not None else plano.escanear(origem)
+        grupos = dividir_em_fragmentos(arquivos, min(fragmentos, MAX_FRAGMENTOS))
+        if len(grupos) > 1:
+            if log:
+                for i, grupo in enumerate(grupos, 1):
+                    log.write(f"Fragmento {i}: {', '.join(grupo)}\n")
+                log.write(f"Fragmento {len(grupos) + 1}: arquivos da raiz\n")
+            comando = montar_comando_rclone(modo, origem, destino, is_dry_run, dividir_bwlimit(bwlimit, len(grupos) + 1), ajustes=plano.ajustes)
+            comandos, arquivos_filtro = comandos_fragmentados(comando + plano.argumentos(), grupos)
+            return ExecucaoParalela([comandos], arquivos_filtro)
+    comando = montar_comando_rclone(modo, origem, destino, is_dry_run, bwlimit, endereco_rc, plano.ajustes, endereco_controle)
+    comando += plano.argumentos()
+    return subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", bufsize=1)
+
+
+ESTADOS_FINAIS_TAREFA = ("concluída", "sem alterações", "falhou", "cancelada", "pausada")
+
+
+class TarefaSincronizacao:
+    """
+    Sincronização de um perfil: o executor usado pela janela principal, pela fila de perfis,
+    pela linha de comando e pelo servidor.
+    Cada tarefa tem o seu próprio arquivo de log, estado de progresso e processo rclone
+    (ou job no daemon), que pode ser cancelado independentemente das demais.
+    'ao_concluir(tarefa, inicio_iso, completa)' é chamado na thread da tarefa após um sucesso.
+    Com is_dry_run=True a tarefa só testa (--dry-run) e registra as ações anunciadas num PlanoTeste,
+    que a execução real seguinte usa se a origem não mudou; nada é registrado no perfil.
+    Com "pre_varredura" no perfil, o progresso usa o total planejado, obtido da origem antes do rclone,
+    quando a lista do que vai ser enviado é conhecida (numa comparação completa vale o total do rclone).
+    Com retomar=True, uma execução real interrompida do mesmo par origem/destino continua pelo
+    diário de retomada, enviando só os arquivos que faltam.
+    Pausar interrompe o rclone como o cancelamento; a retomada é uma nova execução do perfil
+    (nova_execucao) que continua pelo diário de retomada, enviando só os arquivos que faltam.
+    Um VigiaTravamento acompanha o progresso: sem bytes novos com trabalho pendente, avisa em
+    'alerta' e depois reinicia o rclone com metade da concorrência, só com os arquivos que faltam
+    (diário de retomada da execução real, alimentado pela saída ou, no daemon, por core/transferred).
+    Os retornos opcionais, chamados na thread da tarefa, alimentam uma interface:
+    'ao_texto(texto)' com a saída para o console, 'ao_status(mensagem)' com a etapa atual e
+    'ao_progresso(campos, arquivos_por_s)' a cada estatística.
+    """
+    def __init__(self, nome_perfil, perfil, daemon=None, ao_concluir=None, is_dry_run=False, retomar=False, log_nome=None,
+                 ao_texto=None, ao_status=None, ao_progresso=None):
+        self.nome_perfil = nome_perfil
+        self.perfil = dict(perfil)
+        self.daemon = daemon
+        self.ao_concluir = ao_concluir
+        self.is_dry_run = is_dry_run
+        self.retomar = retomar
+        self.ao_texto = ao_texto
+        self.ao_status = ao_status
+        self.ao_progresso = ao_progresso
+        self.id = None # Número dado pela FilaSincronizacao (a retomada de uma tarefa pausada mantém o número)
+        self.estado = "na fila"
+        self.campos = None # Últimas estatísticas (MiB, MiB, %, velocidade, ETA)
+        self.alerta = None # Última mensagem do vigia de travamento (None quando há progresso)
+        self.arquivos_por_s = None # Vazão recente em arquivos/s (EstimadorEta)
+        self.erro = None # Motivo de uma falha, para quem mostra o resultado (o log tem os detalhes)
+        self.duracao = 0.0
+        self.log_nome = log_nome
+        self.processo = None
+        self.cliente_banda = None # ClienteRc do rclone em execução (controle de banda ao vivo)
+        self.cancelada = False
+        self.pausada = False
+        self.ajustes = None
+        self.linhas_filtro = [] # Prévia do filtro de exclusão (o que cada regra tirou da execução)
+        self.amostrador = AmostradorVazao()
+        self._trava = threading.Lock()
+
+    @property
+    def finalizada(self):
+        return self.estado in ESTADOS_FINAIS_TAREFA
+
+    def progresso(self):
+        """Retorna (estado, campos de estatística ou None) de forma segura entre threads."""
+        with self._trava:
+            return self.estado, self.campos
+
+    def _atualizar(self, estado=None, campos=None, alerta=None):
+        """Atualiza estado, campos e alerta ('' limpa o alerta); None mantém o valor atual."""
+        with self._trava:
+            if estado is not None:
+                self.estado = estado
+            if alerta is not None:
+                self.alerta = alerta or None
+            if campos is not None:
+                self.campos = campos
+                self.amostrador.registrar_campos(campos)
+
+    def _texto(self, texto):
+        if self.ao_texto:
+            self.ao_texto(texto)
+
+    def _status(self, mensagem):
+        if self.ao_status:
+            self.ao_status(mensagem)
+
+    def resumo(self):
+        """Estado e progresso da tarefa num dicionário pronto para JSON (linha de comando e servidor)."""
+        estado, campos = self.progresso()
+        resumo = {"perfil": self.nome_perfil, "estado": estado, "teste": self.is_dry_run, "log": self.log_nome}
+        if self.alerta:
+            resumo["alerta"] = self.alerta
+        if self.arquivos_por_s is not None:
+            resumo["arquivos_por_s"] = round(self.arquivos_por_s, 2)
+        if campos is not None:
+            transferido, total, porcentagem, velocidade, eta = campos
+            resumo.update(transferido_mib=transferido, total_mib=total, porcentagem=porcentagem, velocidade=velocidade, eta=eta)
+        return resumo
+
+    @property
+    def _estado_interrompida(self):
+        return "pausada" if self.pausada else "cancelada"
+
+    def cancelar(self):
+        with self._trava:
+            self.cancelada = True
+            if self.estado == "na fila":
+                self.estado = self._estado_interrompida
+            processo = self.processo
+        if processo is not None and processo.poll() is None:
+            processo.terminate()
+
+    def pausar(self):
+        """Interrompe a tarefa para retomá-la depois com nova_execucao. Retorna False se ela já terminou."""
+        with self._trava:
+            if self.estado in ESTADOS_FINAIS_TAREFA:
+                return False
+            self.pausada = True
+        self.cancelar()
+        return True
+
+    def nova_execucao(self):
+        """
+        Nova tarefa do mesmo perfil e com as mesmas opções (retomada de uma tarefa pausada).
+        Uma execução real continua pelo diário de retomada em vez de recomeçá-lo.
+        """
+        return TarefaSincronizacao(self.nome_perfil, self.perfil, self.daemon, self.ao_concluir, self.is_dry_run,
+                                   retomar=not self.is_dry_run, ao_texto=self.ao_texto, ao_status=self.ao_status,
+                                   ao_progresso=self.ao_progresso)
+
+    def definir_banda(self, taxa):
+        """
+        Aplica um novo limite de banda (formato do rclone) à execução em andamento via core/bwlimit,
+        sem reiniciar o rclone. Retorna False se a execução não tem um servidor rc para isso.
+        """
+        processo = self.processo
+        if processo is None or processo.poll() is not None:
+            return False
+        if isinstance(processo, ExecucaoParalela):
+            processo.definir_banda(taxa)
+        elif isinstance(processo, JobDaemon):
+            processo.daemon.cliente.chamar("core/bwlimit", rate=taxa)
+        elif self.cliente_banda is not None:
+            self.cliente_banda.chamar("core/bwlimit", rate=taxa)
+        else:
+            return False
+        return True
+
+    def _consultar_rc(self, cliente, grupo, log, registrar_estatisticas, diario=None, status_execucao=""):
+        """
+        Consulta core/stats e core/transferred de 'grupo' (None: o servidor inteiro) a intervalos
+        fixos enquanto o processo roda. Os arquivos copiados vão para o diário de retomada.
+        """
+        concluidos = set()
+        filtro = {"group": grupo} if grupo else {}
+        while self.processo.poll() is None:
+            try:
+                stats = cliente.chamar("core/stats", **filtro)
+                transferidos = cliente.chamar("core/transferred", **filtro).get("transferred") or []
+            except (OSError, RuntimeError, ValueError):
+                # O servidor rc ainda não subiu (ou o rclone está terminando)
+                time.sleep(INTERVALO_RC_S)
+                continue
+            for item in transferidos:
+                chave = (item.get("name"), item.get("completed_at"))
+                if chave in concluidos:
+                    continue
+                concluidos.add(chave)
+                resultado = item.get("error") or ("Checked" if item.get("checked") else "Copied")
+                if diario is not None and resultado == "Copied":
+                    diario.registrar(item.get("name"))
+                log.write(f"[RC] {item.get('name')}: {resultado}\n")
+                self._texto(f"[Rclone] {item.get('name')}: {resultado}\n")
+            registrar_estatisticas(EstatisticasRclone.de_json(stats))
+            em_andamento = stats.get("transferring") or []
+            if em_andamento:
+                atual = em_andamento[0]
+                self._status(f"{status_execucao} {len(em_andamento)} em andamento: {atual.get('name')} ({atual.get('percentage', 0)}%)")
+            time.sleep(INTERVALO_RC_S)
+
+    def _iniciar_processo(self, modo_execucao, origem, destino, plano, plano_teste, bwlimit_rclone, log):
+        """
+        Inicia o rclone desta execução (o plano do teste, um job no daemon ou processos locais) em self.processo.
+        Retorna (ClienteRc a consultar por core/stats ou None, grupo de estatísticas ou None).
+        Deve ser chamado com a trava adquirida.
+        """
+        fragmentos = converter_fragmentos(self.perfil.get("fragmentos", 1))
+        separar_tamanhos = self.perfil.get("separar_tamanhos", False)
+        if plano_teste is not None:
+            log.write(f"Usando o plano do teste: {len(plano_teste.copias)} cópia(s), {len(plano_teste.exclusoes)} exclusão(ões), "
+                      f"{len(plano_teste.pastas_removidas)} pasta(s) removida(s)\n")
+            etapas, temporarios = plano_teste.etapas(bwlimit_rclone, plano.ajustes)
+            self.processo = ExecucaoParalela(etapas, temporarios)
+            return None, None
+        # Um plano com exclusões pelo manifesto depende da etapa de 'rclone delete' das passadas por tamanho
+        if self.daemon is not None and self.daemon.ativo() and plano.exclusoes is None:
+            # Sincronização como job assíncrono no rcd (conexões e tokens já estão abertos)
+            config = {"DryRun": self.is_dry_run}
+            filtro = plano.opcoes_rc(config)
+            self.processo = self.daemon.iniciar_sync(modo_execucao, origem, destino_com_chunk(destino, plano.ajustes), config, bwlimit_rclone, filtro)
+            log.write(f"Sincronização iniciada no daemon rcd (job {self.processo.jobid})\n")
+            return self.daemon.cliente, self.processo.grupo
+        endereco_rc = None
+        endereco_controle = None
+        # Vários processos não compartilham um servidor rc; o progresso vem das linhas somadas
+        if USAR_RC_STATS and fragmentos <= 1 and not separar_tamanhos:
+            endereco_rc = f"127.0.0.1:{porta_livre()}"
+        elif CONTROLE_BANDA_AO_VIVO and fragmentos <= 1 and not separar_tamanhos:
+            # Só o servidor rc, para o controle de banda; o progresso continua vindo da saída
+            endereco_controle = f"127.0.0.1:{porta_livre()}"
+        self.cliente_banda = ClienteRc(endereco_rc or endereco_controle) if endereco_rc or endereco_controle else None
+        self.processo = iniciar_processo_rclone(modo_execucao, origem, destino, plano, self.is_dry_run, bwlimit_rclone, endereco_rc, fragmentos, log,
+                                                separar_tamanhos, endereco_controle)
+        return (self.cliente_banda if endereco_rc else None), None
+
+    def executar(self):
+        """Executa a sincronização na thread atual (chamado pela fila, pela janela principal e pela linha de comando)."""
+        origem = self.perfil["origem"].replace("\\", "/")
+        destino = f"onedrive:{self.perfil['destino']}"
+        modo = self.perfil.get("modo", "copy")
+        inicio = time.time()
+        inicio_iso = datetime.now().isoformat(timespec="seconds")
+        self.log_nome = self.log_nome or nome_log_tarefa(self.nome_perfil)
+        status_execucao = f"🚀 Sincronizando ({'Teste' if self.is_dry_run else 'Real'})..."
+        self._atualizar("verificando")
+
+        plano = None
+        diario = None
+        try:
+            with open(self.log_nome, "w", encoding="utf-8") as log:
+                log.write(f"Perfil: {self.nome_perfil or '(execução avulsa)'} ({modo}) {origem} -> {destino}\n")
+                try:
+                    bwlimit_rclone = bwlimit_da_execucao(self.perfil.get("bwlimit", "Sem limite"), self.perfil.get("bwlimit_horario", ""))
+                except ValueError:
+                    log.write(f"Limite ou horário de banda inválido no perfil: {self.perfil.get('bwlimit')} {self.perfil.get('bwlimit_horario', '')}; usando sem limite\n")
+                    bwlimit_rclone = "off"
+                try:
+                    filtro = FiltroExclusao.do_perfil(self.perfil.get("filtros_lixo"), self.perfil.get("regras_exclusao"))
+                except ValueError as e:
+                    log.write(f"Regra de exclusão inválida no perfil: {e}\n")
+                    self.erro = f"Regra de exclusão inválida: {e}"
+                    self._atualizar("falhou")
+                    return
+
+                # Pacotes: pastas dominadas por arquivos pequenos vão num .tar cada, enviados antes do rclone;
+                # os arquivos empacotados saem da execução do rclone pelo filtro
+                varredura = None
+                if self.perfil.get("agrupar_pequenos"):
+                    self._status("📦 Procurando pastas com muitos arquivos pequenos...")
+                    agrupador, pastas_pacotes, varredura, filtro = preparar_empacotamento(origem, destino, self.perfil, filtro)
+                    with self._trava:
+                        if self.cancelada:
+                            self.estado = self._estado_interrompida
+                            return
+                        self.processo = agrupador
+                        self.estado = "empacotando"
+
+                    def progresso_pacotes(i, total, pasta):
+                        self._status(f"📦 Enviando pacote {i}/{total}: {pasta or '(raiz)'}")
+
+                    if not agrupador.executar(pastas_pacotes, modo, bwlimit_rclone, self.is_dry_run, log, progresso_pacotes):
+                        log.write("Envio dos pacotes interrompido.\n")
+                        if not self.cancelada:
+                            self.erro = "Não foi possível enviar os pacotes de arquivos pequenos"
+                        self._atualizar(self._estado_interrompida if self.cancelada else "falhou")
+                        return
+
+                # Pré-varredura: totais da origem antes de tudo (rápida com o cache das pastas que não mudaram),
+                # para que o progresso não dependa do total que o rclone vai descobrindo
+                pre_varredura = self.perfil.get("pre_varredura", False)
+                if pre_varredura:
+                    self._status("📊 Pré-varredura da pasta local...")
+                    arquivos_pre, reaproveitadas = pre_varrer_origem(origem)
+                    if filtro is not None:
+                        arquivos_pre, _ = filtro.aplicar(arquivos_pre)
+                    linhas_resumo = ResumoVarredura.de_arquivos(arquivos_pre).linhas_log()
+                    log.writelines(linhas_resumo)
+                    log.write(f"  {reaproveitadas} pasta(s) reaproveitada(s) do cache da pré-varredura\n")
+                    for linha in linhas_resumo:
+                        self._texto(linha)
+
+                # Manifesto: se nada mudou na origem desde a última sincronização bem-sucedida,
+                # o rclone nem é executado; se mudou pouco, recebe só os arquivos alterados
+                if USAR_MANIFESTO:
+                    self._status("🔎 Verificando alterações na pasta local...")
+                plano = planejar_execucao(origem, destino, modo, self.perfil, log, filtro, varredura)
+                self.ajustes = plano.ajustes
+                self.linhas_filtro = plano.linhas_filtro()
+                log.writelines(self.linhas_filtro)
+                if plano.nada_mudou:
+                    self._atualizar("sem alterações")
+                    return
+                self._status(status_execucao)
+                if self.is_dry_run:
+                    # Prévia do filtro: o que cada regra tirou da sincronização
+                    for linha in self.linhas_filtro:
+                        self._texto(linha)
+
+                # O teste registra as ações anunciadas pelo rclone; a execução real seguinte executa
+                # exatamente esse plano se a origem não mudou, sem comparar as duas árvores de novo
+                arquivos_origem = plano.arquivos_atuais if plano.arquivos_atuais is not None else plano.escanear(origem)
+                modo_execucao = modo
+                plano_teste = None
+                restantes = None
+                if not self.is_dry_run:
+                    # Diário dos arquivos concluídos: ponto de partida da retomada e de um reinício pelo vigia
+                    diario = DiarioRetomada(ManifestoLocal.chave(origem, destino))
+                    if self.retomar and diario.contar(modo):
+                        # Só os arquivos planejados que ainda não constam no diário.
+                        # No modo sync as exclusões ficam para a próxima execução completa.
+                        restantes, ja_concluidos = plano.retomar(arquivos_origem, diario.carregar(modo))
+                        log.write(f"Retomando: {ja_concluidos} arquivo(s) já enviados, {len(restantes)} restante(s)\n")
+                        modo_execucao = "copy"
+                    elif os.path.exists(ARQ_PLANO_TESTE):
+                        plano_teste = PlanoTeste.carregar_valido(origem, destino, modo, assinatura_origem(arquivos_origem))
+                    diario.iniciar(modo, arquivos_origem, continuar=restantes is not None)
+
+                total_fixo = None
+                if pre_varredura:
+                    # Total exato só quando a lista do que vai ser enviado é explícita (plano do teste,
+                    # retomada ou --files-from do manifesto). Numa comparação completa o rclone envia só
+                    # a diferença para o destino, e o total dele é o que vale
+                    if plano_teste is not None:
+                        planejados = plano_teste.copias
+                    elif restantes is not None:
+                        planejados = restantes
+                    else:
+                        planejados = plano.lista_explicita()
+                    if planejados is not None:
+                        total_fixo = ResumoVarredura.de_arquivos(arquivos_origem, planejados).bytes
+                        log.write(f"Total planejado para o progresso: {len(planejados)} arquivo(s), {formatar_bytes(total_fixo)}\n")
+                    else:
+                        log.write("Comparação completa com o destino: o progresso usa o total do rclone\n")
+
+                reinicios = 0
+                # O ETA mostrado é o do EstimadorEta (a vazão histórica do perfil é o ponto de partida)
+                estimador = EstimadorEta(self.perfil.get("vazao_historica"))
+                while True:
+                    plano_teste_novo = None
+                    if self.is_dry_run:
+                        plano_teste_novo = PlanoTeste(origem, destino, modo, assinatura_origem(arquivos_origem), time.time(), plano.completa)
+                    with self._trava:
+                        if self.cancelada:
+                            self.estado = self._estado_interrompida
+                            return
+                        try:
+                            cliente_rc, grupo_rc = self._iniciar_processo(modo_execucao, origem, destino, plano, plano_teste, bwlimit_rclone, log)
+                        except (RuntimeError, ValueError, KeyError) as e:
+                            # Falha do daemon ao aceitar o job (os erros ao iniciar um processo local são OSError)
+                            log.write(f"Erro ao iniciar a sincronização no daemon: {e}\n")
+                            self.erro = f"Não foi possível iniciar a sincronização no daemon do rclone: {e}"
+                            self.estado = "falhou"
+                            return
+                        self.estado = "em execução"
+                    if self.processo.stderr is None:
+                        # Job no daemon: as ações do teste não passam pela saída, então não há plano a registrar
+                        plano_teste_novo = None
+
+                    # Depois de MAX_REINICIOS_TRAVAMENTO reinícios o vigia só avisa
+                    vigia = VigiaTravamento(janela_do_perfil(self.perfil),
+                                            ETAPAS_TRAVAMENTO if reinicios < MAX_REINICIOS_TRAVAMENTO else ETAPAS_TRAVAMENTO[:-1])
+
+                    def registrar_estatisticas(estatisticas):
+                        if vigia.registrar(estatisticas):
+                            log.write("[VIGIA] Progresso retomado\n")
+                            self._atualizar(alerta="")
+                            self._status(status_execucao)
+                        if total_fixo:
+                            estatisticas = estatisticas.com_total(total_fixo)
+                        estatisticas.eta = estimador.registrar(estatisticas)
+                        self.arquivos_por_s = estimador.arquivos_por_s()
+                        campos = estatisticas.para_exibicao()
+                        self._atualizar(campos=campos)
+                        if self.ao_progresso:
+                            self.ao_progresso(campos, self.arquivos_por_s)
+
+                    def reagir(etapa, parado_s):
+                        if etapa == "reiniciar":
+                            # O reinício roda com metade da concorrência
+                            plano.ajustes = ajustes_reduzidos(plano.ajustes or AJUSTES_PADRAO)
+                            self.ajustes = None # Uma execução perturbada pelo vigia não avalia o ajuste automático
+                        mensagem = descrever_travamento(etapa, parado_s, plano.ajustes)
+                        log.write(f"[VIGIA] {mensagem}\n")
+                        self._atualizar(alerta=mensagem)
+                        self._texto(f"[Vigia] {mensagem}\n")
+                        self._status(f"⚠️ {mensagem}")
+                        if etapa == "reiniciar":
+                            vigia.reiniciar = True
+                            self.processo.terminate()
+
+                    def ler_stdout():
+                        for linha in iter(self.processo.stdout.readline, ''):
+                            log.write(linha)
+                            self._texto(f"[Rclone] {linha}")
+                        self.processo.stdout.close()
+
+                    def ler_stderr():
+                        for linha in iter(self.processo.stderr.readline, ''):
+                            log.write(f"[STDERR] {linha}")
+                            if plano_teste_novo is not None:
+                                plano_teste_novo.registrar(linha)
+                            elif diario is not None:
+                                concluido = extrair_arquivo_concluido(linha)
+                                if concluido:
+                                    diario.registrar(concluido)
+                            texto, campos, estatisticas = interpretar_linha_stderr_completa(linha)
+                            self._texto(f"[Rclone Erro/Aviso/Progresso] {texto}")
+                            if campos is not None:
+                                registrar_estatisticas(estatisticas or EstatisticasRclone.de_campos(campos))
+                        self.processo.stderr.close()
+
+                    leitores = []
+                    vigia.acompanhar(self.processo, reagir)
+                    if self.processo.stdout:
+                        leitores = [threading.Thread(target=ler_stdout, daemon=True), threading.Thread(target=ler_stderr, daemon=True)]
+                        if cliente_rc is not None:
+                            # USAR_RC_STATS: o progresso e os arquivos concluídos também vêm do servidor rc do processo
+                            leitores.append(threading.Thread(target=self._consultar_rc, args=(cliente_rc, None, log, registrar_estatisticas, diario, status_execucao),
+                                                             daemon=True))
+                        for leitor in leitores:
+                            leitor.start()
+                        self.processo.wait()
+                    else:
+                        # Job no daemon: o progresso e os arquivos concluídos vêm do grupo de estatísticas do job
+                        self._consultar_rc(cliente_rc, grupo_rc, log, registrar_estatisticas, diario, status_execucao)
+                    for leitor in leitores:
+                        leitor.join()
+                    vigia.parar()
+
+                    if not vigia.reiniciar or self.cancelada:
+                        break
+                    reinicios += 1
+                    log.write(f"[VIGIA] Reinício {reinicios} de {MAX_REINICIOS_TRAVAMENTO} após travamento, "
+                              f"com --transfers={plano.ajustes['transfers']} --checkers={plano.ajustes['checkers']}\n")
+                    self._atualizar(alerta="")
+                    self._status(f"♻️ Reiniciando após travamento ({reinicios}/{MAX_REINICIOS_TRAVAMENTO})...")
+                    if plano_teste is not None:
+                        # O plano do teste não sabe o que já foi enviado: o reinício segue pelo diário
+                        PlanoTeste.descartar()
+                        plano_teste = None
+                    if diario is not None:
+                        # Só os arquivos que ainda não constam no diário; no modo sync as exclusões ficam para a próxima execução
+                        diario.fechar()
+                        restantes, ja_concluidos = plano.retomar(arquivos_origem, diario.carregar(modo))
+                        diario.iniciar(modo, arquivos_origem, continuar=True)
+                        log.write(f"Retomando: {ja_concluidos} arquivo(s) já enviados, {len(restantes)} restante(s)\n")
+                        modo_execucao = "copy"
+                        if total_fixo:
+                            total_fixo = ResumoVarredura.de_arquivos(arquivos_origem, restantes).bytes
+
+                self.duracao = time.time() - inicio
+                log.write(f"\nDuração: {int(self.duracao // 60)}m {int(self.duracao % 60)}s\n")
+                if self.processo.returncode != 0 and not self.cancelada:
+                    erro_final = getattr(self.processo, "erro", None)
+                    if not erro_final and self.processo.stderr and not self.processo.stderr.closed:
+                        erro_final = self.processo.stderr.read()
+                    if erro_final:
+                        log.write(f"\n--- ERRO FINAL ---\n{erro_final}\n")
+                        self._texto(f"\n[ERRO FINAL Rclone] {erro_final}")
+                if plano_teste is not None:
+                    # Usado (com sucesso ou não), o plano não vale para a próxima execução
+                    PlanoTeste.descartar()
+                if self.cancelada:
+                    log.write(f"Tarefa {self._estado_interrompida} pelo usuário.\n")
+                    self._atualizar(self._estado_interrompida)
+                elif self.processo.returncode != 0:
+                    self._atualizar("falhou")
+                elif self.is_dry_run:
+                    if plano_teste_novo is not None:
+                        plano_teste_novo.salvar()
+                        log.write(f"Plano do teste salvo: {len(plano_teste_novo.copias)} cópia(s), {len(plano_teste_novo.exclusoes)} exclusão(ões)\n")
+                    self._atualizar("concluída")
+                else:
+                    diario.descartar()
+                    if modo_execucao == modo:
+                        # Uma retomada ou um reinício no modo sync não fez as exclusões: o manifesto não pode dar a origem como sincronizada
+                        plano.registrar_sucesso(log)
+                    self._atualizar("concluída")
+                    if self.ao_concluir:
+                        self.ao_concluir(self, inicio_iso, plano_teste.completa if plano_teste is not None else plano.completa)
+        except Exception as e:
+            print(f"Erro na tarefa do perfil '{self.nome_perfil}': {e}")
+            sys.stdout.flush() # Forçar a saída
+            self.erro = str(e)
+            self._atualizar("falhou")
+        finally:
+            self.cliente_banda = None
+            if plano:
+                plano.limpar()
+            if diario is not None:
+                diario.fechar()
+            if self.processo is not None and self.processo.poll() is None:
+                self.processo.terminate()
+
+
+class FilaSincronizacao:
+    """
+    Fila de tarefas de sincronização com um limite de processos rclone simultâneos.
+    Quando uma tarefa termina, a próxima da fila é iniciada na mesma hora, mantendo o uplink ocupado.
+    Cada tarefa recebe um número ('id') que não muda quando a lista muda (tarefas removidas ou retomadas),
+    para identificá-la na interface e no servidor.
+    """
+    def __init__(self, max_simultaneas=MAX_TAREFAS_SIMULTANEAS):
+        self.max_simultaneas = max_simultaneas
+        self.tarefas = [] # Todas as tarefas, na ordem em que foram adicionadas
+        self._ativas = set()
+        self._proximo_id = 1
+        self._trava = threading.Lock()
+
+    def adicionar(self, tarefa):
+        with self._trava:
+            tarefa.id = self._proximo_id
+            self._proximo_id += 1
+            self.tarefas.append(tarefa)
+            self._despachar()
+
+    def definir_max_simultaneas(self, valor):
+        with self._trava:
+            self.max_simultaneas = max(1, int(valor))
+            self._despachar()
+
+    def em_andamento(self, nome_perfil):
+        """Indica se o perfil já tem uma tarefa na fila ou em execução (duas cópias no mesmo destino competiriam)."""
+        with self._trava:
+            return any(t.nome_perfil == nome_perfil and not t.finalizada for t in self.tarefas)
+
+    def cancelar_todas(self):
+        with self._trava:
+            tarefas = list(self.tarefas)
+        for tarefa in tarefas:
+            tarefa.cancelar()
+
+    def retomar(self, tarefa):
+        """
+        Troca uma tarefa pausada por uma nova execução do mesmo perfil, na mesma posição da fila.
+        Retorna a nova tarefa, ou None se a tarefa não está pausada ou o perfil já está em andamento.
+        """
+        with self._trava:
+            if tarefa.estado != "pausada" or tarefa not in self.tarefas:
+                return None
+            if any(t.nome_perfil == tarefa.nome_perfil and not t.finalizada for t in self.tarefas):
+                return None
+            nova = tarefa.nova_execucao()
+            nova.id = tarefa.id
+            self.tarefas[self.tarefas.index(tarefa)] = nova
+            self._despachar()
+            return nova
+
+    def remover_finalizadas(self):
+        with self._trava:
+            self.tarefas = [t for t in self.tarefas if not t.finalizada or t in self._ativas]
+
+    def _despachar(self):
+        """Inicia tarefas pendentes até o limite. Deve ser chamado com a trava adquirida."""
+        for tarefa in self.tarefas:
+            if len(self._ativas) >= self.max_simultaneas:
+                break
+            if tarefa.estado == "na fila" and tarefa not in self._ativas:
+                self._ativas.add(tarefa)
+                threading.Thread(target=self._executar, args=(tarefa,), daemon=True).start()
+
+    def _executar(self, tarefa):
+        try:
+            tarefa.executar()
+        finally:
+            with self._trava:
+                self._ativas.discard(tarefa)
+                self._despachar()
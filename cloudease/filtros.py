@@ -0,0 +1,101 @@
+"""Filtros de exclusão por perfil, no formato de padrões do rclone."""
+
+import re
+
+from cloudease.comandos import gravar_regras_filtro
+
+# Filtros prontos de arquivos de sistema que não precisam ir para o OneDrive (padrões do rclone, sempre exclusão)
+FILTROS_LIXO = {
+    "macOS": ["__MACOSX/**", "._*", ".DS_Store", ".AppleDouble/**", ".Spotlight-V100/**", ".Trashes/**", ".fseventsd/**"],
+    "Windows": ["[Tt]humbs.db", "ehthumbs.db", "[Dd]esktop.ini", "$RECYCLE.BIN/**", "System Volume Information/**"],
+    "Temporários": ["~$*", "*.tmp", ".~lock.*#", "*.swp", "*.crdownload", "*.part"],
+}
+
+def _glob_para_regex(padrao):
+    """
+    Traduz um padrão de filtro do rclone para uma expressão regular sobre o caminho relativo:
+    '/' inicial ancora na raiz (senão o padrão casa com o final do caminho, em qualquer pasta),
+    '*' não cruza '/', '**' cruza, '?' é um caractere, '[...]' é uma classe e '{a,b}' são alternativas.
+    """
+    regex = "^" if padrao.startswith("/") else "(?:^|/)"
+    padrao = padrao.lstrip("/")
+    i = 0
+    chaves = 0
+    while i < len(padrao):
+        c = padrao[i]
+        if c == "\\" and i + 1 < len(padrao):
+            i += 1
+            regex += re.escape(padrao[i])
+        elif padrao.startswith("**", i):
+            regex += ".*"
+            i += 1
+        elif c == "*":
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[":
+            fim = padrao.find("]", i + 1)
+            if fim < 0:
+                raise ValueError(f"Classe '[' sem ']' no padrão: {padrao}")
+            classe = padrao[i + 1:fim]
+            regex += "[" + ("^" + classe[1:] if classe.startswith("!") else classe) + "]"
+            i = fim
+        elif c == "{":
+            regex += "(?:"
+            chaves += 1
+        elif c == "}" and chaves:
+            regex += ")"
+            chaves -= 1
+        elif c == "," and chaves:
+            regex += "|"
+        else:
+            regex += re.escape(c)
+        i += 1
+    if chaves:
+        raise ValueError(f"Chave '{{' sem '}}' no padrão: {padrao}")
+    return re.compile(regex + "$")
+
+class FiltroExclusao:
+    """
+    Regras de exclusão de um perfil (filtros prontos de FILTROS_LIXO + padrões próprios), aplicadas
+    igualmente à varredura local (manifesto, plano, totais) e ao rclone (--filter-from ou ExcludeRule).
+    Um padrão terminado em '/' exclui a pasta inteira (é gravado como 'pasta/**').
+    """
+    def __init__(self, padroes):
+        self.padroes = list(dict.fromkeys(p.strip() + "**" if p.strip().endswith("/") else p.strip() for p in padroes if p.strip()))
+        self._regex = [_glob_para_regex(p) for p in self.padroes]
+
+    @classmethod
+    def do_perfil(cls, filtros_lixo, regras):
+        """Filtro dos nomes de FILTROS_LIXO e das regras próprias de um perfil; None se não houver regra. Lança ValueError."""
+        padroes = [p for nome in filtros_lixo or [] for p in FILTROS_LIXO.get(nome, [])] + list(regras or [])
+        filtro = cls(padroes)
+        return filtro if filtro.padroes else None
+
+    def regra(self, caminho):
+        """Índice do primeiro padrão que exclui 'caminho', ou None."""
+        for i, regex in enumerate(self._regex):
+            if regex.search(caminho):
+                return i
+        return None
+
+    def aplicar(self, arquivos):
+        """
+        Retorna (arquivos mantidos, {padrão: [arquivos, bytes]} excluídos por cada regra).
+        Como no rclone, um arquivo conta só para a primeira regra que o exclui.
+        """
+        mantidos = {}
+        excluidos = {padrao: [0, 0] for padrao in self.padroes}
+        for caminho, info in arquivos.items():
+            i = self.regra(caminho)
+            if i is None:
+                mantidos[caminho] = info
+            else:
+                contagem = excluidos[self.padroes[i]]
+                contagem[0] += 1
+                contagem[1] += info[0]
+        return mantidos, excluidos
+
+    def gravar(self):
+        """Grava as regras num arquivo temporário para --filter-from e retorna o caminho."""
+        return gravar_regras_filtro([f"- {padrao}" for padrao in self.padroes])
@@ -0,0 +1,35 @@
+"""Arquivos de log das sincronizações: nomes e limpeza dos antigos."""
+
+import os
+import re
+import sys
+from datetime import datetime
+
+DIAS_MANTER_LOGS = 30 # Número de dias para manter os arquivos de log
+
+def limpar_logs_antigos(dias_manter):
+    """
+    Remove arquivos de log antigos do diretório atual.
+    Arquivos com o padrão 'log_YYYY-MM-DD_HHhMM.txt' serão considerados.
+    """
+    hoje = datetime.now()
+    for filename in os.listdir("."):
+        if filename.startswith("log_") and filename.endswith(".txt"):
+            try:
+                data_str = filename[4:14]
+                log_date = datetime.strptime(data_str, "%Y-%m-%d")
+                if (hoje - log_date).days > dias_manter:
+                    os.remove(filename)
+                    print(f"Log antigo removido: {filename}")
+                    sys.stdout.flush() # Forçar a saída
+            except (ValueError, IndexError):
+                continue
+            except OSError as e:
+                print(f"Erro ao remover log {filename}: {e}")
+                sys.stdout.flush() # Forçar a saída
+
+def nome_log_tarefa(nome_perfil, momento=None):
+    """Nome do log de uma tarefa da fila: 'log_YYYY-MM-DD_HHhMM_<perfil>.txt' (compatível com limpar_logs_antigos)."""
+    momento = momento or datetime.now()
+    perfil_seguro = re.sub(r'[^\w.-]+', "_", nome_perfil).strip("_") or "perfil"
+    return momento.strftime(f"log_%Y-%m-%d_%Hh%M_{perfil_seguro}.txt")
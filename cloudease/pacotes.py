@@ -0,0 +1,229 @@
+"""Modo de pacotes: pastas com muitos arquivos pequenos enviadas como um .tar cada."""
+
+import subprocess
+import os
+import json
+import tempfile
+import hashlib
+import shutil
+
+from cloudease.parsers import formatar_bytes
+from cloudease.comandos import caminho_remoto, escapar_glob
+from cloudease.varredura import escanear_origem
+from cloudease.filtros import FiltroExclusao
+from cloudease.plano import ManifestoLocal
+
+DIR_PACOTES = "pacotes" # Índices dos pacotes de arquivos pequenos (um por origem/destino)
+NOME_PACOTE = "_cloudease_pacote.tar" # Pacote com os arquivos de uma pasta, enviado para dentro da própria pasta no destino
+NOME_INDICE_PACOTES = "_cloudease_pacotes.json" # Índice dos pacotes na raiz do destino, usado para desempacotar numa restauração
+PACOTE_LIMITE_KIB_PADRAO = 256 # Arquivos até esse tamanho contam como pequenos
+PACOTE_MIN_ARQUIVOS_PADRAO = 50 # Pastas com menos arquivos que isso não são empacotadas
+PACOTE_PERCENTUAL_PEQUENOS_PADRAO = 80 # Percentual mínimo de arquivos pequenos para empacotar a pasta
+TAMANHO_MAX_PACOTE = 512 * 1024 * 1024 # Pastas maiores não são empacotadas (limita o espaço temporário a um pacote)
+
+def opcoes_pacotes(perfil):
+    """Limites do empacotamento de um perfil: (tamanho máximo de arquivo pequeno em bytes, mínimo de arquivos, fração de pequenos)."""
+    def inteiro(chave, padrao, minimo, maximo):
+        try:
+            return max(minimo, min(int(perfil.get(chave, padrao)), maximo))
+        except (TypeError, ValueError):
+            return padrao
+    return (
+        inteiro("pacote_limite_kib", PACOTE_LIMITE_KIB_PADRAO, 1, 64 * 1024) * 1024,
+        inteiro("pacote_min_arquivos", PACOTE_MIN_ARQUIVOS_PADRAO, 2, 1000000),
+        inteiro("pacote_percentual_pequenos", PACOTE_PERCENTUAL_PEQUENOS_PADRAO, 1, 100) / 100,
+    )
+
+class AgrupadorPequenos:
+    """
+    Empacotamento de pastas dominadas por arquivos pequenos: os arquivos diretos de cada uma
+    dessas pastas vão num único .tar (NOME_PACOTE), enviado para dentro da pasta no destino, em
+    vez de uma chamada à API do OneDrive por arquivo. O índice (DIR_PACOTES) guarda os membros de cada
+    pacote com tamanho e mtime: um pacote só é refeito quando a pasta mudou. Os pacotes são
+    gerados e enviados um de cada vez (rclone moveto), então o espaço temporário é o de um pacote.
+    A cópia do índice no destino (NOME_INDICE_PACOTES) permite desempacotar numa restauração.
+    Expõe poll/terminate/returncode, como subprocess.Popen, para ser cancelado como o rclone.
+    """
+    def __init__(self, origem, destino, limite_bytes, min_arquivos, fracao_pequenos, diretorio=DIR_PACOTES):
+        nome = hashlib.sha1(ManifestoLocal.chave(origem, destino).encode("utf-8")).hexdigest()[:16] + ".json"
+        self.arquivo_indice = os.path.join(diretorio, nome)
+        self.origem = origem
+        self.destino = destino
+        self.limite_bytes = limite_bytes
+        self.min_arquivos = min_arquivos
+        self.fracao_pequenos = fracao_pequenos
+        self.pacotes = {} # pasta relativa -> {"membros": {nome: [tamanho, mtime_ns]}}
+        self.indice_enviado = False # A cópia do índice no destino está atualizada
+        self.processo = None # rclone em execução (para cancelar)
+        self.cancelado = False
+        self.returncode = None
+
+    def carregar(self):
+        try:
+            with open(self.arquivo_indice, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            if dados.get("origem") == self.origem and dados.get("destino") == self.destino:
+                self.pacotes = dados.get("pacotes") or {}
+                self.indice_enviado = bool(dados.get("indice_enviado"))
+        except (OSError, ValueError):
+            pass
+        return self
+
+    def salvar(self):
+        os.makedirs(os.path.dirname(self.arquivo_indice), exist_ok=True)
+        temporario = self.arquivo_indice + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"origem": self.origem, "destino": self.destino, "formato": "tar", "pacotes": self.pacotes,
+                       "indice_enviado": self.indice_enviado}, f, ensure_ascii=False)
+        os.replace(temporario, self.arquivo_indice)
+
+    def pastas_para_empacotar(self, arquivos):
+        """Pastas (de 'arquivos', já filtrado) dominadas por arquivos pequenos: {pasta: {nome: (tamanho, mtime_ns)}}."""
+        por_pasta = {}
+        for caminho, info in arquivos.items():
+            pasta, _, nome = caminho.rpartition("/")
+            por_pasta.setdefault(pasta, {})[nome] = info
+        pastas = {}
+        for pasta, membros in por_pasta.items():
+            if len(membros) < self.min_arquivos or NOME_PACOTE in membros:
+                continue
+            pequenos = sum(1 for tamanho, _ in membros.values() if tamanho <= self.limite_bytes)
+            if pequenos >= self.fracao_pequenos * len(membros) and sum(t for t, _ in membros.values()) <= TAMANHO_MAX_PACOTE:
+                pastas[pasta] = membros
+        return pastas
+
+    @staticmethod
+    def padroes_exclusao(pastas):
+        """
+        Padrões de FiltroExclusao que tiram do rclone os arquivos empacotados e protegem pacotes e
+        índice no destino. As pastas vão numa única regra '/{a,b}/*', para não multiplicar as regras.
+        """
+        padroes = ["/" + escapar_glob(NOME_INDICE_PACOTES)]
+        subpastas = [escapar_glob(pasta).replace(",", "\\,") for pasta in sorted(pastas) if pasta]
+        if subpastas:
+            padroes.append("/{" + ",".join(subpastas) + "}/*")
+        if "" in pastas:
+            padroes.append("/*")
+        return padroes
+
+    def _rclone(self, argumentos, bwlimit, log):
+        comando = ["rclone"] + argumentos + (["--bwlimit", bwlimit] if bwlimit != "off" else [])
+        self.processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8")
+        saida, _ = self.processo.communicate()
+        if saida and log:
+            log.write(saida)
+        return self.processo.returncode == 0
+
+    def _gerar_pacote(self, pasta, membros, diretorio_temporario):
+        import tarfile
+        arquivo = os.path.join(diretorio_temporario, NOME_PACOTE)
+        base = os.path.join(self.origem, pasta) if pasta else self.origem
+        with tarfile.open(arquivo, "w") as tar:
+            for nome in sorted(membros):
+                tar.add(os.path.join(base, nome), arcname=nome, recursive=False)
+        return arquivo
+
+    def executar(self, pastas, modo, bwlimit="off", is_dry_run=False, log=None, progresso=None):
+        """
+        Gera e envia os pacotes das pastas novas ou alteradas e atualiza o índice (local e no destino).
+        No modo sync, pacotes de pastas que não são mais empacotadas saem do índice (o rclone apaga o
+        arquivo no destino); no modo copy, como os demais arquivos, ficam. Retorna False se um envio falhou.
+        """
+        sucesso = self._executar(pastas, modo, bwlimit, is_dry_run, log, progresso)
+        self.returncode = 0 if sucesso else 1
+        return sucesso
+
+    def _executar(self, pastas, modo, bwlimit, is_dry_run, log, progresso):
+        alteradas = {pasta: membros for pasta, membros in pastas.items()
+                     if self.pacotes.get(pasta, {}).get("membros") != {nome: list(info) for nome, info in membros.items()}}
+        obsoletas = [pasta for pasta in self.pacotes if pasta not in pastas] if modo == "sync" else []
+        if log:
+            log.write(f"Pacotes de arquivos pequenos: {len(pastas)} pasta(s), {len(alteradas)} a (re)gerar, "
+                      f"{sum(len(m) for m in pastas.values())} arquivo(s) no total\n")
+        if is_dry_run:
+            for pasta, membros in sorted(alteradas.items()):
+                if log:
+                    log.write(f"  Seria empacotada: {pasta or '(raiz)'} ({len(membros)} arquivos, {formatar_bytes(sum(t for t, _ in membros.values()))})\n")
+            return True
+        if not alteradas and not obsoletas and self.indice_enviado:
+            return True
+        diretorio_temporario = tempfile.mkdtemp(prefix="cloudease_pacotes_")
+        try:
+            for i, (pasta, membros) in enumerate(sorted(alteradas.items()), 1):
+                if self.cancelado:
+                    return False
+                if progresso:
+                    progresso(i, len(alteradas), pasta)
+                try:
+                    arquivo = self._gerar_pacote(pasta, membros, diretorio_temporario)
+                except OSError as e:
+                    # Um arquivo sumiu ou ficou ilegível desde a varredura: a pasta fica para a próxima execução
+                    if log:
+                        log.write(f"Erro ao empacotar {pasta or '(raiz)'}: {e}\n")
+                    continue
+                if not self._rclone(["moveto", arquivo, caminho_remoto(self.destino, pasta, NOME_PACOTE)], bwlimit, log):
+                    return False
+                self.pacotes[pasta] = {"membros": {nome: list(info) for nome, info in membros.items()}}
+                self.indice_enviado = False
+                self.salvar()
+            for pasta in obsoletas:
+                del self.pacotes[pasta]
+            self.indice_enviado = False
+            self.salvar()
+            if not self._rclone(["copyto", self.arquivo_indice, caminho_remoto(self.destino, NOME_INDICE_PACOTES)], bwlimit, log):
+                return False
+            self.indice_enviado = True
+            self.salvar()
+            return True
+        finally:
+            shutil.rmtree(diretorio_temporario, ignore_errors=True)
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.cancelado = True
+        if self.processo is not None and self.processo.poll() is None:
+            self.processo.terminate()
+
+def preparar_empacotamento(origem, destino, perfil, filtro):
+    """
+    Varre a origem e escolhe as pastas a empacotar pelos limites do perfil. Retorna (AgrupadorPequenos,
+    pastas, varredura sem filtro, filtro do perfil acrescido dos padrões que tiram os empacotados do rclone).
+    """
+    varredura = escanear_origem(origem)
+    candidatos = filtro.aplicar(varredura)[0] if filtro is not None else varredura
+    agrupador = AgrupadorPequenos(origem, destino, *opcoes_pacotes(perfil)).carregar()
+    pastas = agrupador.pastas_para_empacotar(candidatos)
+    padroes = (filtro.padroes if filtro is not None else []) + AgrupadorPequenos.padroes_exclusao(pastas)
+    return agrupador, pastas, varredura, FiltroExclusao(padroes)
+
+def desempacotar(pasta):
+    """
+    Restauração: desempacota os pacotes listados no NOME_INDICE_PACOTES de uma cópia baixada do
+    destino, cada um na sua pasta, e apaga os .tar. Arquivos que já existem (enviados depois, fora
+    de pacote) não são sobrescritos. Retorna o número de arquivos extraídos.
+    """
+    import tarfile
+    with open(os.path.join(pasta, NOME_INDICE_PACOTES), "r", encoding="utf-8") as f:
+        pacotes = json.load(f).get("pacotes") or {}
+    extraidos = 0
+    for relativo in pacotes:
+        destino_pasta = os.path.join(pasta, relativo) if relativo else pasta
+        arquivo = os.path.join(destino_pasta, NOME_PACOTE)
+        if not os.path.exists(arquivo):
+            continue
+        with tarfile.open(arquivo, "r") as tar:
+            for membro in tar.getmembers():
+                # Os pacotes só têm arquivos soltos; qualquer outra entrada é ignorada
+                if not membro.isfile() or "/" in membro.name or "\\" in membro.name or membro.name in ("", ".", ".."):
+                    continue
+                alvo = os.path.join(destino_pasta, membro.name)
+                if os.path.exists(alvo):
+                    continue
+                with tar.extractfile(membro) as origem_membro, open(alvo, "wb") as saida:
+                    shutil.copyfileobj(origem_membro, saida)
+                os.utime(alvo, (membro.mtime, membro.mtime))
+                extraidos += 1
+        os.remove(arquivo)
+    return extraidos
@@ -0,0 +1,298 @@
+"""Leitura da saída do rclone: estatísticas em texto e JSON (--use-json-log), ações do dry-run e arquivos concluídos."""
+
+import json
+import re
+from dataclasses import dataclass
+
+# Regex mais flexível para capturar os valores de estatísticas
+# Adicionado (?:Transferred:|NOTICE:.*?\s*)? para capturar linhas que podem começar com "Transferred:" ou "NOTICE:"
+# O padrão para ETA foi ajustado para capturar formatos como "2d17h43m", "1h2m3s", "1m2s", "5s" ou "-"
+PADRAO_STATS = re.compile(
+    r"(?:Transferred:|NOTICE:.*?\s*)?([\d\.]+) (MiB|B|KiB|GiB|TiB) / ([\d\.]+) (MiB|B|KiB|GiB|TiB),\s*([\d]+)%,.*?([\d\.]+) (MiB/s|B/s|KiB/s|GiB/s|TiB/s), ETA ([\ddsmh-]+)"
+)
+# Transferências concluídas/total no fim da linha de estatísticas em texto (ex: "(xfr#7/319)")
+PADRAO_XFR = re.compile(r"\(xfr#(\d+)/(\d+)\)")
+
+def extrair_stats_completos(linha):
+    """
+    Extrai informações detalhadas de uma linha de estatísticas do rclone.
+    Esta função foi aprimorada para capturar padrões de estatísticas
+    tanto de linhas que começam com "Transferred:" quanto de linhas com "NOTICE:".
+    Exemplo de linha do rclone (stats one line):
+    Transferred:    10.345 MiB / 50.000 MiB, 20%, 1.234 MiB/s, ETA 00:40
+    Exemplo de linha de dry-run (NOTICE):
+    2025/07/07 15:46:16 NOTICE:     21.771 MiB / 21.771 MiB, 100%, 0 B/s, ETA -
+    """
+    # Filtro barato: linhas como "Copied (new)" nunca casam e não precisam passar pela regex
+    if ", ETA " not in linha:
+        return None, None, None, None, None
+    match = PADRAO_STATS.search(linha)
+    if match:
+        transferido_val = float(match.group(1))
+        transferido_unit = match.group(2)
+        total_val = float(match.group(3))
+        total_unit = match.group(4)
+        porcentagem = int(match.group(5))
+        velocidade_val = float(match.group(6))
+        velocidade_unit = match.group(7)
+        eta = match.group(8)
+
+        # Normaliza para MiB para exibição consistente
+        def convert_to_mib(value, unit):
+            if unit == "B": return value / (1024 * 1024)
+            if unit == "KiB": return value / 1024
+            if unit == "MiB": return value
+            if unit == "GiB": return value * 1024
+            if unit == "TiB": return value * 1024 * 1024
+            return value
+
+        transferido_mib = convert_to_mib(transferido_val, transferido_unit)
+        total_mib = convert_to_mib(total_val, total_unit)
+
+        return f"{transferido_mib:.2f}", f"{total_mib:.2f}", str(porcentagem), f"{velocidade_val:.2f} {velocidade_unit}", eta
+    return None, None, None, None, None
+
+def eta_para_segundos(eta):
+    """Converte um ETA do rclone em segundos (ex: '2d17h43m' -> 236580; '-' -> None)."""
+    if not eta or eta == "-":
+        return None
+    return sum(int(n) * {"d": 86400, "h": 3600, "m": 60, "s": 1}[u] for n, u in re.findall(r"(\d+)([dhms])", eta))
+
+def segundos_para_eta(segundos):
+    """Converte segundos no formato de ETA do rclone (ex: 3723 -> '1h2m3s'; None -> '-')."""
+    if segundos is None:
+        return "-"
+    segundos = int(segundos)
+    h, resto = divmod(segundos, 3600)
+    m, s = divmod(resto, 60)
+    partes = ""
+    if h:
+        partes += f"{h}h"
+    if h or m:
+        partes += f"{m}m"
+    return partes + f"{s}s"
+
+def formatar_bytes(quantidade):
+    """Formata uma quantidade de bytes com a mesma unidade usada pelo rclone (ex: '21.56 KiB')."""
+    valor = float(quantidade or 0)
+    for unidade in ("B", "KiB", "MiB", "GiB"):
+        if valor < 1024:
+            return f"{valor:.2f} {unidade}"
+        valor /= 1024
+    return f"{valor:.2f} TiB"
+
+def formatar_velocidade(bytes_por_segundo):
+    """Formata uma velocidade em bytes/s com a mesma unidade usada pelo rclone (ex: '21.56 KiB/s')."""
+    return formatar_bytes(bytes_por_segundo) + "/s"
+
+@dataclass
+class EstatisticasRclone:
+    """Estatísticas de uma execução do rclone, em bytes e contagens (objeto 'stats' do log JSON)."""
+    bytes: int = 0
+    total_bytes: int = 0
+    velocidade: float = 0.0 # bytes/s
+    eta: int = None # segundos; None quando o rclone ainda não estima
+    transferencias: int = 0
+    total_transferencias: int = 0
+    erros: int = 0
+    verificacoes: int = 0
+    total_verificacoes: int = 0
+
+    @classmethod
+    def de_json(cls, stats):
+        return cls(
+            bytes=int(stats.get("bytes") or 0),
+            total_bytes=int(stats.get("totalBytes") or 0),
+            velocidade=float(stats.get("speed") or 0),
+            eta=stats.get("eta"),
+            transferencias=int(stats.get("transfers") or 0),
+            total_transferencias=int(stats.get("totalTransfers") or 0),
+            erros=int(stats.get("errors") or 0),
+            verificacoes=int(stats.get("checks") or 0),
+            total_verificacoes=int(stats.get("totalChecks") or 0),
+        )
+
+    @classmethod
+    def de_campos(cls, campos):
+        """Reconstrói (aproximadamente) as estatísticas a partir dos campos de extrair_stats_completos."""
+        transferido, total, _, velocidade, eta = campos
+        valor, _, unidade = velocidade.partition(" ")
+        fatores = {"B/s": 1, "KiB/s": 1024, "MiB/s": 1024 ** 2, "GiB/s": 1024 ** 3, "TiB/s": 1024 ** 4}
+        return cls(
+            bytes=int(float(transferido) * 1024 * 1024),
+            total_bytes=int(float(total) * 1024 * 1024),
+            velocidade=float(valor) * fatores.get(unidade, 1),
+            eta=eta_para_segundos(eta),
+        )
+
+    @classmethod
+    def de_texto(cls, linha):
+        """
+        Estatísticas exatas (em bytes, com as transferências do 'xfr#') de uma linha de
+        estatísticas em texto, ou None. extrair_stats_completos arredonda para 0,01 MiB.
+        """
+        if ", ETA " not in linha:
+            return None
+        match = PADRAO_STATS.search(linha)
+        if not match:
+            return None
+        fatores = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4}
+        estatisticas = cls(
+            bytes=int(float(match.group(1)) * fatores[match.group(2)]),
+            total_bytes=int(float(match.group(3)) * fatores[match.group(4)]),
+            velocidade=float(match.group(6)) * fatores[match.group(7)[:-2]],
+            eta=eta_para_segundos(match.group(8)),
+        )
+        xfr = PADRAO_XFR.search(linha, match.end())
+        if xfr:
+            estatisticas.transferencias, estatisticas.total_transferencias = int(xfr.group(1)), int(xfr.group(2))
+        return estatisticas
+
+    @classmethod
+    def somar(cls, lista):
+        """Soma as estatísticas de várias execuções simultâneas; o ETA é recalculado pela velocidade total."""
+        total = cls()
+        for estatisticas in lista:
+            total.bytes += estatisticas.bytes
+            total.total_bytes += estatisticas.total_bytes
+            total.velocidade += estatisticas.velocidade
+            total.transferencias += estatisticas.transferencias
+            total.total_transferencias += estatisticas.total_transferencias
+            total.erros += estatisticas.erros
+            total.verificacoes += estatisticas.verificacoes
+            total.total_verificacoes += estatisticas.total_verificacoes
+        if total.velocidade > 0:
+            total.eta = int(max(0, total.total_bytes - total.bytes) / total.velocidade)
+        return total
+
+    def para_json(self):
+        """Objeto 'stats' no formato do log JSON do rclone (inverso de de_json)."""
+        return {
+            "bytes": self.bytes, "totalBytes": self.total_bytes, "speed": self.velocidade, "eta": self.eta,
+            "transfers": self.transferencias, "totalTransfers": self.total_transferencias, "errors": self.erros,
+            "checks": self.verificacoes, "totalChecks": self.total_verificacoes,
+        }
+
+    @property
+    def porcentagem(self):
+        if not self.total_bytes:
+            return None
+        return int(self.bytes * 100 / self.total_bytes)
+
+    def com_total(self, total_bytes):
+        """
+        Cópia com um total conhecido de antemão (pré-varredura) no lugar do total que o rclone
+        vai descobrindo durante a verificação; o ETA é recalculado pela velocidade atual.
+        """
+        total = EstatisticasRclone(**self.__dict__)
+        total.total_bytes = max(total_bytes, self.total_bytes)
+        total.eta = int((total.total_bytes - total.bytes) / total.velocidade) if total.velocidade > 0 else None
+        return total
+
+    def para_exibicao(self):
+        """Retorna os mesmos campos de extrair_stats_completos (MiB, MiB, %, velocidade, ETA)."""
+        porcentagem = self.porcentagem
+        return (
+            f"{self.bytes / (1024 * 1024):.2f}",
+            f"{self.total_bytes / (1024 * 1024):.2f}",
+            str(porcentagem) if porcentagem is not None else None,
+            formatar_velocidade(self.velocidade),
+            segundos_para_eta(self.eta),
+        )
+
+def extrair_entrada_json(linha):
+    """
+    Decodifica uma linha do rclone executado com --use-json-log.
+    Retorna (entrada, EstatisticasRclone ou None); entrada é None se a linha não for JSON,
+    caso em que o chamador deve usar extrair_stats_completos como fallback.
+    Exemplo:
+    {"level":"notice","msg":"...","stats":{"bytes":595494,"totalBytes":8428503,"speed":22082.5,"eta":362,...},"time":"..."}
+    """
+    if not linha.startswith("{"):
+        return None, None
+    try:
+        entrada = json.loads(linha)
+    except ValueError:
+        return None, None
+    if not isinstance(entrada, dict):
+        return None, None
+    stats = entrada.get("stats")
+    if isinstance(stats, dict):
+        return entrada, EstatisticasRclone.de_json(stats)
+    return entrada, None
+
+def formatar_entrada_json(entrada):
+    """Converte uma entrada do log JSON em uma linha legível para o console (ex: 'INFO: pasta/arq: Copied (new)')."""
+    nivel = str(entrada.get("level", "")).upper()
+    mensagem = str(entrada.get("msg", "")).strip()
+    objeto = entrada.get("object")
+    if objeto:
+        return f"{nivel}: {objeto}: {mensagem}\n"
+    return f"{nivel}: {mensagem}\n"
+
+# Ações que o rclone apenas anuncia no dry-run ("<caminho>: Skipped copy as --dry-run is set (size 174)")
+PADRAO_DRY_RUN = re.compile(r"NOTICE: (.+): Skipped (copy|update modification time|delete|remove directory) as --dry-run is set")
+ACOES_PLANO_TESTE = {
+    "copy": "copias",
+    "update modification time": "copias",
+    "delete": "exclusoes",
+    "remove directory": "pastas_removidas",
+}
+
+def extrair_acao_dry_run(linha):
+    """Retorna (lista do plano, caminho) para uma linha de ação do dry-run (texto ou JSON), ou None."""
+    entrada, _ = extrair_entrada_json(linha)
+    if entrada is not None:
+        mensagem = str(entrada.get("msg", ""))
+        objeto = entrada.get("object")
+        if not objeto or not mensagem.startswith("Skipped ") or "--dry-run" not in mensagem:
+            return None
+        acao = mensagem[len("Skipped "):].partition(" as --dry-run")[0]
+        lista = ACOES_PLANO_TESTE.get(acao)
+        return (lista, str(objeto)) if lista else None
+    if "--dry-run is set" not in linha:
+        return None
+    match = PADRAO_DRY_RUN.search(linha)
+    if match:
+        return ACOES_PLANO_TESTE[match.group(2)], match.group(1)
+    return None
+
+# Arquivos concluídos na saída do rclone com --verbose ("<caminho>: Copied (new)")
+PADRAO_CONCLUIDO = re.compile(r"INFO\s*: (.+): (?:Copied \(|Updated modification time)")
+
+def extrair_arquivo_concluido(linha):
+    """Retorna o caminho (relativo à origem) de um arquivo que o rclone terminou de enviar, ou None."""
+    entrada, _ = extrair_entrada_json(linha)
+    if entrada is not None:
+        mensagem = str(entrada.get("msg", ""))
+        objeto = entrada.get("object")
+        if objeto and (mensagem.startswith("Copied (") or mensagem.startswith("Updated modification time")):
+            return str(objeto)
+        return None
+    if "Copied (" not in linha and "Updated modification time" not in linha:
+        return None
+    match = PADRAO_CONCLUIDO.search(linha)
+    return match.group(1) if match else None
+
+def interpretar_linha_stderr(linha):
+    """
+    Interpreta uma linha do stderr do rclone (JSON ou texto).
+    Retorna (texto para o console, campos de estatística ou None); os campos seguem
+    o formato de extrair_stats_completos (MiB, MiB, %, velocidade, ETA).
+    """
+    texto, campos, _ = interpretar_linha_stderr_completa(linha)
+    return texto, campos
+
+def interpretar_linha_stderr_completa(linha):
+    """
+    Como interpretar_linha_stderr, mas retorna também as estatísticas da linha (EstatisticasRclone
+    ou None). No log JSON elas trazem as transferências e verificações, que os campos não têm.
+    """
+    entrada, estatisticas = extrair_entrada_json(linha)
+    if entrada is not None:
+        return formatar_entrada_json(entrada), estatisticas.para_exibicao() if estatisticas else None, estatisticas
+    # Fallback: saída em texto (rclone sem --use-json-log)
+    campos = extrair_stats_completos(linha)
+    if campos[0] is None:
+        return linha, None, None
+    return linha, campos, EstatisticasRclone.de_texto(linha)
@@ -0,0 +1,174 @@
+"""Perfis salvos (perfis.json) e ajuste automático de transfers/checkers/chunk por perfil."""
+
+import os
+import json
+import threading
+import time
+
+ARQ_PERFIS = "perfis.json"
+AJUSTES_PADRAO = {"transfers": 16, "checkers": 16, "chunk_size": "10M"} # Usados sem o ajuste automático
+TAMANHOS_CHUNK_ONEDRIVE = ["10M", "20M", "40M", "80M", "160M"] # Múltiplos de 320 KiB, como exige o OneDrive
+MEMORIA_MAX_CHUNKS_MIB = 1024 # Limite de transfers x chunk (cada transferência mantém um chunk em memória)
+BYTES_MIN_AMOSTRA_VAZAO = 64 * 1024 * 1024 # Execuções que transferem menos que isso não avaliam o ajuste
+ALFA_VAZAO_HISTORICA = 0.5 # Peso da última execução na vazão histórica do perfil (ponto de partida do ETA)
+
+def carregar_json(arquivo, ao_corromper=None):
+    """
+    Carrega dados de um arquivo JSON.
+    Se o arquivo estiver corrompido, chama 'ao_corromper()' (a interface mostra um aviso) e retorna {}.
+    """
+    if os.path.exists(arquivo):
+        try:
+            with open(arquivo, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            if ao_corromper:
+                ao_corromper()
+            return {}
+    return {}
+
+def salvar_json(arquivo, conteudo):
+    """Salva dados em um arquivo JSON."""
+    with open(arquivo, "w", encoding="utf-8") as f:
+        json.dump(conteudo, f, indent=4, ensure_ascii=False)
+
+def _limitar_memoria(transfers, checkers, chunk_size):
+    """Reduz o chunk (e depois as transferências) até transfers x chunk caber em MEMORIA_MAX_CHUNKS_MIB."""
+    indice = TAMANHOS_CHUNK_ONEDRIVE.index(chunk_size)
+    while indice > 0 and transfers * int(TAMANHOS_CHUNK_ONEDRIVE[indice][:-1]) > MEMORIA_MAX_CHUNKS_MIB:
+        indice -= 1
+    while transfers > 1 and transfers * int(TAMANHOS_CHUNK_ONEDRIVE[indice][:-1]) > MEMORIA_MAX_CHUNKS_MIB:
+        transfers //= 2
+    return {"transfers": transfers, "checkers": checkers, "chunk_size": TAMANHOS_CHUNK_ONEDRIVE[indice]}
+
+def sugerir_ajustes(arquivos):
+    """
+    Ajustes iniciais pela distribuição de tamanhos da origem ('arquivos' de escanear_origem):
+    muitos arquivos pequenos pedem mais transferências e verificações em paralelo; arquivos
+    grandes rendem mais com chunks maiores (menos requisições por arquivo) e menos transferências.
+    """
+    tamanhos = sorted(tamanho for tamanho, _ in arquivos.values())
+    if not tamanhos:
+        return dict(AJUSTES_PADRAO)
+    mediana = tamanhos[len(tamanhos) // 2]
+    if mediana < 1024 * 1024:
+        return _limitar_memoria(32, 32, "10M")
+    if mediana < 64 * 1024 * 1024:
+        return _limitar_memoria(16, 16, "20M")
+    return _limitar_memoria(8, 16, "80M")
+
+def ajustes_vizinhos(ajustes):
+    """Candidatos a testar a partir de um ajuste: o dobro/metade das transferências e o chunk vizinho."""
+    transfers, checkers, chunk_size = ajustes["transfers"], ajustes["checkers"], ajustes["chunk_size"]
+    indice = TAMANHOS_CHUNK_ONEDRIVE.index(chunk_size)
+    candidatos = []
+    if transfers < 64:
+        candidatos.append((transfers * 2, max(checkers, transfers * 2), chunk_size))
+    if transfers > 2:
+        candidatos.append((transfers // 2, checkers, chunk_size))
+    if indice + 1 < len(TAMANHOS_CHUNK_ONEDRIVE):
+        candidatos.append((transfers, checkers, TAMANHOS_CHUNK_ONEDRIVE[indice + 1]))
+    if indice > 0:
+        candidatos.append((transfers, checkers, TAMANHOS_CHUNK_ONEDRIVE[indice - 1]))
+    resultado = []
+    for candidato in candidatos:
+        limitado = _limitar_memoria(*candidato)
+        if limitado != ajustes and limitado not in resultado:
+            resultado.append(limitado)
+    return resultado
+
+def escolher_ajustes(perfil, arquivos):
+    """
+    Ajustes para a próxima execução do perfil. Sem histórico, usa sugerir_ajustes; depois alterna
+    entre o melhor ajuste conhecido e um vizinho dele, para que a vazão medida guie a escolha.
+    """
+    estado = perfil.get("ajuste") or {}
+    melhor = estado.get("melhor")
+    if not melhor or melhor.get("chunk_size") not in TAMANHOS_CHUNK_ONEDRIVE:
+        return sugerir_ajustes(arquivos)
+    melhor = {chave: melhor[chave] for chave in AJUSTES_PADRAO}
+    execucoes = estado.get("execucoes", 0)
+    candidatos = ajustes_vizinhos(melhor)
+    if execucoes % 2 == 1 and candidatos:
+        return candidatos[(execucoes // 2) % len(candidatos)]
+    return melhor
+
+def registrar_ajuste(perfil, ajustes, vazao):
+    """
+    Registra no perfil a vazão (bytes/s) obtida com 'ajustes' e guarda o melhor ajuste conhecido.
+    A vazão do melhor ajuste é uma média móvel, para que um resultado antigo não prevaleça para sempre.
+    """
+    estado = perfil.setdefault("ajuste", {})
+    estado["execucoes"] = estado.get("execucoes", 0) + 1
+    if vazao is None:
+        return
+    melhor = estado.get("melhor")
+    if melhor and {chave: melhor.get(chave) for chave in AJUSTES_PADRAO} == ajustes:
+        melhor["vazao"] = (melhor.get("vazao", vazao) + vazao) / 2
+    elif not melhor or vazao > melhor.get("vazao", 0):
+        estado["melhor"] = dict(ajustes, vazao=vazao)
+
+def registrar_execucao_perfil(perfis, nome, inicio_iso, completa, ajustes=None, vazao=None):
+    """
+    Guarda no perfil o início da última sincronização bem-sucedida (e da última completa),
+    a média móvel da vazão das execuções ("vazao_historica", usada pelo EstimadorEta) e,
+    com o ajuste automático, a vazão obtida com os ajustes usados.
+    Retorna False se o perfil não existe mais; quem chama salva perfis.json.
+    """
+    if nome not in perfis:
+        return False
+    perfis[nome]["ultima_sincronizacao"] = inicio_iso
+    if completa:
+        perfis[nome]["ultima_reconciliacao"] = inicio_iso
+    if vazao:
+        anterior = perfis[nome].get("vazao_historica")
+        perfis[nome]["vazao_historica"] = vazao if not anterior else anterior + ALFA_VAZAO_HISTORICA * (vazao - anterior)
+    if ajustes:
+        registrar_ajuste(perfis[nome], ajustes, vazao)
+    return True
+
+_trava_arquivo_perfis = threading.Lock()
+
+def registrar_execucao_arquivo(arquivo, nome, inicio_iso, completa, ajustes=None, vazao=None):
+    """
+    registrar_execucao_perfil direto no arquivo de perfis, para execuções fora da interface
+    (linha de comando e servidor): relê o arquivo, que a interface ou outra tarefa pode ter alterado.
+    """
+    with _trava_arquivo_perfis:
+        perfis = carregar_json(arquivo)
+        if registrar_execucao_perfil(perfis, nome, inicio_iso, completa, ajustes, vazao):
+            salvar_json(arquivo, perfis)
+
+
+class AmostradorVazao:
+    """Mede a vazão de uma execução a partir dos bytes transferidos informados pelas estatísticas."""
+    def __init__(self):
+        self.inicio = None # (tempo, bytes) da primeira amostra com bytes > 0
+        self.ultimo = None # (tempo, bytes) da última amostra em que os bytes aumentaram
+
+    def registrar(self, bytes_transferidos, agora=None):
+        agora = time.time() if agora is None else agora
+        if bytes_transferidos <= 0:
+            return
+        if self.inicio is None:
+            self.inicio = (agora, bytes_transferidos)
+            self.ultimo = self.inicio
+        elif bytes_transferidos > self.ultimo[1]:
+            self.ultimo = (agora, bytes_transferidos)
+
+    def registrar_campos(self, campos):
+        """Registra a partir dos campos de extrair_stats_completos (MiB transferidos no primeiro campo)."""
+        try:
+            self.registrar(float(campos[0]) * 1024 * 1024)
+        except (TypeError, ValueError):
+            pass
+
+    def vazao(self):
+        """Bytes/s entre a primeira e a última amostra, ou None se a execução transferiu pouco para avaliar."""
+        if self.inicio is None:
+            return None
+        duracao = self.ultimo[0] - self.inicio[0]
+        transferido = self.ultimo[1] - self.inicio[1]
+        if duracao <= 0 or self.ultimo[1] < BYTES_MIN_AMOSTRA_VAZAO:
+            return None
+        return transferido / duracao
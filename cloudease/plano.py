@@ -0,0 +1,499 @@
+"""Planejamento de cada execução: manifesto local, modo incremental, plano do teste (dry-run) e diário de retomada."""
+
+import os
+import json
+import threading
+import time
+import sys
+import hashlib
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+
+from cloudease.perfis import AJUSTES_PADRAO, carregar_json, escolher_ajustes, salvar_json
+from cloudease.parsers import extrair_acao_dry_run, formatar_bytes, segundos_para_eta
+from cloudease.comandos import comando_exclusao, gravar_files_from, montar_comando_rclone
+from cloudease.varredura import escanear_origem
+from cloudease.filtros import FiltroExclusao
+
+USAR_MANIFESTO = True # Compara a pasta local com o manifesto da última sincronização antes de chamar o rclone
+ARQ_MANIFESTOS = "manifestos.db" # Manifestos (caminho, tamanho, mtime) em SQLite
+LIMITE_FILES_FROM = 10000 # Acima disso, a varredura completa do rclone é usada em vez de --files-from
+DIAS_RECONCILIACAO_PADRAO = 7 # Perfis incrementais fazem uma comparação completa a cada N dias
+MARGEM_INCREMENTAL_S = 3600 # Margem de segurança somada à janela do --max-age
+LIMITE_NO_TRAVERSE = 1000 # Até quantos arquivos recentes o modo incremental usa --no-traverse
+ARQ_PLANO_TESTE = "plano_teste.json" # Ações registradas no último teste (dry-run), reaproveitadas pela execução real
+VALIDADE_PLANO_TESTE_S = 3600 # Depois disso o teste é considerado antigo e a execução real compara tudo de novo
+DIR_RETOMADA = "retomada" # Diários dos arquivos concluídos em execuções interrompidas (um por origem/destino)
+INTERVALO_GRAVACAO_DIARIO_S = 1.0 # Os arquivos concluídos são gravados no diário em lotes, no máximo a cada intervalo
+
+def comparar_manifesto(anterior, atual):
+    """Retorna (alterados, removidos): arquivos novos ou modificados e arquivos que sumiram da origem."""
+    alterados = sorted(caminho for caminho, info in atual.items() if anterior.get(caminho) != info)
+    removidos = sorted(caminho for caminho in anterior if caminho not in atual)
+    return alterados, removidos
+
+class ManifestoLocal:
+    """
+    Manifesto da última sincronização bem-sucedida de cada par origem/destino,
+    guardado em SQLite: uma linha (caminho, tamanho, mtime) por arquivo local.
+    """
+    def __init__(self, arquivo=ARQ_MANIFESTOS):
+        self.arquivo = arquivo
+
+    @staticmethod
+    def chave(origem, destino):
+        return f"{origem}|{destino}"
+
+    def _conectar(self):
+        # Uma conexão por operação: o manifesto é usado a partir de threads diferentes
+        import sqlite3
+        conexao = sqlite3.connect(self.arquivo)
+        conexao.execute("CREATE TABLE IF NOT EXISTS manifestos (chave TEXT PRIMARY KEY, atualizado_em REAL)")
+        conexao.execute(
+            "CREATE TABLE IF NOT EXISTS arquivos (chave TEXT, caminho TEXT, tamanho INTEGER, mtime_ns INTEGER, "
+            "PRIMARY KEY (chave, caminho))"
+        )
+        return conexao
+
+    def carregar(self, chave):
+        """Retorna {caminho: (tamanho, mtime_ns)}, ou None se nunca houve sincronização bem-sucedida."""
+        conexao = self._conectar()
+        try:
+            if conexao.execute("SELECT 1 FROM manifestos WHERE chave = ?", (chave,)).fetchone() is None:
+                return None
+            linhas = conexao.execute("SELECT caminho, tamanho, mtime_ns FROM arquivos WHERE chave = ?", (chave,))
+            return {caminho: (tamanho, mtime_ns) for caminho, tamanho, mtime_ns in linhas}
+        finally:
+            conexao.close()
+
+    def salvar(self, chave, arquivos):
+        conexao = self._conectar()
+        try:
+            with conexao:
+                conexao.execute("DELETE FROM arquivos WHERE chave = ?", (chave,))
+                conexao.executemany(
+                    "INSERT INTO arquivos (chave, caminho, tamanho, mtime_ns) VALUES (?, ?, ?, ?)",
+                    ((chave, caminho, tamanho, mtime_ns) for caminho, (tamanho, mtime_ns) in arquivos.items())
+                )
+                conexao.execute("INSERT OR REPLACE INTO manifestos (chave, atualizado_em) VALUES (?, ?)", (chave, time.time()))
+        finally:
+            conexao.close()
+
+def calcular_max_age_incremental(perfil, agora=None):
+    """
+    Para perfis 'copy' em modo incremental, retorna a janela em segundos para --max-age:
+    o tempo desde o início da última sincronização bem-sucedida, mais uma margem de segurança.
+    Retorna None quando deve ser feita uma sincronização completa (perfil nunca sincronizado,
+    reconciliação periódica vencida, ou perfil não incremental).
+    """
+    if not perfil.get("incremental") or perfil.get("modo") != "copy":
+        return None
+    agora = agora or datetime.now()
+    try:
+        ultima = datetime.fromisoformat(perfil["ultima_sincronizacao"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    # Arquivos copiados para a origem com a data original não são vistos pelo --max-age;
+    # a reconciliação periódica completa os encontra
+    if reconciliacao_vencida(perfil, agora):
+        return None
+    return max(0.0, (agora - ultima).total_seconds()) + MARGEM_INCREMENTAL_S
+
+def reconciliacao_vencida(perfil, agora=None):
+    """Indica se a comparação completa periódica do perfil venceu (ou nunca foi feita)."""
+    agora = agora or datetime.now()
+    try:
+        ultima_reconciliacao = datetime.fromisoformat(perfil["ultima_reconciliacao"])
+    except (KeyError, TypeError, ValueError):
+        return True
+    return agora - ultima_reconciliacao >= timedelta(days=perfil.get("reconciliacao_dias", DIAS_RECONCILIACAO_PADRAO))
+
+def assinatura_origem(arquivos):
+    """Resumo (SHA-1) da varredura da origem: muda se algum arquivo for criado, removido ou alterado."""
+    resumo = hashlib.sha1()
+    for caminho, (tamanho, mtime_ns) in sorted(arquivos.items()):
+        resumo.update(f"{caminho}\0{tamanho}\0{mtime_ns}\n".encode("utf-8"))
+    return resumo.hexdigest()
+
+@dataclass
+class PlanoTeste:
+    """
+    Resultado de um teste (dry-run): os arquivos que seriam copiados e excluídos e as pastas que
+    seriam removidas. Se a origem não mudou desde o teste, a execução real executa exatamente
+    esse plano (--files-from --no-traverse), sem listar e comparar as duas árvores outra vez.
+    """
+    origem: str
+    destino: str
+    modo: str
+    assinatura: str = ""
+    criado_em: float = 0.0
+    completa: bool = True # O teste comparou a origem inteira (sem --files-from/--max-age)
+    copias: list = None
+    exclusoes: list = None
+    pastas_removidas: list = None
+
+    def __post_init__(self):
+        self.copias = self.copias or []
+        self.exclusoes = self.exclusoes or []
+        self.pastas_removidas = self.pastas_removidas or []
+
+    def registrar(self, linha):
+        acao = extrair_acao_dry_run(linha)
+        if acao:
+            lista, caminho = acao
+            getattr(self, lista).append(caminho)
+
+    @property
+    def vazio(self):
+        return not (self.copias or self.exclusoes or self.pastas_removidas)
+
+    def salvar(self, arquivo=ARQ_PLANO_TESTE):
+        # Execuções em várias passadas podem anunciar o mesmo arquivo mais de uma vez
+        self.copias = list(dict.fromkeys(self.copias))
+        self.exclusoes = list(dict.fromkeys(self.exclusoes))
+        self.pastas_removidas = list(dict.fromkeys(self.pastas_removidas))
+        salvar_json(arquivo, self.__dict__)
+
+    @classmethod
+    def carregar_valido(cls, origem, destino, modo, assinatura, arquivo=ARQ_PLANO_TESTE, agora=None):
+        """Retorna o plano salvo se ele for da mesma origem/destino/modo, recente e a origem não mudou; senão None."""
+        agora = time.time() if agora is None else agora
+        try:
+            plano = cls(**carregar_json(arquivo))
+        except TypeError:
+            return None
+        if (plano.origem, plano.destino, plano.modo, plano.assinatura) != (origem, destino, modo, assinatura):
+            return None
+        if agora - plano.criado_em > VALIDADE_PLANO_TESTE_S:
+            return None
+        return plano
+
+    @staticmethod
+    def descartar(arquivo=ARQ_PLANO_TESTE):
+        try:
+            os.remove(arquivo)
+        except OSError:
+            pass
+
+    def etapas(self, bwlimit="off", ajustes=None):
+        """
+        Etapas (para ExecucaoParalela) que executam o plano: cópias, depois exclusões e por fim as
+        pastas, da mais profunda para a mais rasa, como o sync faz. Retorna (etapas, arquivos temporários).
+        """
+        etapas, temporarios = [], []
+        if self.copias:
+            arquivo = gravar_files_from(self.copias)
+            temporarios.append(arquivo)
+            comando = montar_comando_rclone("copy", self.origem, self.destino, False, bwlimit, ajustes=ajustes)
+            etapas.append([comando + ["--files-from", arquivo, "--no-traverse"]])
+        if self.exclusoes:
+            arquivo = gravar_files_from(self.exclusoes)
+            temporarios.append(arquivo)
+            etapas.append([comando_exclusao(self.destino, arquivo)])
+        por_profundidade = {}
+        for pasta in self.pastas_removidas:
+            por_profundidade.setdefault(pasta.count("/"), []).append(pasta)
+        separador = "" if self.destino.endswith((":", "/")) else "/"
+        for profundidade in sorted(por_profundidade, reverse=True):
+            etapas.append([["rclone", "rmdir", f"{self.destino}{separador}{pasta}"] for pasta in por_profundidade[profundidade]])
+        return etapas, temporarios
+
+
+class DiarioRetomada:
+    """
+    Diário dos arquivos concluídos numa execução real de um par origem/destino, para retomar
+    depois de um cancelamento ou de uma queda sem comparar de novo o que já foi enviado.
+    O arquivo só recebe acréscimos (em lotes, a cada INTERVALO_GRAVACAO_DIARIO_S): a primeira
+    linha é um cabeçalho JSON e as demais 'tamanho<TAB>mtime_ns<TAB>caminho'. Entradas repetidas
+    são eliminadas reescrevendo o diário (compactação) ao fechar e ao carregar.
+    Cada entrada guarda o tamanho e o mtime do arquivo local quando foi enviado; se ele mudou
+    desde então, a entrada é ignorada e o arquivo volta a ser enviado.
+    """
+    def __init__(self, chave, diretorio=DIR_RETOMADA):
+        nome = hashlib.sha1(chave.encode("utf-8")).hexdigest()[:16] + ".log"
+        self.arquivo = os.path.join(diretorio, nome)
+        self.chave = chave
+        self.arquivos_origem = {}
+        self._saida = None
+        self._pendentes = []
+        self._ultima_gravacao = 0.0
+        self._trava = threading.Lock()
+
+    def _ler(self):
+        """Retorna (cabeçalho, {caminho: (tamanho, mtime_ns)}, linhas de entrada) ou (None, {}, 0)."""
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f:
+                cabecalho = json.loads(f.readline())
+                concluidos = {}
+                linhas = 0
+                for linha in f:
+                    partes = linha.rstrip("\n").split("\t", 2)
+                    if len(partes) != 3:
+                        continue # Última linha incompleta (queda no meio da gravação)
+                    linhas += 1
+                    concluidos[partes[2]] = (int(partes[0]), int(partes[1]))
+                return cabecalho, concluidos, linhas
+        except (OSError, ValueError):
+            return None, {}, 0
+
+    def carregar(self, modo):
+        """Arquivos concluídos registrados para este par e modo ({} se não houver diário válido)."""
+        cabecalho, concluidos, linhas = self._ler()
+        if not cabecalho or cabecalho.get("chave") != self.chave or cabecalho.get("modo") != modo:
+            return {}
+        if linhas > len(concluidos):
+            self._reescrever(cabecalho, concluidos)
+        return concluidos
+
+    def contar(self, modo):
+        return len(self.carregar(modo))
+
+    def iniciar(self, modo, arquivos_origem, continuar=False):
+        """Abre o diário para gravação; sem 'continuar', descarta o que havia (nova execução do zero)."""
+        self.arquivos_origem = arquivos_origem
+        os.makedirs(os.path.dirname(self.arquivo) or ".", exist_ok=True)
+        if continuar and os.path.exists(self.arquivo):
+            self._saida = open(self.arquivo, "a", encoding="utf-8")
+        else:
+            self._saida = open(self.arquivo, "w", encoding="utf-8")
+            self._saida.write(json.dumps({"chave": self.chave, "modo": modo}) + "\n")
+            self._saida.flush()
+
+    def registrar(self, caminho):
+        """Registra um arquivo concluído (chamado pelas threads leitoras do rclone)."""
+        atributos = self.arquivos_origem.get(caminho)
+        if atributos is None:
+            return
+        with self._trava:
+            self._pendentes.append(f"{atributos[0]}\t{atributos[1]}\t{caminho}\n")
+            if time.time() - self._ultima_gravacao >= INTERVALO_GRAVACAO_DIARIO_S:
+                self._gravar()
+
+    def _gravar(self):
+        """Grava o lote pendente. Deve ser chamado com a trava adquirida."""
+        if self._saida is None or not self._pendentes:
+            return
+        self._saida.writelines(self._pendentes)
+        self._saida.flush()
+        self._pendentes = []
+        self._ultima_gravacao = time.time()
+
+    def fechar(self):
+        """Grava o que falta e compacta o diário (mantido para uma retomada)."""
+        with self._trava:
+            self._gravar()
+            if self._saida is None:
+                return
+            self._saida.close()
+            self._saida = None
+        cabecalho, concluidos, linhas = self._ler()
+        if cabecalho and linhas > len(concluidos):
+            self._reescrever(cabecalho, concluidos)
+
+    def descartar(self):
+        """Remove o diário (a execução terminou com sucesso e não há o que retomar)."""
+        with self._trava:
+            self._pendentes = []
+            if self._saida is not None:
+                self._saida.close()
+                self._saida = None
+        try:
+            os.remove(self.arquivo)
+        except OSError:
+            pass
+
+    def _reescrever(self, cabecalho, concluidos):
+        temporario = self.arquivo + ".tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                f.write(json.dumps(cabecalho) + "\n")
+                for caminho, (tamanho, mtime_ns) in concluidos.items():
+                    f.write(f"{tamanho}\t{mtime_ns}\t{caminho}\n")
+            os.replace(temporario, self.arquivo)
+        except OSError as e:
+            print(f"Erro ao compactar o diário de retomada: {e}")
+            sys.stdout.flush() # Forçar a saída
+
+@dataclass
+class PlanoExecucao:
+    """
+    Preparação de uma execução do rclone: o que o manifesto local e o modo incremental
+    permitem evitar (execução inteira, varredura completa, ou arquivos antigos).
+    """
+    chave_manifesto: str
+    arquivos_atuais: dict = None
+    arquivo_files_from: str = None
+    max_age: float = None
+    no_traverse: bool = False
+    nada_mudou: bool = False
+    ajustes: dict = None # transfers/checkers/chunk_size desta execução (None = AJUSTES_PADRAO)
+    filtro: FiltroExclusao = None # Regras de exclusão do perfil
+    varredura: dict = None # Varredura da origem já feita (sem filtro), reaproveitada por escanear()
+    arquivo_filtro: str = None # As mesmas regras, para --filter-from
+    excluidos_filtro: dict = None # {padrão: [arquivos, bytes]} excluídos da última varredura
+    exclusoes: list = None # Passadas por tamanho no sync: arquivos que saíram da origem (manifesto), apagados sem uma passada de sync completa
+
+    def escanear(self, origem):
+        """Varredura da origem sem os arquivos que o filtro exclui (contados em excluidos_filtro)."""
+        arquivos = self.varredura if self.varredura is not None else escanear_origem(origem)
+        if self.filtro is not None:
+            arquivos, self.excluidos_filtro = self.filtro.aplicar(arquivos)
+        return arquivos
+
+    def linhas_filtro(self):
+        """Linhas de log com o que cada regra do filtro excluiu na varredura."""
+        if not self.excluidos_filtro:
+            return []
+        arquivos = sum(quantidade for quantidade, _ in self.excluidos_filtro.values())
+        total = sum(tamanho for _, tamanho in self.excluidos_filtro.values())
+        linhas = [f"Filtro de exclusão: {arquivos} arquivo(s), {formatar_bytes(total)} fora da sincronização\n"]
+        sem_efeito = 0
+        for padrao, (quantidade, tamanho) in self.excluidos_filtro.items():
+            if quantidade:
+                linhas.append(f"  - {padrao}: {quantidade} arquivo(s), {formatar_bytes(tamanho)}\n")
+            else:
+                sem_efeito += 1
+        if sem_efeito:
+            linhas.append(f"  {sem_efeito} regra(s) não excluíram nenhum arquivo\n")
+        return linhas
+
+    @property
+    def completa(self):
+        """Indica se o rclone vai comparar toda a origem com o destino (conta como reconciliação periódica)."""
+        return self.arquivo_files_from is None and self.max_age is None and self.exclusoes is None
+
+    def argumentos(self):
+        """Argumentos extras da linha de comando do rclone."""
+        if self.arquivo_files_from:
+            # A lista já vem da varredura filtrada
+            return ["--files-from", self.arquivo_files_from, "--no-traverse"]
+        filtro = ["--filter-from", self.arquivo_filtro] if self.arquivo_filtro else []
+        if self.max_age is not None:
+            return filtro + [f"--max-age={int(self.max_age)}s"] + (["--no-traverse"] if self.no_traverse else [])
+        return filtro
+
+    def opcoes_rc(self, config):
+        """Equivalente de argumentos() para um job no daemon: ajusta 'config' e retorna o _filter (ou None)."""
+        ajustes = self.ajustes or AJUSTES_PADRAO
+        config["Transfers"] = ajustes["transfers"]
+        config["Checkers"] = ajustes["checkers"]
+        if self.arquivo_files_from:
+            config["NoTraverse"] = True
+            return {"FilesFrom": [self.arquivo_files_from]}
+        filtro = {"ExcludeRule": list(self.filtro.padroes)} if self.filtro is not None else {}
+        if self.max_age is not None:
+            config["NoTraverse"] = self.no_traverse
+            filtro["MaxAge"] = f"{int(self.max_age)}s"
+        return filtro or None
+
+    def planejados(self, arquivos):
+        """Caminhos que esta execução deve enviar: a lista do --files-from, a janela do --max-age ou a origem inteira."""
+        if self.arquivo_files_from:
+            with open(self.arquivo_files_from, "r", encoding="utf-8") as f:
+                return [linha.rstrip("\n") for linha in f if linha.strip()]
+        if self.max_age is not None:
+            limite_mtime_ns = (time.time() - self.max_age) * 1e9
+            return [caminho for caminho, (_, mtime_ns) in arquivos.items() if mtime_ns >= limite_mtime_ns]
+        return list(arquivos)
+
+    def lista_explicita(self):
+        """
+        Caminhos do --files-from, ou None quando o rclone compara a origem inteira (ou a janela do
+        --max-age) com o destino e envia só a diferença, que não se conhece de antemão.
+        """
+        return self.planejados(None) if self.arquivo_files_from else None
+
+    def retomar(self, arquivos, concluidos):
+        """
+        Restringe o plano aos arquivos planejados que ainda não constam como concluídos (com o
+        mesmo tamanho e mtime) no diário de retomada. Retorna (restantes, já concluídos).
+        """
+        planejados = self.planejados(arquivos)
+        restantes = [caminho for caminho in planejados if concluidos.get(caminho) != arquivos.get(caminho)]
+        ja_concluidos = len(planejados) - len(restantes)
+        self.limpar()
+        self.arquivo_files_from = gravar_files_from(restantes)
+        self.max_age = None
+        return restantes, ja_concluidos
+
+    def registrar_sucesso(self, log):
+        """Grava o manifesto da origem após uma sincronização real bem-sucedida."""
+        if self.arquivos_atuais is None:
+            return
+        import sqlite3
+        try:
+            ManifestoLocal().salvar(self.chave_manifesto, self.arquivos_atuais)
+        except sqlite3.Error as e:
+            log.write(f"Erro ao gravar o manifesto local: {e}\n")
+
+    def limpar(self):
+        for arquivo in (self.arquivo_files_from, self.arquivo_filtro):
+            if arquivo:
+                try:
+                    os.remove(arquivo)
+                except OSError:
+                    pass
+
+def _aplicar_ajuste_automatico(plano, origem, perfil, log, arquivos=None):
+    """
+    Escolhe os ajustes da execução (escolher_ajustes) quando o perfil usa o ajuste automático.
+    'arquivos' são os que a execução vai enviar; sem eles, a origem inteira.
+    """
+    if not perfil or not perfil.get("ajuste_automatico"):
+        return
+    if arquivos is None:
+        arquivos = plano.arquivos_atuais if plano.arquivos_atuais is not None else plano.escanear(origem)
+    plano.ajustes = escolher_ajustes(perfil, arquivos)
+    log.write(f"Ajuste automático: --transfers={plano.ajustes['transfers']} --checkers={plano.ajustes['checkers']} --onedrive-chunk-size={plano.ajustes['chunk_size']}\n")
+
+def planejar_execucao(origem, destino, modo, perfil, log, filtro=None, varredura=None):
+    """
+    Compara a origem com o manifesto da última sincronização bem-sucedida e aplica o modo
+    incremental do perfil (se houver). Registra as decisões no log e retorna um PlanoExecucao.
+    Com um FiltroExclusao, os arquivos excluídos ficam fora da varredura, do manifesto e do rclone.
+    'varredura' (de escanear_origem, sem filtro) evita varrer a origem de novo.
+    """
+    plano = PlanoExecucao(ManifestoLocal.chave(origem, destino), filtro=filtro, varredura=varredura)
+    if filtro is not None:
+        plano.arquivo_filtro = filtro.gravar()
+        log.write(f"Filtro de exclusão: {', '.join(filtro.padroes)}\n")
+    if USAR_MANIFESTO:
+        import sqlite3
+        plano.arquivos_atuais = plano.escanear(origem)
+        try:
+            anterior = ManifestoLocal().carregar(plano.chave_manifesto)
+        except sqlite3.Error as e:
+            log.write(f"Erro ao ler o manifesto local: {e}\n")
+            anterior = None
+        if anterior is not None:
+            alterados, removidos = comparar_manifesto(anterior, plano.arquivos_atuais)
+            log.write(f"Manifesto: {len(alterados)} arquivo(s) novo(s)/alterado(s), {len(removidos)} removido(s) desde a última sincronização\n")
+            if not alterados and not removidos:
+                log.write("Nenhuma alteração na pasta local; o rclone não foi executado.\n")
+                plano.nada_mudou = True
+                return plano
+            # Passadas por tamanho no sync: as remoções desde o manifesto são apagadas direto no destino;
+            # a passada de sync completa fica para a reconciliação periódica
+            if modo == "sync" and perfil and perfil.get("separar_tamanhos") and not reconciliacao_vencida(perfil):
+                plano.exclusoes = removidos
+                log.write(f"Exclusões pelo manifesto: {len(removidos)} arquivo(s), sem a passada de sync completa\n")
+            # Remoções em modo sync exigem a comparação completa para apagar no destino
+            if (modo == "copy" or not removidos or plano.exclusoes is not None) and len(alterados) <= LIMITE_FILES_FROM:
+                plano.arquivo_files_from = gravar_files_from(alterados)
+                # A execução pelo manifesto também usa (e alimenta) o ajuste automático
+                _aplicar_ajuste_automatico(plano, origem, perfil, log, {caminho: plano.arquivos_atuais[caminho] for caminho in alterados})
+                return plano
+
+    # Modo incremental: só arquivos modificados desde a última execução bem-sucedida do perfil
+    if perfil:
+        plano.max_age = calcular_max_age_incremental(perfil)
+        if plano.max_age is not None:
+            log.write(f"Modo incremental: apenas arquivos modificados nos últimos {segundos_para_eta(plano.max_age)} (--max-age)\n")
+            if plano.arquivos_atuais is not None:
+                limite_mtime_ns = (time.time() - plano.max_age) * 1e9
+                recentes = sum(1 for _, mtime_ns in plano.arquivos_atuais.values() if mtime_ns >= limite_mtime_ns)
+                plano.no_traverse = recentes <= LIMITE_NO_TRAVERSE
+        elif perfil.get("incremental") and modo == "copy":
+            log.write("Modo incremental: executando a reconciliação completa periódica\n")
+    _aplicar_ajuste_automatico(plano, origem, perfil, log)
+    return plano
@@ -0,0 +1,323 @@
+"""Acesso ao OneDrive pelo rclone: listagem de pastas (com cache), servidor rc e daemon 'rclone rcd'."""
+
+import subprocess
+import os
+import json
+import threading
+import time
+import sys
+
+USAR_RC_STATS = False # Lê o progresso consultando o servidor rc do rclone (core/stats) em vez da saída
+INTERVALO_RC_S = 1.0 # Intervalo entre consultas ao rc durante a sincronização
+USAR_DAEMON_RCLONE = False # Mantém um 'rclone rcd' aberto e envia listagens, mkdir e sincronizações pela API rc
+ARQ_CACHE_PASTAS = "cache_pastas.json" # Cache em disco da listagem de pastas remotas
+TTL_CACHE_PASTAS_S = 6 * 3600 # Idade máxima do cache antes de listar o OneDrive novamente
+
+def verificar_rclone():
+    """Verifica se o rclone está instalado e acessível no sistema."""
+    try:
+        subprocess.run(["rclone", "--version"], stdout=subprocess.DEVNULL, check=True)
+        return True
+    except:
+        return False
+
+def listar_pastas_remotas(remote="onedrive:", daemon=None):
+    """
+    Lista as pastas de 'remote' usando o daemon rcd (se estiver ativo) ou rclone lsf.
+    Diferente de listar_pastas_onedrive, lança a exceção em caso de erro, para que
+    uma falha não seja confundida com uma pasta vazia (e não sobrescreva o cache).
+    """
+    if daemon and daemon.ativo():
+        try:
+            return daemon.listar_pastas(remote)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Erro ao listar pastas pelo daemon, usando rclone lsf: {e}")
+            sys.stdout.flush() # Forçar a saída
+    resultado = subprocess.run(
+        ["rclone", "lsf", remote, "--dirs-only"],
+        capture_output=True, text=True, encoding="utf-8", check=True
+    )
+    return [linha.strip().rstrip("/") for linha in resultado.stdout.splitlines() if linha.strip()]
+
+def listar_pastas_onedrive(daemon=None):
+    """Lista as pastas existentes no OneDrive usando rclone lsf (ou o daemon rcd, se estiver ativo)."""
+    try:
+        return listar_pastas_remotas("onedrive:", daemon)
+    except Exception as e:
+        print(f"Erro ao listar pastas do OneDrive: {e}")
+        sys.stdout.flush() # Forçar a saída
+        return []
+
+def listar_nivel_remoto(remote, caminho="", daemon=None):
+    """
+    Lista apenas as subpastas imediatas de remote:caminho (rclone lsjson --dirs-only,
+    ou operations/list no daemon). Retorna os caminhos completos a partir da raiz do remote.
+    """
+    if daemon and daemon.ativo():
+        try:
+            return daemon.listar_pastas(remote, caminho)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Erro ao listar pastas pelo daemon, usando rclone lsjson: {e}")
+            sys.stdout.flush() # Forçar a saída
+    resultado = subprocess.run(
+        ["rclone", "lsjson", f"{remote}{caminho}", "--dirs-only"],
+        capture_output=True, text=True, encoding="utf-8", check=True
+    )
+    prefixo = f"{caminho}/" if caminho else ""
+    return [prefixo + item["Path"] for item in json.loads(resultado.stdout or "[]")]
+
+class ListadorNiveisRemotos:
+    """
+    Lista o remoto um nível de cada vez, sob demanda.
+    Cada nível já listado fica memorizado, e pedidos simultâneos do mesmo caminho
+    (ex: a mesma pasta expandida duas vezes) compartilham uma única chamada ao rclone.
+    """
+    def __init__(self, remote="onedrive:", daemon=None):
+        self.remote = remote
+        self.daemon = daemon
+        self._niveis = {}
+        self._em_andamento = {}
+        self._trava = threading.Lock()
+
+    def listar(self, caminho=""):
+        """Retorna as subpastas de 'caminho' (bloqueia; chamar fora da thread do Tk)."""
+        with self._trava:
+            if caminho in self._niveis:
+                return self._niveis[caminho]
+            futuro = self._em_andamento.get(caminho)
+            dono = futuro is None
+            if dono:
+                from concurrent.futures import Future
+                futuro = Future()
+                self._em_andamento[caminho] = futuro
+        if not dono:
+            return futuro.result()
+
+        try:
+            pastas = listar_nivel_remoto(self.remote, caminho, self.daemon)
+        except Exception as e:
+            with self._trava:
+                del self._em_andamento[caminho]
+            futuro.set_exception(e)
+            raise
+        with self._trava:
+            self._niveis[caminho] = pastas
+            del self._em_andamento[caminho]
+        futuro.set_result(pastas)
+        return pastas
+
+    def memorizar(self, caminho, pastas):
+        """Aproveita uma listagem obtida por outro meio (ex: o cache da raiz)."""
+        with self._trava:
+            self._niveis.setdefault(caminho, list(pastas))
+
+    def registrar_pasta(self, caminho):
+        """Inclui uma pasta criada pelo aplicativo no nível pai, se ele já estiver memorizado."""
+        pai = caminho.rpartition("/")[0]
+        with self._trava:
+            if pai in self._niveis and caminho not in self._niveis[pai]:
+                self._niveis[pai] = self._niveis[pai] + [caminho]
+
+    def invalidar(self):
+        with self._trava:
+            self._niveis.clear()
+
+_trava_cache_pastas = threading.Lock()
+
+def _ler_arquivo_cache_pastas():
+    try:
+        with open(ARQ_CACHE_PASTAS, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _gravar_arquivo_cache_pastas(cache):
+    # Grava num arquivo temporário e substitui, para nunca deixar o cache pela metade
+    temporario = ARQ_CACHE_PASTAS + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, ARQ_CACHE_PASTAS)
+
+def ler_cache_pastas(remote="onedrive:"):
+    """Retorna (pastas, idade_em_segundos) do cache em disco, ou (None, None) se não houver cache."""
+    with _trava_cache_pastas:
+        entrada = _ler_arquivo_cache_pastas().get(remote)
+    if not isinstance(entrada, dict) or not isinstance(entrada.get("pastas"), list):
+        return None, None
+    return entrada["pastas"], time.time() - float(entrada.get("atualizado_em", 0))
+
+def gravar_cache_pastas(pastas, remote="onedrive:"):
+    """Substitui a listagem de 'remote' no cache, marcando-a como atualizada agora."""
+    with _trava_cache_pastas:
+        cache = _ler_arquivo_cache_pastas()
+        cache[remote] = {"atualizado_em": time.time(), "pastas": list(pastas)}
+        try:
+            _gravar_arquivo_cache_pastas(cache)
+        except OSError as e:
+            print(f"Erro ao gravar o cache de pastas: {e}")
+            sys.stdout.flush() # Forçar a saída
+
+def adicionar_pasta_cache(pasta, remote="onedrive:"):
+    """
+    Registra no cache uma pasta criada pelo próprio aplicativo (ex: após rclone mkdir),
+    sem listar o remoto de novo. A data da última listagem completa é mantida.
+    Retorna a lista de pastas atualizada, ou None se ainda não houver cache.
+    """
+    with _trava_cache_pastas:
+        cache = _ler_arquivo_cache_pastas()
+        entrada = cache.get(remote)
+        if not isinstance(entrada, dict) or not isinstance(entrada.get("pastas"), list):
+            return None
+        if pasta not in entrada["pastas"]:
+            entrada["pastas"] = sorted(entrada["pastas"] + [pasta], key=str.lower)
+            try:
+                _gravar_arquivo_cache_pastas(cache)
+            except OSError as e:
+                print(f"Erro ao gravar o cache de pastas: {e}")
+                sys.stdout.flush() # Forçar a saída
+        return entrada["pastas"]
+
+def porta_livre():
+    """Retorna uma porta TCP livre em 127.0.0.1 para o servidor rc do rclone."""
+    import socket
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class ClienteRc:
+    """
+    Cliente mínimo da API de controle remoto (rc) do rclone.
+    Cada chamada é um POST com JSON para http://<endereço>/<comando> e retorna o JSON da resposta.
+    """
+    def __init__(self, endereco, timeout=5):
+        self.url_base = f"http://{endereco}/"
+        self.timeout = timeout
+
+    def chamar(self, comando, **parametros):
+        import urllib.request # Importado só quando o rc é usado: é o módulo mais caro da importação do núcleo
+        import urllib.error
+        requisicao = urllib.request.Request(
+            self.url_base + comando,
+            data=json.dumps(parametros).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(requisicao, timeout=self.timeout) as resposta:
+                return json.loads(resposta.read().decode("utf-8") or "{}")
+        except urllib.error.HTTPError as e:
+            # O rc responde erros com JSON {"error": "...", "status": ...}
+            try:
+                detalhe = json.loads(e.read().decode("utf-8")).get("error", str(e))
+            except ValueError:
+                detalhe = str(e)
+            raise RuntimeError(f"rc {comando}: {detalhe}") from e
+
+    def disponivel(self):
+        """Indica se o servidor rc já está respondendo."""
+        try:
+            self.chamar("rc/noop")
+            return True
+        except (OSError, RuntimeError):
+            return False
+
+class JobDaemon:
+    """
+    Job assíncrono (sync/copy ou sync/sync) executado no daemon rcd.
+    Expõe a mesma interface usada de subprocess.Popen (poll, wait, terminate,
+    returncode, stdout/stderr), para que a TarefaSincronizacao trate os dois igualmente.
+    """
+    stdout = None
+    stderr = None
+
+    def __init__(self, daemon, jobid):
+        self.daemon = daemon
+        self.jobid = jobid
+        self.grupo = f"job/{jobid}" # Grupo de estatísticas do job em core/stats e core/transferred
+        self.returncode = None
+        self.erro = None
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                status = self.daemon.cliente.chamar("job/status", jobid=self.jobid)
+            except (OSError, RuntimeError, ValueError) as e:
+                if not self.daemon.ativo():
+                    self.returncode = 1
+                    self.erro = f"O daemon do rclone foi encerrado: {e}"
+                return self.returncode
+            if status.get("finished"):
+                self.erro = status.get("error") or None
+                self.returncode = 0 if status.get("success") else 1
+        return self.returncode
+
+    def wait(self):
+        while self.poll() is None:
+            time.sleep(INTERVALO_RC_S)
+        return self.returncode
+
+    def terminate(self):
+        try:
+            self.daemon.cliente.chamar("job/stop", jobid=self.jobid)
+        except (OSError, RuntimeError, ValueError):
+            pass
+
+
+class DaemonRclone:
+    """
+    Processo 'rclone rcd' de longa duração, pertencente ao aplicativo.
+    Listagens, criação de pastas e sincronizações passam pela API rc, de modo que a
+    configuração, os tokens e as conexões com o OneDrive continuam abertos entre operações.
+    """
+    def __init__(self):
+        self.processo = None
+        self.cliente = None
+
+    def iniciar(self, timeout=15):
+        """Inicia o rcd e aguarda o servidor responder. Retorna False se não foi possível."""
+        endereco = f"127.0.0.1:{porta_livre()}"
+        try:
+            self.processo = subprocess.Popen(
+                ["rclone", "rcd", f"--rc-addr={endereco}", "--rc-no-auth"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        except OSError:
+            self.processo = None
+            return False
+        self.cliente = ClienteRc(endereco)
+        limite = time.time() + timeout
+        while time.time() < limite and self.processo.poll() is None:
+            if self.cliente.disponivel():
+                return True
+            time.sleep(0.1)
+        self.parar()
+        return False
+
+    def ativo(self):
+        return self.processo is not None and self.processo.poll() is None
+
+    def parar(self):
+        if self.ativo():
+            self.processo.terminate()
+            try:
+                self.processo.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.processo.kill()
+
+    def listar_pastas(self, remote, caminho=""):
+        resultado = self.cliente.chamar("operations/list", fs=remote, remote=caminho, opt={"dirsOnly": True})
+        return [item["Path"] for item in resultado.get("list") or []]
+
+    def criar_pasta(self, remote, caminho):
+        self.cliente.chamar("operations/mkdir", fs=remote, remote=caminho)
+
+    def iniciar_sync(self, modo, origem, destino, config, bwlimit="off", filtro=None):
+        """Dispara sync/copy ou sync/sync como job assíncrono e retorna um JobDaemon."""
+        # O limite de banda é global no rcd; é definido antes de cada job
+        self.cliente.chamar("core/bwlimit", rate=bwlimit)
+        parametros = {"srcFs": origem, "dstFs": destino, "_async": True, "_config": config}
+        if filtro:
+            parametros["_filter"] = filtro
+        resultado = self.cliente.chamar(f"sync/{modo}", **parametros)
+        return JobDaemon(self, resultado["jobid"])
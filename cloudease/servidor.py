@@ -0,0 +1,503 @@
+"""
+Servidor de controle local (python -m cloudease serve): API HTTP/JSON para listar os perfis e
+iniciar, cancelar, pausar e retomar sincronizações, com o progresso em Server-Sent Events.
+
+Rotas:
+    GET    /perfis                   perfis salvos (perfis.json)
+    GET    /tarefas                  tarefas e o limite de tarefas simultâneas
+    POST   /tarefas                  {"perfil": nome, "teste": false} inicia uma tarefa (201, com o resumo)
+    DELETE /tarefas                  remove as tarefas finalizadas
+    GET    /tarefas/<id>             resumo de uma tarefa
+    POST   /tarefas/<id>/cancelar    (também /pausar e /retomar)
+    POST   /fila                     {"max_simultaneas": n}
+    GET    /eventos[?tarefa=<id>]    progresso contínuo (text/event-stream): um evento 'tarefa' a cada
+                                     mudança e 'removida' quando a tarefa sai da lista
+
+As tarefas são as mesmas da fila de perfis da interface (TarefaSincronizacao / FilaSincronizacao).
+Toda requisição precisa do cabeçalho 'Authorization: Bearer <token>'. O token vem de --token, da
+variável CLOUDEASE_TOKEN ou, sem nenhum dos dois, de ARQ_TOKEN_SERVIDOR, gerado aleatoriamente na
+primeira execução e lido pelo ClienteServidor (interface e linha de comando) na mesma pasta.
+Contra páginas web abertas no navegador (requisições de outra origem e DNS rebinding), o servidor
+também recusa POST/DELETE sem 'Content-Type: application/json', um 'Origin' que não seja local e
+um 'Host' que não seja local, um IP ou o endereço de escuta.
+"""
+import hmac
+import ipaddress
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from cloudease.perfis import ARQ_PERFIS, carregar_json, registrar_execucao_arquivo
+from cloudease.execucao import ESTADOS_FINAIS_TAREFA, MAX_TAREFAS_SIMULTANEAS, FilaSincronizacao, TarefaSincronizacao
+
+ENDERECO_SERVIDOR = "127.0.0.1"
+PORTA_SERVIDOR = 8765
+VARIAVEL_TOKEN = "CLOUDEASE_TOKEN" # Variável de ambiente com o token (servidor e cliente)
+ARQ_TOKEN_SERVIDOR = "token_servidor.txt" # Token gerado pelo servidor quando não há --token nem CLOUDEASE_TOKEN (lido pelo cliente)
+NOMES_LOCAIS = ("localhost", "127.0.0.1", "::1") # Hosts aceitos em 'Origin' e 'Host'
+INTERVALO_EVENTOS_S = 1.0 # Intervalo entre as verificações de progresso enviadas em /eventos
+INTERVALO_PING_S = 15 # Sem mudanças, /eventos envia um comentário nesse intervalo (detecta clientes que saíram)
+
+
+def token_salvo(arquivo=ARQ_TOKEN_SERVIDOR, criar=False):
+    """Token salvo em 'arquivo' (None se não há); com criar=True, gera e salva um token aleatório se não houver."""
+    try:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            token = f.read().strip()
+    except OSError:
+        token = ""
+    if token or not criar:
+        return token or None
+    import secrets
+    token = secrets.token_urlsafe(32)
+    # Só o dono do arquivo pode ler o token
+    with os.fdopen(os.open(arquivo, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+
+def _nome_local(nome):
+    if nome in NOMES_LOCAIS:
+        return True
+    try:
+        return ipaddress.ip_address(nome).is_loopback
+    except ValueError:
+        return False
+
+
+def host_permitido(host, endereco=ENDERECO_SERVIDOR):
+    """
+    Indica se o cabeçalho 'Host' aponta para este servidor: um nome local, um IP (o DNS rebinding
+    usa um nome de domínio) ou o endereço de escuta.
+    """
+    try:
+        nome = urlsplit(f"//{host}").hostname
+    except ValueError:
+        return False
+    if not nome:
+        return False
+    if _nome_local(nome) or nome == endereco:
+        return True
+    try:
+        ipaddress.ip_address(nome)
+        return True
+    except ValueError:
+        return False
+
+
+def origem_permitida(origem):
+    """Indica se o cabeçalho 'Origin' (ausente nos clientes fora do navegador) é de uma página local."""
+    if origem is None:
+        return True
+    try:
+        nome = urlsplit(origem).hostname
+    except ValueError:
+        return False
+    return nome is not None and _nome_local(nome)
+
+
+class ErroApi(Exception):
+    """Erro de uma requisição, respondido como {"erro": mensagem} com o código HTTP 'status'."""
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class ServidorTarefas:
+    """Estado do servidor: a fila de sincronizações e as tarefas, identificadas por um número."""
+    def __init__(self, arquivo_perfis=ARQ_PERFIS, max_simultaneas=MAX_TAREFAS_SIMULTANEAS):
+        self.arquivo_perfis = arquivo_perfis
+        self.fila = FilaSincronizacao(max_simultaneas)
+        self.tarefas = {} # id da FilaSincronizacao -> TarefaSincronizacao (a retomada de uma tarefa pausada mantém o id)
+        self._trava = threading.Lock()
+
+    def perfis(self):
+        return carregar_json(self.arquivo_perfis)
+
+    def _ao_concluir(self, tarefa, inicio_iso, completa):
+        registrar_execucao_arquivo(self.arquivo_perfis, tarefa.nome_perfil, inicio_iso, completa,
+                                   tarefa.ajustes, tarefa.amostrador.vazao())
+
+    def _tarefa(self, id_tarefa):
+        with self._trava:
+            if id_tarefa not in self.tarefas:
+                raise ErroApi(404, f"tarefa {id_tarefa} não encontrada")
+            return self.tarefas[id_tarefa]
+
+    def resumo(self, id_tarefa):
+        return dict(id=id_tarefa, **self._tarefa(id_tarefa).resumo())
+
+    def listar(self):
+        with self._trava:
+            tarefas = list(self.tarefas.items())
+        return [dict(id=id_tarefa, **tarefa.resumo()) for id_tarefa, tarefa in tarefas]
+
+    def iniciar(self, nome_perfil, is_dry_run=False):
+        perfil = self.perfis().get(nome_perfil)
+        if perfil is None:
+            raise ErroApi(404, f"perfil '{nome_perfil}' não encontrado")
+        if not perfil.get("origem") or not perfil.get("destino"):
+            raise ErroApi(400, f"o perfil '{nome_perfil}' não tem origem e destino")
+        with self._trava:
+            if self.fila.em_andamento(nome_perfil):
+                raise ErroApi(409, f"o perfil '{nome_perfil}' já está na fila ou em execução")
+            tarefa = TarefaSincronizacao(nome_perfil, perfil, ao_concluir=self._ao_concluir, is_dry_run=is_dry_run)
+            self.fila.adicionar(tarefa)
+            self.tarefas[tarefa.id] = tarefa
+        return self.resumo(tarefa.id)
+
+    def cancelar(self, id_tarefa):
+        self._tarefa(id_tarefa).cancelar()
+        return self.resumo(id_tarefa)
+
+    def pausar(self, id_tarefa):
+        if not self._tarefa(id_tarefa).pausar():
+            raise ErroApi(409, f"a tarefa {id_tarefa} já terminou")
+        return self.resumo(id_tarefa)
+
+    def retomar(self, id_tarefa):
+        tarefa = self._tarefa(id_tarefa)
+        with self._trava:
+            nova = self.fila.retomar(tarefa)
+            if nova is None:
+                raise ErroApi(409, f"a tarefa {id_tarefa} não está pausada, ou o perfil já está em andamento")
+            self.tarefas[id_tarefa] = nova
+        return self.resumo(id_tarefa)
+
+    def remover_finalizadas(self):
+        # A fila decide o que sai (uma tarefa ainda ativa fica); os ids são os da fila
+        with self._trava:
+            self.fila.remover_finalizadas()
+            self.tarefas = {tarefa.id: tarefa for tarefa in self.fila.tarefas}
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    servidor_tarefas = None # Definidos na subclasse criada por servir()
+    token = None
+    endereco = ENDERECO_SERVIDOR
+
+    def _responder(self, status, conteudo):
+        corpo = json.dumps(conteudo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _ler_json(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if not tamanho:
+            return {}
+        try:
+            dados = json.loads(self.rfile.read(tamanho).decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            raise ErroApi(400, "corpo da requisição não é um JSON válido")
+        if not isinstance(dados, dict):
+            raise ErroApi(400, "o corpo da requisição deve ser um objeto JSON")
+        return dados
+
+    def _tratar(self, metodo):
+        if not host_permitido(self.headers.get("Host", ""), self.endereco) or not origem_permitida(self.headers.get("Origin")):
+            self._responder(403, {"erro": "origem não permitida"})
+            return
+        tipo = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if metodo != "GET" and tipo != "application/json":
+            # Um formulário ou fetch 'simples' de outra página não consegue enviar application/json
+            self._responder(415, {"erro": "use Content-Type: application/json"})
+            return
+        if not self.token or not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {self.token}"):
+            self._responder(401, {"erro": "token ausente ou inválido"})
+            return
+        url = urlsplit(self.path)
+        partes = [parte for parte in url.path.split("/") if parte]
+        try:
+            if metodo == "GET" and partes == ["eventos"]:
+                self._eventos(parse_qs(url.query).get("tarefa", [None])[0])
+                return
+            status, conteudo = self._rotear(metodo, partes)
+        except ErroApi as e:
+            status, conteudo = e.status, {"erro": str(e)}
+        self._responder(status, conteudo)
+
+    def do_GET(self):
+        self._tratar("GET")
+
+    def do_POST(self):
+        self._tratar("POST")
+
+    def do_DELETE(self):
+        self._tratar("DELETE")
+
+    def _rotear(self, metodo, partes):
+        servidor = self.servidor_tarefas
+        if partes == ["perfis"] and metodo == "GET":
+            return 200, [dict(perfil, nome=nome) for nome, perfil in servidor.perfis().items()]
+        if partes == ["tarefas"]:
+            if metodo == "GET":
+                return 200, {"max_simultaneas": servidor.fila.max_simultaneas, "tarefas": servidor.listar()}
+            if metodo == "POST":
+                dados = self._ler_json()
+                if not isinstance(dados.get("perfil"), str):
+                    raise ErroApi(400, "informe o nome do perfil em 'perfil'")
+                return 201, servidor.iniciar(dados["perfil"], bool(dados.get("teste")))
+            if metodo == "DELETE":
+                servidor.remover_finalizadas()
+                return 200, {"max_simultaneas": servidor.fila.max_simultaneas, "tarefas": servidor.listar()}
+        if len(partes) in (2, 3) and partes[0] == "tarefas":
+            if not partes[1].isdigit():
+                raise ErroApi(404, f"tarefa {partes[1]} não encontrada")
+            id_tarefa = int(partes[1])
+            if len(partes) == 2 and metodo == "GET":
+                return 200, servidor.resumo(id_tarefa)
+            if len(partes) == 3 and metodo == "POST" and partes[2] in ("cancelar", "pausar", "retomar"):
+                return 200, getattr(servidor, partes[2])(id_tarefa)
+        if partes == ["fila"] and metodo == "POST":
+            try:
+                servidor.fila.definir_max_simultaneas(self._ler_json()["max_simultaneas"])
+            except (KeyError, TypeError, ValueError):
+                raise ErroApi(400, "informe um número inteiro em 'max_simultaneas'")
+            return 200, {"max_simultaneas": servidor.fila.max_simultaneas}
+        raise ErroApi(404, f"rota inexistente: {metodo} /{'/'.join(partes)}")
+
+    def _eventos(self, id_filtro):
+        """Envia o resumo de cada tarefa que mudou até o cliente desconectar (ou a tarefa filtrada terminar)."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        anteriores = {}
+        ultimo_envio = time.monotonic()
+        try:
+            while True:
+                mensagens = []
+                atuais = {}
+                for resumo in self.servidor_tarefas.listar():
+                    if id_filtro is not None and str(resumo["id"]) != id_filtro:
+                        continue
+                    atuais[resumo["id"]] = resumo
+                    if anteriores.get(resumo["id"]) != resumo:
+                        mensagens.append(("tarefa", resumo))
+                for id_tarefa in anteriores.keys() - atuais.keys():
+                    mensagens.append(("removida", {"id": id_tarefa}))
+                anteriores = atuais
+                if mensagens:
+                    for evento, dados in mensagens:
+                        self.wfile.write(f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    ultimo_envio = time.monotonic()
+                elif time.monotonic() - ultimo_envio >= INTERVALO_PING_S:
+                    self.wfile.write(b": ping\n\n")
+                    ultimo_envio = time.monotonic()
+                self.wfile.flush()
+                if id_filtro is not None and all(resumo["estado"] in ESTADOS_FINAIS_TAREFA for resumo in atuais.values()):
+                    return
+                time.sleep(INTERVALO_EVENTOS_S)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            return
+
+
+def criar_servidor(endereco=ENDERECO_SERVIDOR, porta=PORTA_SERVIDOR, arquivo_perfis=ARQ_PERFIS,
+                   max_simultaneas=MAX_TAREFAS_SIMULTANEAS, token=None):
+    """Cria o servidor HTTP (ainda sem atender) e retorna (ThreadingHTTPServer, ServidorTarefas)."""
+    servidor_tarefas = ServidorTarefas(arquivo_perfis, max_simultaneas)
+    manipulador = type("Manipulador", (_Manipulador,), {"servidor_tarefas": servidor_tarefas, "token": token, "endereco": endereco})
+    http = ThreadingHTTPServer((endereco, porta), manipulador)
+    http.daemon_threads = True
+    return http, servidor_tarefas
+
+
+def servir(endereco=ENDERECO_SERVIDOR, porta=PORTA_SERVIDOR, arquivo_perfis=ARQ_PERFIS,
+           max_simultaneas=MAX_TAREFAS_SIMULTANEAS, token=None):
+    """Executa o servidor até Ctrl+C; as tarefas em andamento são canceladas ao sair."""
+    token = token or os.environ.get(VARIAVEL_TOKEN)
+    if not token:
+        token = token_salvo(criar=True)
+        print(f"Token do servidor em {os.path.abspath(ARQ_TOKEN_SERVIDOR)} (defina --token ou {VARIAVEL_TOKEN} para usar outro)")
+    http, servidor_tarefas = criar_servidor(endereco, porta, arquivo_perfis, max_simultaneas, token)
+    print(f"Servidor do CloudEase em http://{endereco}:{http.server_port}/ (perfis: {arquivo_perfis})")
+    sys.stdout.flush() # Forçar a saída
+    try:
+        http.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor_tarefas.fila.cancelar_todas()
+        http.server_close()
+    return 0
+
+
+class ClienteServidor:
+    """
+    Cliente da API do servidor. Como o ClienteRc, cada chamada é uma requisição com JSON e
+    erros da API viram RuntimeError com a mensagem do servidor.
+    O token vem de 'token', da variável CLOUDEASE_TOKEN ou do ARQ_TOKEN_SERVIDOR gerado pelo servidor.
+    """
+    def __init__(self, endereco=f"{ENDERECO_SERVIDOR}:{PORTA_SERVIDOR}", token=None, timeout=5):
+        self.endereco = endereco
+        self.url_base = f"http://{endereco}/"
+        self.token = token or os.environ.get(VARIAVEL_TOKEN) or token_salvo()
+        self.timeout = timeout
+
+    def _requisicao(self, metodo, caminho, dados=None):
+        import urllib.request
+        cabecalhos = {"Content-Type": "application/json"}
+        if self.token:
+            cabecalhos["Authorization"] = f"Bearer {self.token}"
+        corpo = json.dumps(dados).encode("utf-8") if dados is not None else None
+        return urllib.request.Request(self.url_base + caminho, data=corpo, headers=cabecalhos, method=metodo)
+
+    def chamar(self, metodo, caminho, **dados):
+        import urllib.request
+        import urllib.error
+        requisicao = self._requisicao(metodo, caminho, dados if metodo == "POST" else None)
+        try:
+            with urllib.request.urlopen(requisicao, timeout=self.timeout) as resposta:
+                return json.loads(resposta.read().decode("utf-8") or "{}")
+        except urllib.error.HTTPError as e:
+            try:
+                detalhe = json.loads(e.read().decode("utf-8")).get("erro", str(e))
+            except ValueError:
+                detalhe = str(e)
+            raise RuntimeError(detalhe) from e
+
+    def disponivel(self):
+        """Indica se há um servidor respondendo no endereço (espera pouco: a porta fechada responde na hora)."""
+        timeout = self.timeout
+        self.timeout = 0.5
+        try:
+            self.chamar("GET", "tarefas")
+            return True
+        except (OSError, RuntimeError, ValueError):
+            return False
+        finally:
+            self.timeout = timeout
+
+    def eventos(self, id_tarefa=None):
+        """Gera (evento, dados) de /eventos até a conexão terminar."""
+        import urllib.request
+        caminho = "eventos" if id_tarefa is None else f"eventos?tarefa={id_tarefa}"
+        with urllib.request.urlopen(self._requisicao("GET", caminho), timeout=INTERVALO_PING_S * 2) as resposta:
+            evento, dados = "message", []
+            for linha in resposta:
+                linha = linha.decode("utf-8").rstrip("\r\n")
+                if not linha:
+                    if dados:
+                        yield evento, json.loads("\n".join(dados))
+                    evento, dados = "message", []
+                elif linha.startswith("event:"):
+                    evento = linha[6:].strip()
+                elif linha.startswith("data:"):
+                    dados.append(linha[5:].strip())
+
+
+class TarefaRemota:
+    """Tarefa de um servidor, com a interface da TarefaSincronizacao usada pela janela da fila."""
+    def __init__(self, fila, resumo):
+        self.fila = fila
+        self.id = resumo["id"]
+        self.atualizar(resumo)
+
+    def atualizar(self, resumo):
+        self.nome_perfil = resumo["perfil"]
+        self.estado = resumo["estado"]
+        self.alerta = resumo.get("alerta")
+        self.campos = None
+        if "porcentagem" in resumo:
+            self.campos = (resumo["transferido_mib"], resumo["total_mib"], resumo["porcentagem"], resumo["velocidade"], resumo["eta"])
+
+    @property
+    def finalizada(self):
+        return self.estado in ESTADOS_FINAIS_TAREFA
+
+    def progresso(self):
+        return self.estado, self.campos
+
+    def cancelar(self):
+        try:
+            self.fila.cliente.chamar("POST", f"tarefas/{self.id}/cancelar")
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Erro ao cancelar a tarefa {self.id} no servidor: {e}")
+            sys.stdout.flush() # Forçar a saída
+
+    def pausar(self):
+        try:
+            self.fila.cliente.chamar("POST", f"tarefas/{self.id}/pausar")
+            return True
+        except (OSError, RuntimeError, ValueError):
+            return False
+
+
+class FilaRemota:
+    """
+    Fila de tarefas de um servidor, com a interface da FilaSincronizacao usada pela janela da fila:
+    uma thread acompanha /eventos e atualiza as tarefas; as ações viram chamadas à API.
+    Assim a interface acompanha (e controla) tarefas que continuam rodando depois que ela é fechada.
+    """
+    def __init__(self, cliente):
+        self.cliente = cliente
+        estado = cliente.chamar("GET", "tarefas")
+        self.max_simultaneas = estado["max_simultaneas"]
+        self._tarefas = {resumo["id"]: TarefaRemota(self, resumo) for resumo in estado["tarefas"]}
+        self._trava = threading.Lock()
+        self.aberta = True
+        threading.Thread(target=self._acompanhar, daemon=True).start()
+
+    @property
+    def tarefas(self):
+        with self._trava:
+            return [self._tarefas[id_tarefa] for id_tarefa in sorted(self._tarefas)]
+
+    def _acompanhar(self):
+        while self.aberta:
+            try:
+                for evento, dados in self.cliente.eventos():
+                    if not self.aberta:
+                        return
+                    with self._trava:
+                        if evento == "removida":
+                            self._tarefas.pop(dados["id"], None)
+                        elif evento == "tarefa" and dados["id"] in self._tarefas:
+                            self._tarefas[dados["id"]].atualizar(dados)
+                        elif evento == "tarefa":
+                            self._tarefas[dados["id"]] = TarefaRemota(self, dados)
+            except (OSError, RuntimeError, ValueError) as e:
+                print(f"Conexão com o servidor do CloudEase interrompida: {e}")
+                sys.stdout.flush() # Forçar a saída
+            time.sleep(INTERVALO_EVENTOS_S)
+
+    def fechar(self):
+        self.aberta = False
+
+    def adicionar_perfil(self, nome_perfil, is_dry_run=False):
+        resumo = self.cliente.chamar("POST", "tarefas", perfil=nome_perfil, teste=is_dry_run)
+        with self._trava:
+            self._tarefas.setdefault(resumo["id"], TarefaRemota(self, resumo))
+
+    def definir_max_simultaneas(self, valor):
+        try:
+            self.max_simultaneas = self.cliente.chamar("POST", "fila", max_simultaneas=int(valor))["max_simultaneas"]
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Erro ao alterar o limite de tarefas do servidor: {e}")
+            sys.stdout.flush() # Forçar a saída
+
+    def em_andamento(self, nome_perfil):
+        return any(t.nome_perfil == nome_perfil and not t.finalizada for t in self.tarefas)
+
+    def retomar(self, tarefa):
+        try:
+            return self.cliente.chamar("POST", f"tarefas/{tarefa.id}/retomar")
+        except (OSError, RuntimeError, ValueError):
+            return None
+
+    def remover_finalizadas(self):
+        try:
+            estado = self.cliente.chamar("DELETE", "tarefas")
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Erro ao limpar as tarefas do servidor: {e}")
+            sys.stdout.flush() # Forçar a saída
+            return
+        with self._trava:
+            self._tarefas = {resumo["id"]: TarefaRemota(self, resumo) for resumo in estado["tarefas"]}
@@ -0,0 +1,184 @@
+"""Varredura da pasta local em paralelo, cache da pré-varredura e resumo por extensão e tamanho."""
+
+import os
+import json
+import time
+import sys
+import hashlib
+from dataclasses import dataclass
+
+from cloudease.parsers import formatar_bytes
+from cloudease.comandos import LIMITE_ARQUIVO_GRANDE
+
+TRABALHADORES_VARREDURA = 8 # Threads que listam pastas da origem em paralelo (os.scandir)
+DIR_VARREDURA = "varredura" # Cache da pré-varredura (listagem de cada pasta e o mtime dela), um arquivo por origem
+VALIDADE_CACHE_VARREDURA_S = 24 * 3600 # Depois disso a pré-varredura lista todas as pastas de novo
+# Classes de tamanho do resumo da pré-varredura: (limite superior exclusivo em bytes ou None, rótulo)
+CLASSES_TAMANHO = (
+    (64 * 1024, "até 64 KiB"),
+    (1024 * 1024, "64 KiB a 1 MiB"),
+    (LIMITE_ARQUIVO_GRANDE, "1 a 64 MiB"),
+    (None, "64 MiB ou mais"),
+)
+
+
+def _listar_pasta(relativo, caminho, mtime_ns, cache):
+    """
+    Lista uma pasta da origem para escanear_origem. Retorna (relativo, {nome: (tamanho, mtime_ns)},
+    [(relativo, caminho, mtime_ns) das subpastas]). Com um cache, uma pasta cujo mtime não mudou
+    não é listada: os arquivos vêm do cache e só as subpastas são consultadas (com os.stat).
+    """
+    anterior = cache.anterior.get(relativo) if cache is not None else None
+    if anterior is not None and mtime_ns is not None and anterior["mtime_ns"] == mtime_ns:
+        arquivos = {nome: tuple(info) for nome, info in anterior["arquivos"].items()}
+        subpastas = []
+        for nome in anterior["pastas"]:
+            caminho_sub = os.path.join(caminho, nome)
+            try:
+                subpastas.append((f"{relativo}/{nome}" if relativo else nome, caminho_sub, os.stat(caminho_sub, follow_symlinks=False).st_mtime_ns))
+            except OSError:
+                continue
+        cache.registrar(relativo, mtime_ns, arquivos, anterior["pastas"], reaproveitada=True)
+        return relativo, arquivos, subpastas
+
+    arquivos = {}
+    subpastas = []
+    try:
+        iterador = os.scandir(caminho)
+    except OSError:
+        return relativo, arquivos, subpastas
+    with iterador:
+        for entrada in iterador:
+            try:
+                if entrada.is_dir(follow_symlinks=False):
+                    mtime_sub = entrada.stat(follow_symlinks=False).st_mtime_ns if cache is not None else None
+                    subpastas.append((f"{relativo}/{entrada.name}" if relativo else entrada.name, entrada.path, mtime_sub))
+                elif entrada.is_file(follow_symlinks=False):
+                    st = entrada.stat(follow_symlinks=False)
+                    arquivos[entrada.name] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                continue
+    if cache is not None and mtime_ns is not None:
+        cache.registrar(relativo, mtime_ns, arquivos, [os.path.basename(sub[1]) for sub in subpastas])
+    return relativo, arquivos, subpastas
+
+def escanear_origem(origem, trabalhadores=TRABALHADORES_VARREDURA, cache=None):
+    """
+    Percorre a pasta local com os.scandir (sem seguir links, como o rclone), listando
+    até 'trabalhadores' pastas em paralelo. Retorna {caminho_relativo_com_barras: (tamanho, mtime_ns)}.
+    Com um CacheVarredura, pastas cujo mtime não mudou são reaproveitadas sem listar; o mtime da
+    pasta não muda quando um arquivo é editado no lugar, então o resultado com cache é aproximado.
+    """
+    arquivos = {}
+    mtime_raiz = None
+    if cache is not None:
+        try:
+            mtime_raiz = os.stat(origem).st_mtime_ns
+        except OSError:
+            return arquivos
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    with ThreadPoolExecutor(max_workers=max(1, trabalhadores)) as executor:
+        pendentes = {executor.submit(_listar_pasta, "", origem, mtime_raiz, cache)}
+        while pendentes:
+            concluidas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidas:
+                relativo, entradas, subpastas = futuro.result()
+                for nome, info in entradas.items():
+                    arquivos[f"{relativo}/{nome}" if relativo else nome] = info
+                for subpasta in subpastas:
+                    pendentes.add(executor.submit(_listar_pasta, *subpasta, cache))
+    return arquivos
+
+class CacheVarredura:
+    """
+    Cache da pré-varredura de uma origem: para cada pasta, o mtime dela, os arquivos
+    (tamanho, mtime) e os nomes das subpastas. Criar, apagar ou renomear uma entrada muda o
+    mtime da pasta, que então é listada de novo; as demais são reaproveitadas. A cada
+    VALIDADE_CACHE_VARREDURA_S a origem é listada por inteiro, para corrigir edições no lugar.
+    """
+    def __init__(self, origem, diretorio=DIR_VARREDURA):
+        nome = hashlib.sha1(origem.encode("utf-8")).hexdigest()[:16] + ".json"
+        self.arquivo = os.path.join(diretorio, nome)
+        self.origem = origem
+        self.anterior = {}
+        self.atual = {}
+        self.completa_em = time.time()
+        self.reaproveitadas = 0
+
+    def carregar(self, agora=None):
+        agora = time.time() if agora is None else agora
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if dados.get("origem") == self.origem and agora - dados.get("completa_em", 0) < VALIDADE_CACHE_VARREDURA_S:
+            self.anterior = dados.get("pastas") or {}
+            self.completa_em = dados["completa_em"]
+        return self
+
+    def registrar(self, relativo, mtime_ns, arquivos, pastas, reaproveitada=False):
+        # Cada pasta é registrada por uma única thread; pastas que sumiram não entram no cache novo
+        self.atual[relativo] = {"mtime_ns": mtime_ns, "arquivos": arquivos, "pastas": pastas}
+        if reaproveitada:
+            self.reaproveitadas += 1
+
+    def salvar(self):
+        try:
+            os.makedirs(os.path.dirname(self.arquivo), exist_ok=True)
+            temporario = self.arquivo + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({"origem": self.origem, "completa_em": self.completa_em, "pastas": self.atual}, f, ensure_ascii=False)
+            os.replace(temporario, self.arquivo)
+        except OSError as e:
+            print(f"Erro ao gravar o cache da pré-varredura: {e}")
+            sys.stdout.flush()
+
+def classe_tamanho(tamanho):
+    for limite, rotulo in CLASSES_TAMANHO:
+        if limite is None or tamanho < limite:
+            return rotulo
+
+@dataclass
+class ResumoVarredura:
+    """Totais da pré-varredura: arquivos e bytes no total, por extensão e por classe de tamanho."""
+    arquivos: int = 0
+    bytes: int = 0
+    por_extensao: dict = None # extensão -> [arquivos, bytes]
+    por_classe: dict = None # rótulo de CLASSES_TAMANHO -> [arquivos, bytes]
+
+    @classmethod
+    def de_arquivos(cls, arquivos, caminhos=None):
+        """Resume 'arquivos' (de escanear_origem), ou só os 'caminhos' indicados que existirem nele."""
+        resumo = cls(por_extensao={}, por_classe={rotulo: [0, 0] for _, rotulo in CLASSES_TAMANHO})
+        itens = arquivos.items() if caminhos is None else ((c, arquivos[c]) for c in caminhos if c in arquivos)
+        for caminho, (tamanho, _) in itens:
+            resumo.arquivos += 1
+            resumo.bytes += tamanho
+            extensao = os.path.splitext(caminho)[1].lower() or "(sem extensão)"
+            contagem = resumo.por_extensao.setdefault(extensao, [0, 0])
+            contagem[0] += 1
+            contagem[1] += tamanho
+            contagem = resumo.por_classe[classe_tamanho(tamanho)]
+            contagem[0] += 1
+            contagem[1] += tamanho
+        return resumo
+
+    def linhas_log(self, max_extensoes=10):
+        linhas = [f"Pré-varredura: {self.arquivos} arquivo(s), {formatar_bytes(self.bytes)}\n"]
+        for rotulo, (quantidade, total) in self.por_classe.items():
+            if quantidade:
+                linhas.append(f"  {rotulo}: {quantidade} arquivo(s), {formatar_bytes(total)}\n")
+        extensoes = sorted(self.por_extensao.items(), key=lambda item: item[1][1], reverse=True)
+        for extensao, (quantidade, total) in extensoes[:max_extensoes]:
+            linhas.append(f"  {extensao}: {quantidade} arquivo(s), {formatar_bytes(total)}\n")
+        if len(extensoes) > max_extensoes:
+            linhas.append(f"  ... e mais {len(extensoes) - max_extensoes} extensão(ões)\n")
+        return linhas
+
+def pre_varrer_origem(origem, trabalhadores=TRABALHADORES_VARREDURA):
+    """Pré-varredura com o cache da origem. Retorna (arquivos, pastas reaproveitadas do cache) e atualiza o cache."""
+    cache = CacheVarredura(origem).carregar()
+    arquivos = escanear_origem(origem, trabalhadores, cache)
+    cache.salvar()
+    return arquivos, cache.reaproveitadas
@@ -0,0 +1,116 @@
+"""Vigia de travamento: detecta execuções do rclone sem progresso e reage em etapas (aviso, reinício com menos concorrência)."""
+
+import threading
+import time
+
+JANELA_TRAVAMENTO_S = 300 # Tempo sem progresso, com trabalho pendente, até cada etapa do vigia (perfil: "janela_travamento_s"; 0 desliga)
+INTERVALO_VIGIA_S = 5.0 # Intervalo entre as verificações do vigia
+MAX_REINICIOS_TRAVAMENTO = 2 # Reinícios automáticos por execução; depois disso o vigia só avisa
+# Uma etapa a mais a cada janela sem progresso. O rclone só lê --transfers/--checkers ao iniciar
+# (options/set não muda uma cópia em andamento): a concorrência é reduzida no reinício.
+ETAPAS_TRAVAMENTO = ("aviso", "reiniciar")
+
+
+def janela_do_perfil(perfil):
+    """Janela de travamento (s) configurada no perfil, ou JANELA_TRAVAMENTO_S; 0 desliga o vigia."""
+    try:
+        return max(0, int((perfil or {}).get("janela_travamento_s", JANELA_TRAVAMENTO_S)))
+    except (TypeError, ValueError):
+        return JANELA_TRAVAMENTO_S
+
+
+def ajustes_reduzidos(ajustes):
+    """Metade das transferências e verificações em paralelo (mínimo 1) para o reinício; o chunk não muda."""
+    novos = dict(ajustes)
+    novos["transfers"] = max(1, ajustes["transfers"] // 2)
+    novos["checkers"] = max(1, ajustes["checkers"] // 2)
+    return novos
+
+
+class VigiaTravamento:
+    """
+    Acompanha as estatísticas de uma execução e aponta quando ela para de progredir.
+    Há progresso quando os bytes, as transferências ou as verificações aumentam; há trabalho
+    pendente quando faltam bytes (bytes < total) depois que o rclone já encontrou o que transferir.
+    A listagem e a comparação iniciais não enviam bytes (numa árvore grande levam muito tempo):
+    até a primeira transferência encontrada ou o primeiro byte, o vigia não conta.
+    A cada 'janela_s' segundos seguidos sem progresso e com trabalho pendente, verificar()
+    devolve a próxima etapa de 'etapas' (uma vez cada); progresso novo volta à primeira.
+    """
+    def __init__(self, janela_s=JANELA_TRAVAMENTO_S, etapas=ETAPAS_TRAVAMENTO, relogio=time.monotonic):
+        self.janela_s = janela_s
+        self.etapas = tuple(etapas)
+        self.relogio = relogio
+        self.etapa = 0 # Quantas etapas já foram devolvidas desde o último progresso
+        self.reiniciar = False # Marcado por quem reage à etapa "reiniciar" antes de interromper o rclone
+        self._marca = None # (bytes, transferências, verificações) da última estatística
+        self._pendente = False # Desarmado até a primeira estatística com trabalho a transferir
+        self._ultimo_progresso = relogio()
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+
+    def registrar(self, estatisticas):
+        """
+        Registra uma estatística (EstatisticasRclone). Retorna True quando ela encerra um
+        travamento já sinalizado (para quem reagiu avisar que o progresso voltou).
+        """
+        marca = (estatisticas.bytes, estatisticas.transferencias, estatisticas.verificacoes)
+        with self._trava:
+            armado = estatisticas.bytes > 0 or estatisticas.total_transferencias > 0 or estatisticas.total_bytes > 0
+            self._pendente = armado and (estatisticas.total_bytes == 0 or estatisticas.bytes < estatisticas.total_bytes)
+            if marca == self._marca:
+                return False
+            self._marca = marca
+            self._ultimo_progresso = self.relogio()
+            retomou = self.etapa > 0
+            self.etapa = 0
+            return retomou
+
+    def parado_ha(self):
+        """Segundos desde o último progresso."""
+        with self._trava:
+            return self.relogio() - self._ultimo_progresso
+
+    def verificar(self):
+        """Retorna a etapa a aplicar agora (uma de 'etapas') ou None."""
+        with self._trava:
+            agora = self.relogio()
+            if not self._pendente:
+                # Listando, ou nada a transferir (ex: exclusões finais do sync): a contagem recomeça daqui
+                self._ultimo_progresso = agora
+                return None
+            if not self.janela_s or self.etapa >= len(self.etapas):
+                return None
+            if agora - self._ultimo_progresso < self.janela_s * (self.etapa + 1):
+                return None
+            self.etapa += 1
+            return self.etapas[self.etapa - 1]
+
+    def acompanhar(self, processo, ao_travar):
+        """
+        Verifica a execução a cada INTERVALO_VIGIA_S enquanto 'processo' roda, chamando
+        ao_travar(etapa, segundos parado) na thread do vigia. Retorna a thread iniciada.
+        """
+        def vigiar():
+            while not self._parar.wait(INTERVALO_VIGIA_S) and processo.poll() is None:
+                etapa = self.verificar()
+                if etapa is not None:
+                    ao_travar(etapa, self.parado_ha())
+
+        thread = threading.Thread(target=vigiar, daemon=True)
+        thread.start()
+        return thread
+
+    def parar(self):
+        self._parar.set()
+
+
+def descrever_travamento(etapa, parado_s, ajustes=None):
+    """Mensagem de uma etapa do vigia para a linha de status e o log."""
+    parado = f"{int(parado_s // 60)}m {int(parado_s % 60)}s"
+    if etapa == "reiniciar" and ajustes:
+        return (f"Sem progresso há {parado}: reiniciando a partir do que já foi enviado, "
+                f"com --transfers={ajustes['transfers']} --checkers={ajustes['checkers']}")
+    if etapa == "reiniciar":
+        return f"Sem progresso há {parado}: reiniciando a partir do que já foi enviado"
+    return f"Sem progresso há {parado} com transferências pendentes"
@@ -0,0 +1,46 @@
+"""Passadas por tamanho: no sync, as exclusões sem uma terceira passada completa."""
+import os
+
+from cloudease.comandos import LIMITE_ARQUIVO_GRANDE, etapas_por_tamanho
+
+ORIGEM, DESTINO = "/dados", "onedrive:Backup"
+
+
+def subcomandos(etapas):
+    return [[comando[1] for comando in etapa] for etapa in etapas]
+
+
+def test_copy_so_as_duas_passadas():
+    etapas, temporarios = etapas_por_tamanho("copy", ORIGEM, DESTINO, [])
+    assert subcomandos(etapas) == [["copy", "copy"]]
+    assert temporarios == []
+    pequenos, grandes = etapas[0]
+    assert f"--max-size={LIMITE_ARQUIVO_GRANDE - 1}B" in pequenos
+    assert f"--min-size={LIMITE_ARQUIVO_GRANDE}B" in grandes
+
+
+def test_sync_sem_manifesto_faz_a_passada_completa():
+    etapas, _ = etapas_por_tamanho("sync", ORIGEM, DESTINO, [])
+    assert subcomandos(etapas) == [["copy", "copy"], ["sync"]]
+
+
+def test_sync_sem_remocoes_nao_percorre_de_novo():
+    etapas, temporarios = etapas_por_tamanho("sync", ORIGEM, DESTINO, [], exclusoes=[])
+    assert subcomandos(etapas) == [["copy", "copy"]]
+    assert temporarios == []
+
+
+def test_sync_apaga_so_as_remocoes():
+    etapas, temporarios = etapas_por_tamanho("sync", ORIGEM, DESTINO, [], is_dry_run=True, exclusoes=["a.txt", "pasta/b.txt"])
+    try:
+        assert subcomandos(etapas) == [["copy", "copy"], ["delete"]]
+        (exclusao,) = etapas[1]
+        assert exclusao[:3] == ["rclone", "delete", DESTINO]
+        assert "--dry-run" in exclusao
+        arquivo = exclusao[exclusao.index("--files-from") + 1]
+        assert temporarios == [arquivo]
+        with open(arquivo, encoding="utf-8") as f:
+            assert f.read().split() == ["a.txt", "pasta/b.txt"]
+    finally:
+        for arquivo in temporarios:
+            os.remove(arquivo)
@@ -0,0 +1,167 @@
+"""EstimadorEta: média exponencial, aquecimento, conversão de ETA e reprodução do corpus log_*.txt."""
+import glob
+import os
+import statistics
+import sys
+
+import pytest
+
+from cloudease.estimativa import OBSERVACAO_MIN_S, EstimadorEta, _MediaExponencial
+from cloudease.parsers import EstatisticasRclone, eta_para_segundos, segundos_para_eta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# A reprodução dos logs é a mesma do benchmark (benchmarks/bench_eta.py)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+import bench_eta  # noqa: E402
+
+MIB = 1024 * 1024
+RESTANTE_MIN_S = 30
+
+
+def amostra(enviados, total=100 * MIB, transferencias=0, total_transferencias=0):
+    return EstatisticasRclone(bytes=enviados, total_bytes=total, transferencias=transferencias, total_transferencias=total_transferencias)
+
+
+def test_media_sem_prior_comeca_pela_primeira_taxa():
+    media = _MediaExponencial(60)
+    assert media.valor is None
+    media.registrar(10, 1)
+    assert media.valor == pytest.approx(10)
+    media.registrar(10, 30)
+    assert media.valor == pytest.approx(10)
+
+
+def test_media_pesa_pela_meia_vida():
+    media = _MediaExponencial(60)
+    media.registrar(10, 6000) # Peso acumulado ~1: a taxa antiga já domina
+    media.registrar(20, 60)
+    assert media.valor == pytest.approx(15)
+    # Intervalos menores com a mesma duração total dão o mesmo resultado
+    fracionada = _MediaExponencial(60)
+    fracionada.registrar(10, 6000)
+    for _ in range(12):
+        fracionada.registrar(20, 5)
+    assert fracionada.valor == pytest.approx(media.valor)
+
+
+def test_media_com_prior_perde_peso():
+    media = _MediaExponencial(60, prior=40, peso_prior_s=60)
+    assert media.valor == pytest.approx(40)
+    media.registrar(10, 60)
+    # Prior com peso 0,5 decai para 0,25; a nova taxa entra com 0,5
+    assert media.valor == pytest.approx((40 * 0.25 + 10 * 0.5) / 0.75)
+    media.registrar(10, 6000)
+    assert media.valor == pytest.approx(10)
+
+
+def test_estimador_sem_historico_espera_o_aquecimento():
+    estimador = EstimadorEta()
+    # Listagem: sem bytes o tempo não conta
+    assert estimador.registrar(amostra(0), agora=0) is None
+    assert estimador.registrar(amostra(0), agora=100) is None
+    assert estimador.registrar(amostra(MIB), agora=101) is None
+    assert estimador.observado_s == 0
+    agora, enviados = 101, MIB
+    while agora - 101 < OBSERVACAO_MIN_S:
+        assert estimador.eta(amostra(enviados)) is None
+        agora += 5
+        enviados += 5 * MIB
+        eta = estimador.registrar(amostra(enviados), agora=agora)
+    # 1 MiB/s constante: o ETA é o que falta em segundos
+    assert eta == 100 - enviados // MIB
+    assert estimador.arquivos_por_s() == 0
+
+
+def test_estimador_com_historico_estima_desde_o_inicio():
+    estimador = EstimadorEta(vazao_historica=2 * MIB)
+    assert estimador.registrar(amostra(0), agora=0) == 50
+    # A vazão observada (0,5 MiB/s) vai substituindo a histórica
+    for agora in range(10, 1510, 10):
+        eta = estimador.registrar(amostra(agora * MIB // 2, total=1000 * MIB), agora=agora)
+    assert eta == pytest.approx(250 * MIB / (MIB / 2), rel=0.1)
+
+
+def test_estimador_limitado_pelos_arquivos_e_fim():
+    estimador = EstimadorEta()
+    estimador.registrar(amostra(MIB, transferencias=1, total_transferencias=1000), agora=0)
+    for i in range(1, 7):
+        # 1 MiB/s mas só 1 arquivo/s: faltam poucos bytes e muitos arquivos
+        eta = estimador.registrar(amostra((1 + 5 * i) * MIB, transferencias=1 + 5 * i, total_transferencias=1000), agora=5 * i)
+    assert eta == 1000 - 31
+    assert estimador.arquivos_por_s() == pytest.approx(1)
+    assert estimador.registrar(amostra(100 * MIB, transferencias=1000, total_transferencias=1000), agora=40) == 0
+
+
+@pytest.mark.parametrize("segundos", [0, 1, 59, 60, 61, 3599, 3600, 3723, 86399, 236580, 360000])
+def test_eta_ida_e_volta(segundos):
+    texto = segundos_para_eta(segundos)
+    assert eta_para_segundos(texto) == segundos
+
+
+def test_eta_formatos_do_rclone():
+    assert eta_para_segundos("2d17h43m") == 236580
+    assert eta_para_segundos("1h2m3s") == 3723
+    assert segundos_para_eta(3723) == "1h2m3s"
+    assert segundos_para_eta(45) == "45s"
+    assert eta_para_segundos("-") is None and eta_para_segundos("") is None
+    assert segundos_para_eta(None) == "-"
+
+
+def execucoes_do_corpus():
+    """{nome do log: (amostras, fim, vazão média)} dos logs com transferência suficiente para avaliar."""
+    execucoes = {}
+    for arquivo in sorted(glob.glob(os.path.join(RAIZ, "log_*.txt"))):
+        amostras = bench_eta.carregar_amostras(arquivo)
+        limites = bench_eta.fim_das_transferencias(amostras) if amostras is not None else None
+        if limites is None:
+            continue
+        primeiro, fim = limites
+        execucoes[os.path.basename(arquivo)] = (amostras, fim, amostras[-1][1].bytes / (fim - primeiro))
+    return execucoes
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    execucoes = execucoes_do_corpus()
+    if not execucoes:
+        pytest.skip("nenhum log_*.txt com transferência suficiente")
+    series = {}
+    for nome, (amostras, fim, _) in execucoes.items():
+        outras = [v for n, (_, _, v) in execucoes.items() if n != nome]
+        serie = bench_eta.reproduzir(amostras, fim, RESTANTE_MIN_S)
+        serie["estimador + histórico"] = bench_eta.reproduzir(amostras, fim, RESTANTE_MIN_S, statistics.mean(outras) if outras else None)["estimador"]
+        series[nome] = serie
+    return series
+
+
+def test_corpus_ignora_teste_e_logs_curtos():
+    assert bench_eta.carregar_amostras(os.path.join(RAIZ, "log_2025-07-07_19h05.txt")) is None
+    assert set(execucoes_do_corpus()) == {"log_2025-07-07_18h36.txt", "log_2025-07-07_20h32.txt", "log_2025-07-09_21h14.txt"}
+
+
+def test_corpus_estimador_melhor_que_o_rclone_em_cada_log(corpus):
+    for nome, serie in corpus.items():
+        erro_rclone, _, oscilacao_rclone, _ = bench_eta.metricas(serie["rclone"])
+        erro, _, oscilacao, cobertura = bench_eta.metricas(serie["estimador"])
+        assert erro < erro_rclone, nome
+        assert oscilacao < oscilacao_rclone, nome
+        assert cobertura > 0.8, nome
+        erro_historico, p90_historico, _, cobertura_historico = bench_eta.metricas(serie["estimador + histórico"])
+        # 0,45 = erro típico abaixo de ~57% para mais ou para menos; o histórico cobre desde o primeiro byte
+        assert erro_historico < 0.45, nome
+        assert p90_historico < 1.0, nome
+        assert cobertura_historico == 1.0, nome
+
+
+def test_corpus_limites_de_erro(corpus):
+    todas = {"rclone": [], "estimador": [], "estimador + histórico": []}
+    for serie in corpus.values():
+        for nome in todas:
+            todas[nome].extend(serie[nome])
+    erro_rclone, p90_rclone, _, _ = bench_eta.metricas(todas["rclone"])
+    erro, p90, oscilacao, _ = bench_eta.metricas(todas["estimador"])
+    erro_historico, p90_historico, oscilacao_historico, _ = bench_eta.metricas(todas["estimador + histórico"])
+    assert erro < 0.5 and p90 < 1.5 and oscilacao < 0.005
+    assert erro_historico < 0.35 and p90_historico < 1.0 and oscilacao_historico < 0.005
+    assert erro_historico < erro < erro_rclone
+    assert p90_historico < p90 < p90_rclone
@@ -0,0 +1,133 @@
+"""FilaSincronizacao: identificação das tarefas enquanto a lista muda, pausa e retomada."""
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from cloudease.execucao import ESTADOS_FINAIS_TAREFA, FilaSincronizacao, TarefaSincronizacao
+
+
+class TarefaFalsa:
+    """Tarefa que fica em execução até 'liberar' ser sinalizado e termina no estado pedido."""
+    def __init__(self, nome_perfil, estado_final="concluída"):
+        self.nome_perfil = nome_perfil
+        self.estado_final = estado_final
+        self.id = None
+        self.estado = "na fila"
+        self.liberar = threading.Event()
+        self.terminou = threading.Event()
+
+    @property
+    def finalizada(self):
+        return self.estado in ESTADOS_FINAIS_TAREFA
+
+    def executar(self):
+        self.estado = "em execução"
+        self.liberar.wait(5)
+        self.estado = self.estado_final
+        self.terminou.set()
+
+    def cancelar(self):
+        self.liberar.set()
+
+    def nova_execucao(self):
+        return TarefaFalsa(self.nome_perfil)
+
+
+def concluir(*tarefas):
+    for tarefa in tarefas:
+        tarefa.liberar.set()
+        assert tarefa.terminou.wait(5)
+
+
+def test_ids_nao_mudam_ao_remover_finalizadas():
+    fila = FilaSincronizacao(max_simultaneas=3)
+    a, b, c = TarefaFalsa("a"), TarefaFalsa("b"), TarefaFalsa("c")
+    for tarefa in (a, b, c):
+        fila.adicionar(tarefa)
+    assert [t.id for t in fila.tarefas] == [1, 2, 3]
+
+    concluir(a)
+    fila.remover_finalizadas()
+    assert fila.tarefas == [b, c]
+    assert [t.id for t in fila.tarefas] == [2, 3]
+
+    d = TarefaFalsa("d")
+    fila.adicionar(d)
+    assert d.id == 4 # Não reaproveita o número de uma tarefa removida
+    concluir(b, c, d)
+
+
+def test_retomada_mantem_o_id():
+    fila = FilaSincronizacao(max_simultaneas=2)
+    a, b = TarefaFalsa("a", estado_final="pausada"), TarefaFalsa("b")
+    fila.adicionar(a)
+    fila.adicionar(b)
+    concluir(a)
+
+    nova = fila.retomar(a)
+    assert nova is not None and nova is not a
+    assert nova.id == a.id == 1
+    assert fila.tarefas == [nova, b]
+    concluir(nova, b)
+
+
+# Primeira chamada: envia a.txt e fica parada até ser interrompida. Depois: grava a lista do --files-from e termina.
+RCLONE_PAUSA = """#!/bin/sh
+case "$1" in
+version) echo "rclone v1.66.0"; exit 0;;
+esac
+if [ ! -e primeira_chamada ]; then
+  touch primeira_chamada
+  echo '{"level":"info","msg":"Copied (new)","object":"a.txt"}' >&2
+  exec sleep 30
+fi
+lista=""
+anterior=""
+for argumento in "$@"; do
+  [ "$anterior" = "--files-from" ] && lista="$argumento"
+  case "$argumento" in --files-from=*) lista="${argumento#--files-from=}";; esac
+  anterior="$argumento"
+done
+if [ -n "$lista" ]; then cat "$lista" > retomada_enviados.txt; else echo "(origem inteira)" > retomada_enviados.txt; fi
+exit 0
+"""
+
+
+def esperar(condicao, limite_s=10):
+    fim = time.time() + limite_s
+    while not condicao():
+        assert time.time() < fim, "tempo esgotado"
+        time.sleep(0.05)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="rclone falso em shell script")
+def test_pausar_e_retomar_continua_pelo_diario(tmp_path, monkeypatch):
+    origem = tmp_path / "origem"
+    origem.mkdir()
+    for nome in ("a.txt", "b.txt", "c.txt"):
+        (origem / nome).write_bytes(b"x" * 100)
+    pasta_bin = tmp_path / "bin"
+    pasta_bin.mkdir()
+    rclone = pasta_bin / "rclone"
+    rclone.write_text(RCLONE_PAUSA)
+    rclone.chmod(rclone.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{pasta_bin}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.chdir(tmp_path)
+
+    fila = FilaSincronizacao()
+    tarefa = TarefaSincronizacao("p", {"origem": str(origem), "destino": "Backup", "modo": "copy"})
+    fila.adicionar(tarefa)
+    esperar(lambda: os.path.exists("primeira_chamada") and tarefa.estado == "em execução")
+    time.sleep(0.3) # A linha do a.txt chega ao diário
+    assert tarefa.pausar()
+    esperar(lambda: tarefa.estado == "pausada")
+
+    nova = fila.retomar(tarefa)
+    assert nova is not None and nova.retomar
+    esperar(lambda: nova.finalizada)
+    assert nova.estado == "concluída"
+    with open("retomada_enviados.txt", encoding="utf-8") as f:
+        assert f.read().split() == ["b.txt", "c.txt"]
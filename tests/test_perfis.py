@@ -0,0 +1,163 @@
+"""Ajuste automático de transfers/checkers/chunk por perfil."""
+import json
+import os
+import stat
+
+import pytest
+
+from cloudease import cli
+from cloudease.perfis import (
+    AJUSTES_PADRAO, BYTES_MIN_AMOSTRA_VAZAO, MEMORIA_MAX_CHUNKS_MIB, AmostradorVazao, ajustes_vizinhos,
+    carregar_json, escolher_ajustes, registrar_ajuste, registrar_execucao_arquivo, registrar_execucao_perfil, sugerir_ajustes,
+)
+
+MIB = 1024 * 1024
+
+
+def ajuste(transfers, checkers, chunk_size):
+    return {"transfers": transfers, "checkers": checkers, "chunk_size": chunk_size}
+
+
+def cabe_na_memoria(ajustes):
+    return ajustes["transfers"] * int(ajustes["chunk_size"][:-1]) <= MEMORIA_MAX_CHUNKS_MIB
+
+
+def test_sugerir_ajustes_pela_mediana_dos_tamanhos():
+    assert sugerir_ajustes({}) == AJUSTES_PADRAO
+    assert sugerir_ajustes({f"p{i}": (1024, 0) for i in range(10)}) == ajuste(32, 32, "10M")
+    assert sugerir_ajustes({f"m{i}": (8 * MIB, 0) for i in range(10)}) == ajuste(16, 16, "20M")
+    assert sugerir_ajustes({f"g{i}": (512 * MIB, 0) for i in range(10)}) == ajuste(8, 16, "80M")
+
+
+def test_vizinhos_no_meio():
+    assert ajustes_vizinhos(ajuste(8, 4, "20M")) == [
+        ajuste(16, 16, "20M"), # O dobro das transferências leva as verificações junto
+        ajuste(4, 4, "20M"),
+        ajuste(8, 4, "40M"),
+        ajuste(8, 4, "10M"),
+    ]
+
+
+def test_vizinhos_no_limite_de_transferencias_e_de_memoria():
+    # 64 transferências: não dobra; o chunk maior não cabe na memória e volta ao próprio ajuste
+    assert ajustes_vizinhos(ajuste(64, 64, "10M")) == [ajuste(32, 64, "10M")]
+
+
+def test_vizinhos_no_minimo_de_transferencias_e_maior_chunk():
+    # 2 transferências: não divide; 160M é o maior chunk aceito
+    assert ajustes_vizinhos(ajuste(2, 4, "160M")) == [ajuste(4, 4, "160M"), ajuste(2, 4, "80M")]
+
+
+def test_vizinhos_respeitam_a_memoria():
+    for transfers in (2, 4, 8, 16, 32, 64):
+        for chunk_size in ("10M", "20M", "40M", "80M", "160M"):
+            atual = ajuste(transfers, 16, chunk_size)
+            if not cabe_na_memoria(atual):
+                continue
+            vizinhos = ajustes_vizinhos(atual)
+            assert vizinhos and atual not in vizinhos
+            assert all(cabe_na_memoria(v) for v in vizinhos)
+
+
+def test_registrar_ajuste_guarda_o_melhor():
+    perfil = {}
+    registrar_ajuste(perfil, ajuste(16, 16, "20M"), 10 * MIB)
+    registrar_ajuste(perfil, ajuste(32, 32, "20M"), 5 * MIB) # Pior: não substitui
+    assert perfil["ajuste"]["melhor"] == dict(ajuste(16, 16, "20M"), vazao=10 * MIB)
+    registrar_ajuste(perfil, ajuste(8, 16, "20M"), 12 * MIB)
+    assert perfil["ajuste"]["melhor"] == dict(ajuste(8, 16, "20M"), vazao=12 * MIB)
+    # O mesmo ajuste de novo: média com a vazão anterior
+    registrar_ajuste(perfil, ajuste(8, 16, "20M"), 6 * MIB)
+    assert perfil["ajuste"]["melhor"]["vazao"] == 9 * MIB
+    assert perfil["ajuste"]["execucoes"] == 4
+
+
+def test_execucao_sem_vazao_nao_muda_o_melhor():
+    perfil = {}
+    registrar_ajuste(perfil, ajuste(16, 16, "20M"), 10 * MIB)
+    registrar_ajuste(perfil, ajuste(64, 64, "10M"), None) # Transferiu pouco para avaliar
+    assert perfil["ajuste"]["melhor"] == dict(ajuste(16, 16, "20M"), vazao=10 * MIB)
+
+
+def test_amostra_pequena_nao_tem_vazao():
+    amostrador = AmostradorVazao()
+    amostrador.registrar(1, agora=0)
+    amostrador.registrar(BYTES_MIN_AMOSTRA_VAZAO - 1, agora=10)
+    assert amostrador.vazao() is None
+    amostrador.registrar(BYTES_MIN_AMOSTRA_VAZAO, agora=11)
+    assert amostrador.vazao() == pytest.approx((BYTES_MIN_AMOSTRA_VAZAO - 1) / 11)
+
+
+def test_escolher_alterna_entre_o_melhor_e_os_vizinhos(tmp_path):
+    arquivo = str(tmp_path / "perfis.json")
+    with open(arquivo, "w", encoding="utf-8") as f:
+        json.dump({"p": {"ajuste_automatico": True}}, f)
+    melhor = ajuste(8, 4, "20M")
+    registrar_execucao_arquivo(arquivo, "p", "2024-01-01T10:00:00", True, melhor, 10 * MIB)
+    registrar_execucao_arquivo(arquivo, "p", "2024-01-02T10:00:00", True, ajuste(16, 16, "20M"), 4 * MIB)
+    perfil = carregar_json(arquivo)["p"]
+    assert perfil["ajuste"] == {"execucoes": 2, "melhor": dict(melhor, vazao=10 * MIB)}
+    assert perfil["ultima_sincronizacao"] == "2024-01-02T10:00:00"
+
+    # Execuções pares usam o melhor; as ímpares testam cada vizinho por vez
+    vizinhos = ajustes_vizinhos(melhor)
+    escolhas = []
+    for execucoes in range(2, 2 + 2 * len(vizinhos)):
+        perfil["ajuste"]["execucoes"] = execucoes
+        escolhas.append(escolher_ajustes(perfil, {}))
+    assert escolhas[0::2] == [melhor] * len(vizinhos)
+    assert sorted(map(str, escolhas[1::2])) == sorted(map(str, vizinhos))
+
+
+def test_perfil_removido_nao_registra():
+    perfis = {"outro": {}}
+    assert not registrar_execucao_perfil(perfis, "p", "2024-01-01T10:00:00", True, ajuste(16, 16, "20M"), 10 * MIB)
+    assert perfis == {"outro": {}}
+
+
+RCLONE_FALSO = """#!/bin/sh
+case "$1" in
+version) echo "rclone v1.66.0"; exit 0;;
+copy|sync)
+  for p in 20 40 60 80 100; do
+    echo "2024/01/01 10:00:00 NOTICE: Transferred:   	    $p.0 MiB / 100.0 MiB, $p%, 50.0 MiB/s, ETA 1s" >&2
+    sleep 0.05
+  done
+  exit {codigo};;
+esac
+"""
+
+
+@pytest.fixture
+def ambiente(tmp_path, monkeypatch):
+    """Pasta de trabalho com uma origem, um perfil com ajuste automático e um rclone falso no PATH."""
+    origem = tmp_path / "origem"
+    origem.mkdir()
+    (origem / "a.bin").write_bytes(b"x" * 1024)
+    arquivo = tmp_path / "perfis.json"
+    arquivo.write_text(json.dumps({"p": {"origem": str(origem), "destino": "Backup", "modo": "copy", "ajuste_automatico": True}}), encoding="utf-8")
+    pasta_bin = tmp_path / "bin"
+    pasta_bin.mkdir()
+    monkeypatch.setenv("PATH", f"{pasta_bin}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.chdir(tmp_path)
+
+    def executar(codigo):
+        rclone = pasta_bin / "rclone"
+        rclone.write_text(RCLONE_FALSO.replace("{codigo}", str(codigo)))
+        rclone.chmod(rclone.stat().st_mode | stat.S_IEXEC)
+        retorno = cli.main(["--perfis", str(arquivo), "run", "p"])
+        return retorno, carregar_json(str(arquivo))["p"]
+
+    return executar
+
+
+@pytest.mark.skipif(os.name != "posix", reason="rclone falso em shell script")
+def test_execucao_que_falhou_nao_entra_no_ajuste(ambiente):
+    retorno, perfil = ambiente(1)
+    assert retorno != 0
+    assert "ajuste" not in perfil and "ultima_sincronizacao" not in perfil
+
+    retorno, perfil = ambiente(0)
+    assert retorno == 0
+    assert perfil["ajuste"]["execucoes"] == 1
+    assert perfil["ajuste"]["melhor"]["vazao"] > 0
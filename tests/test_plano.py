@@ -0,0 +1,90 @@
+"""Planejamento da execução: manifesto local, --files-from e ajuste automático."""
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from cloudease.plano import ManifestoLocal, planejar_execucao
+from cloudease.varredura import escanear_origem
+
+DESTINO = "onedrive:Backup"
+
+
+@pytest.fixture
+def origem(tmp_path, monkeypatch):
+    """Origem com três arquivos, já sincronizada uma vez (manifesto gravado), e um deles alterado depois."""
+    monkeypatch.chdir(tmp_path) # manifestos.db fica na pasta de trabalho
+    pasta = tmp_path / "origem"
+    pasta.mkdir()
+    for nome in ("a.txt", "b.txt", "c.txt"):
+        (pasta / nome).write_bytes(b"x" * 100)
+    ManifestoLocal().salvar(ManifestoLocal.chave(str(pasta), DESTINO), escanear_origem(str(pasta)))
+    (pasta / "b.txt").write_bytes(b"y" * 2000)
+    return str(pasta)
+
+
+def test_manifesto_envia_so_os_alterados(origem):
+    plano = planejar_execucao(origem, DESTINO, "copy", {}, io.StringIO())
+    try:
+        assert plano.planejados(plano.arquivos_atuais) == ["b.txt"]
+        assert plano.ajustes is None # Sem o ajuste automático: AJUSTES_PADRAO
+    finally:
+        plano.limpar()
+
+
+def test_manifesto_com_ajuste_automatico(origem):
+    melhor = {"transfers": 8, "checkers": 4, "chunk_size": "20M"}
+    perfil = {"ajuste_automatico": True, "ajuste": {"execucoes": 2, "melhor": dict(melhor, vazao=1000)}}
+    log = io.StringIO()
+    plano = planejar_execucao(origem, DESTINO, "copy", perfil, log)
+    try:
+        assert plano.arquivo_files_from is not None
+        assert plano.ajustes == melhor
+        assert "Ajuste automático: --transfers=8" in log.getvalue()
+    finally:
+        plano.limpar()
+
+
+def test_manifesto_sem_historico_sugere_pelos_alterados(origem):
+    plano = planejar_execucao(origem, DESTINO, "copy", {"ajuste_automatico": True}, io.StringIO())
+    try:
+        assert plano.arquivo_files_from is not None
+        # Só arquivos pequenos mudaram: mais transferências em paralelo
+        assert plano.ajustes == {"transfers": 32, "checkers": 32, "chunk_size": "10M"}
+    finally:
+        plano.limpar()
+
+
+def test_lista_explicita_so_com_files_from(origem):
+    plano = planejar_execucao(origem, DESTINO, "copy", {}, io.StringIO())
+    try:
+        assert plano.lista_explicita() == ["b.txt"]
+    finally:
+        plano.limpar()
+    # Sem manifesto: o rclone compara a origem inteira e só ele sabe quanto vai enviar
+    completa = planejar_execucao(origem, "onedrive:Outro", "copy", {}, io.StringIO())
+    assert completa.arquivo_files_from is None
+    assert completa.lista_explicita() is None
+    assert len(completa.planejados(completa.arquivos_atuais)) == 3
+
+
+def test_sync_por_tamanho_apaga_pelo_manifesto(origem):
+    os.remove(os.path.join(origem, "c.txt"))
+    perfil = {"modo": "sync", "separar_tamanhos": True, "ultima_reconciliacao": datetime.now().isoformat(timespec="seconds")}
+    plano = planejar_execucao(origem, DESTINO, "sync", perfil, io.StringIO())
+    try:
+        assert plano.exclusoes == ["c.txt"]
+        assert plano.lista_explicita() == ["b.txt"]
+        assert not plano.completa # Não conta como reconciliação
+    finally:
+        plano.limpar()
+
+
+def test_sync_por_tamanho_reconciliacao_vencida(origem):
+    os.remove(os.path.join(origem, "c.txt"))
+    antiga = (datetime.now() - timedelta(days=30)).isoformat(timespec="seconds")
+    for perfil in ({"modo": "sync", "separar_tamanhos": True, "ultima_reconciliacao": antiga}, {"modo": "sync"}):
+        plano = planejar_execucao(origem, DESTINO, "sync", perfil, io.StringIO())
+        assert plano.exclusoes is None
+        assert plano.completa # Comparação completa com a passada final de sync
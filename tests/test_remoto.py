@@ -0,0 +1,128 @@
+"""ClienteRc e a consulta de core/stats e core/transferred contra um servidor rc falso."""
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from cloudease import execucao
+from cloudease.execucao import TarefaSincronizacao
+from cloudease.remoto import ClienteRc
+
+STATS = {
+    "bytes": 3 * 1024 * 1024, "totalBytes": 4 * 1024 * 1024, "speed": 1024 * 1024, "eta": 1,
+    "transfers": 2, "totalTransfers": 3, "errors": 1, "checks": 1, "totalChecks": 1,
+    "transferring": [{"name": "c.bin", "percentage": 40}],
+}
+TRANSFERIDOS = [
+    {"name": "a.txt", "completed_at": "2024-01-01T10:00:00Z", "error": "", "checked": False},
+    {"name": "b.txt", "completed_at": "2024-01-01T10:00:01Z", "error": "", "checked": True},
+    {"name": "ruim.txt", "completed_at": "2024-01-01T10:00:02Z", "error": "permission denied", "checked": False},
+    # O mesmo arquivo enviado de novo (outra conclusão) conta outra vez
+    {"name": "a.txt", "completed_at": "2024-01-01T10:00:03Z", "error": "", "checked": False},
+]
+
+
+class RcFalso(BaseHTTPRequestHandler):
+    """Responde como o rc do rclone: POST com JSON, erros como {"error": ...} com status HTTP."""
+    chamadas = []
+
+    def do_POST(self):
+        parametros = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        comando = self.path.lstrip("/")
+        self.chamadas.append((comando, parametros, self.headers.get("Content-Type")))
+        respostas = {"rc/noop": {}, "core/stats": STATS, "core/transferred": {"transferred": TRANSFERIDOS}}
+        if comando in respostas:
+            self._responder(200, respostas[comando])
+        else:
+            self._responder(404, {"error": "couldn't find method", "status": 404})
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+@pytest.fixture
+def endereco():
+    RcFalso.chamadas = []
+    servidor = HTTPServer(("127.0.0.1", 0), RcFalso)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{servidor.server_port}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+class ProcessoFalso:
+    """Processo que continua rodando nas primeiras 'consultas' chamadas de poll."""
+    def __init__(self, consultas):
+        self.consultas = consultas
+
+    def poll(self):
+        if self.consultas:
+            self.consultas -= 1
+            return None
+        return 0
+
+
+class DiarioFalso:
+    def __init__(self):
+        self.registrados = []
+
+    def registrar(self, caminho):
+        self.registrados.append(caminho)
+
+
+def test_chamar_envia_json_e_le_a_resposta(endereco):
+    cliente = ClienteRc(endereco)
+    assert cliente.chamar("core/stats", group="job/7") == STATS
+    assert RcFalso.chamadas == [("core/stats", {"group": "job/7"}, "application/json")]
+
+
+def test_chamar_converte_erro_do_rc(endereco):
+    with pytest.raises(RuntimeError, match="couldn't find method"):
+        ClienteRc(endereco).chamar("core/inexistente")
+
+
+def test_disponivel(endereco):
+    assert ClienteRc(endereco).disponivel()
+    servidor_fechado = ClienteRc("127.0.0.1:1", timeout=1)
+    assert not servidor_fechado.disponivel()
+
+
+def test_consultar_rc_registra_estatisticas_e_diario(endereco, monkeypatch):
+    monkeypatch.setattr(execucao, "INTERVALO_RC_S", 0)
+    textos, status, estatisticas = [], [], []
+    tarefa = TarefaSincronizacao("p", {}, ao_texto=textos.append, ao_status=status.append)
+    tarefa.processo = ProcessoFalso(consultas=2)
+    diario = DiarioFalso()
+    log = io.StringIO()
+
+    tarefa._consultar_rc(ClienteRc(endereco), "job/7", log, estatisticas.append, diario, "Enviando:")
+
+    # Duas consultas, cada uma com core/stats e core/transferred do grupo do job
+    assert [(c, p) for c, p, _ in RcFalso.chamadas] == [("core/stats", {"group": "job/7"}), ("core/transferred", {"group": "job/7"})] * 2
+    assert len(estatisticas) == 2
+    assert (estatisticas[0].bytes, estatisticas[0].total_bytes, estatisticas[0].transferencias, estatisticas[0].erros) == (3 * 1024 * 1024, 4 * 1024 * 1024, 2, 1)
+    # Cada conclusão entra uma vez, mesmo repetida na segunda consulta; só as cópias vão para o diário
+    assert diario.registrados == ["a.txt", "a.txt"]
+    assert log.getvalue().splitlines() == ["[RC] a.txt: Copied", "[RC] b.txt: Checked", "[RC] ruim.txt: permission denied", "[RC] a.txt: Copied"]
+    assert len(textos) == 4
+    assert status[-1] == "Enviando: 1 em andamento: c.bin (40%)"
+
+
+def test_consultar_rc_sem_grupo_e_servidor_fora(monkeypatch):
+    monkeypatch.setattr(execucao, "INTERVALO_RC_S", 0)
+    estatisticas = []
+    tarefa = TarefaSincronizacao("p", {})
+    tarefa.processo = ProcessoFalso(consultas=2)
+    # Servidor rc ainda não respondendo: as consultas falham sem interromper a execução
+    tarefa._consultar_rc(ClienteRc("127.0.0.1:1", timeout=1), None, io.StringIO(), estatisticas.append)
+    assert estatisticas == []
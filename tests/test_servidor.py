@@ -0,0 +1,129 @@
+"""Proteções do servidor de controle contra páginas web (CSRF e DNS rebinding), o token padrão e a limpeza das tarefas."""
+import http.client
+import json
+import os
+import threading
+
+import pytest
+
+from cloudease import servidor
+from cloudease.servidor import ClienteServidor, ServidorTarefas, criar_servidor, host_permitido, origem_permitida, token_salvo
+
+TOKEN = "segredo"
+
+
+@pytest.fixture
+def porta(tmp_path):
+    arquivo_perfis = tmp_path / "perfis.json"
+    arquivo_perfis.write_text(json.dumps({"p": {"origem": str(tmp_path), "destino": "x", "modo": "sync"}}), encoding="utf-8")
+    http, _ = criar_servidor("127.0.0.1", 0, str(arquivo_perfis), token=TOKEN)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    yield http.server_port
+    http.shutdown()
+    http.server_close()
+
+
+def requisitar(porta, metodo, caminho, corpo=None, **cabecalhos):
+    conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=5)
+    conexao.request(metodo, caminho, body=corpo, headers=cabecalhos)
+    resposta = conexao.getresponse()
+    resposta.read()
+    conexao.close()
+    return resposta.status
+
+
+def test_exige_token(porta):
+    assert requisitar(porta, "GET", "/tarefas") == 401
+    assert requisitar(porta, "GET", "/tarefas", Authorization="Bearer errado") == 401
+    assert requisitar(porta, "GET", "/tarefas", Authorization=f"Bearer {TOKEN}") == 200
+
+
+def test_post_sem_json_e_recusado(porta):
+    # Um formulário de outra página envia text/plain sem pré-verificação (CORS)
+    corpo = json.dumps({"perfil": "p"})
+    assert requisitar(porta, "POST", "/tarefas", corpo, **{"Content-Type": "text/plain", "Authorization": f"Bearer {TOKEN}"}) == 415
+    assert requisitar(porta, "POST", "/tarefas/1/cancelar", **{"Authorization": f"Bearer {TOKEN}"}) == 415
+    assert requisitar(porta, "DELETE", "/tarefas", **{"Content-Type": "text/plain", "Authorization": f"Bearer {TOKEN}"}) == 415
+    assert requisitar(porta, "POST", "/fila", json.dumps({"max_simultaneas": 3}),
+                      **{"Content-Type": "application/json; charset=utf-8", "Authorization": f"Bearer {TOKEN}"}) == 200
+
+
+def test_origin_e_host_externos_sao_recusados(porta):
+    autorizacao = f"Bearer {TOKEN}"
+    assert requisitar(porta, "GET", "/perfis", Authorization=autorizacao, Origin="http://exemplo.com") == 403
+    assert requisitar(porta, "GET", "/perfis", Authorization=autorizacao, Origin="null") == 403
+    assert requisitar(porta, "GET", "/perfis", Authorization=autorizacao, Origin=f"http://localhost:{porta}") == 200
+    # DNS rebinding: o navegador manda o nome do domínio do atacante em Host
+    assert requisitar(porta, "GET", "/perfis", Authorization=autorizacao, Host=f"ataque.exemplo.com:{porta}") == 403
+
+
+def test_host_permitido():
+    assert host_permitido("127.0.0.1:8765")
+    assert host_permitido("localhost:8765")
+    assert host_permitido("[::1]:8765")
+    assert host_permitido("192.168.0.10:8765")
+    assert host_permitido("backup.local:8765", endereco="backup.local")
+    assert not host_permitido("exemplo.com:8765")
+    assert not host_permitido("")
+
+
+def test_origem_permitida():
+    assert origem_permitida(None)
+    assert origem_permitida("http://127.0.0.1:8765")
+    assert not origem_permitida("https://exemplo.com")
+    assert not origem_permitida("null")
+
+
+def test_token_gerado_e_lido_pelo_cliente(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(servidor.VARIAVEL_TOKEN, raising=False)
+    assert token_salvo() is None
+    token = token_salvo(criar=True)
+    assert len(token) >= 32
+    assert token_salvo(criar=True) == token
+    if os.name == "posix":
+        assert os.stat(servidor.ARQ_TOKEN_SERVIDOR).st_mode & 0o777 == 0o600
+    assert ClienteServidor().token == token
+    assert ClienteServidor(token="outro").token == "outro"
+
+
+def test_cliente_com_token_do_arquivo(porta, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(servidor.VARIAVEL_TOKEN, raising=False)
+    (tmp_path / servidor.ARQ_TOKEN_SERVIDOR).write_text(TOKEN + "\n", encoding="utf-8")
+    cliente = ClienteServidor(f"127.0.0.1:{porta}")
+    assert cliente.disponivel()
+    assert [perfil["nome"] for perfil in cliente.chamar("GET", "perfis")] == ["p"]
+    assert cliente.chamar("POST", "fila", max_simultaneas=1) == {"max_simultaneas": 1}
+
+
+class TarefaPausando:
+    """Tarefa já pausada cuja thread ainda não terminou (o rclone está sendo encerrado)."""
+    nome_perfil = "p"
+
+    def __init__(self):
+        self.id = None
+        self.estado = "na fila"
+        self.liberar = threading.Event()
+
+    @property
+    def finalizada(self):
+        return self.estado == "pausada"
+
+    def executar(self):
+        self.estado = "pausada"
+        self.liberar.wait(5)
+
+
+def test_remover_finalizadas_mantem_tarefa_ativa(tmp_path):
+    servidor_tarefas = ServidorTarefas(str(tmp_path / "perfis.json"))
+    tarefa = TarefaPausando()
+    servidor_tarefas.fila.adicionar(tarefa)
+    servidor_tarefas.tarefas[tarefa.id] = tarefa
+    while tarefa.estado != "pausada":
+        threading.Event().wait(0.01)
+    # Igual à fila: finalizada, mas a thread ainda roda; continua visível para ser retomada
+    servidor_tarefas.remover_finalizadas()
+    assert servidor_tarefas.tarefas == {tarefa.id: tarefa}
+    assert servidor_tarefas.fila.tarefas == [tarefa]
+    tarefa.liberar.set()
@@ -0,0 +1,81 @@
+"""VigiaTravamento: etapas sem progresso e a fase de listagem, que não envia bytes."""
+from cloudease.parsers import EstatisticasRclone
+from cloudease.vigia import VigiaTravamento, ajustes_reduzidos
+
+JANELA_S = 300
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def vigia_com_relogio():
+    relogio = Relogio()
+    return VigiaTravamento(JANELA_S, relogio=relogio), relogio
+
+
+def etapas_ate(vigia, relogio, fim_s, estatisticas=None, passo_s=5):
+    """Avança o relógio até 'fim_s' registrando 'estatisticas' (se houver) e retorna as etapas devolvidas."""
+    etapas = []
+    while relogio.agora < fim_s:
+        relogio.agora += passo_s
+        if estatisticas is not None:
+            vigia.registrar(estatisticas)
+        etapa = vigia.verificar()
+        if etapa is not None:
+            etapas.append(etapa)
+    return etapas
+
+
+def test_listagem_longa_sem_bytes_nao_dispara():
+    vigia, relogio = vigia_com_relogio()
+    # Uma hora listando uma árvore grande: nada encontrado para transferir ainda, nenhum byte
+    listando = EstatisticasRclone()
+    assert etapas_ate(vigia, relogio, 3600, listando) == []
+    # Antes da primeira estatística também não
+    outro, relogio_outro = vigia_com_relogio()
+    assert etapas_ate(outro, relogio_outro, 3600) == []
+
+
+def test_listagem_termina_e_transferencia_trava():
+    vigia, relogio = vigia_com_relogio()
+    etapas_ate(vigia, relogio, 3600, EstatisticasRclone())
+    # Transferências encontradas, e nenhum byte sai: a janela conta a partir daqui
+    travada = EstatisticasRclone(total_bytes=1000, total_transferencias=3)
+    vigia.registrar(travada)
+    inicio = relogio.agora
+    assert etapas_ate(vigia, relogio, inicio + JANELA_S - 5, travada) == []
+    assert etapas_ate(vigia, relogio, inicio + 2 * JANELA_S, travada) == ["aviso", "reiniciar"]
+
+
+def test_progresso_volta_a_primeira_etapa():
+    vigia, relogio = vigia_com_relogio()
+    parada = EstatisticasRclone(bytes=100, total_bytes=1000, transferencias=1, total_transferencias=3)
+    vigia.registrar(parada)
+    assert etapas_ate(vigia, relogio, JANELA_S, parada) == ["aviso"]
+    andou = EstatisticasRclone(bytes=200, total_bytes=1000, transferencias=1, total_transferencias=3)
+    assert vigia.registrar(andou) # Encerra o travamento sinalizado
+    assert vigia.etapa == 0
+    assert etapas_ate(vigia, relogio, relogio.agora + JANELA_S, andou) == ["aviso"]
+
+
+def test_bytes_completos_nao_disparam():
+    vigia, relogio = vigia_com_relogio()
+    # Tudo enviado; o sync ainda apaga no destino sem enviar bytes
+    completa = EstatisticasRclone(bytes=1000, total_bytes=1000, transferencias=3, total_transferencias=3)
+    assert etapas_ate(vigia, relogio, 3600, completa) == []
+
+
+def test_janela_zero_desliga():
+    relogio = Relogio()
+    vigia = VigiaTravamento(0, relogio=relogio)
+    assert etapas_ate(vigia, relogio, 3600, EstatisticasRclone(total_bytes=1000, total_transferencias=1)) == []
+
+
+def test_ajustes_reduzidos():
+    assert ajustes_reduzidos({"transfers": 32, "checkers": 16, "chunk_size": "20M"}) == {"transfers": 16, "checkers": 8, "chunk_size": "20M"}
+    assert ajustes_reduzidos({"transfers": 1, "checkers": 1, "chunk_size": "10M"}) == {"transfers": 1, "checkers": 1, "chunk_size": "10M"}